@@ -1,16 +1,34 @@
 #!/usr/bin/env python3
+import startup
 import datetime
+import time
 from pathlib import Path
-from threading import Thread
-import configparser
 
 from tkinter import *
-from tkinter import ttk, Button, Label, Frame, filedialog
+from tkinter import ttk, Button, Label, Frame
 
-from just_playback import Playback
 from tkmacosx import Button
+startup.mark("import tkinter")
 
 import logging
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+
+import callouts
+from audio import AudioWorker
+from checkpoint import Checkpoint
+from engine import CUE_POINT_PREFIX, IDLE, WARNING, TimerEngine, cue_point
+from heats import Heat, HeatQueue
+from journal import Journal
+from display import GlyphText, ScoreboardWindow
+from draw import Draw, DrawError, read_entrants
+from render import (ClockStrings, RenderCounter, ViewGroup, WidgetView, countdown_table, fine_countdown_table,
+                    fine_index, strf_delta)
+from scheduler import NS_PER_MS, NS_PER_SEC, DeadlineScheduler, delay_ms, summarise_ns
+from scoring import HeatScores, ScoreError
+from settings import SettingsError, SettingsStore, parse_cue_points
+from soundcache import SoundCache
+startup.mark("import app modules")
 
 logger = logging.getLogger()
 file_handler = logging.FileHandler('logs.log')
@@ -18,60 +36,140 @@ formatter = logging.Formatter('%(asctime)s | %(levelname)s | %(message)s',
                               datefmt='%Y-%m-%d %I:%M:%S'
                               )
 file_handler.setFormatter(formatter)
-logger.addHandler(file_handler)
-
-
-def read_config(config_file):
-    config_obj = configparser.ConfigParser()
-    # with open('config.ini', 'r') as file:
-    #     config = file.read()
-    config_obj.read(config_file)
-    return config_obj
-
-
-def save_config(config_file, config_obj):
-    with open(config_file, "w") as file_obj:
-        config_obj.write(file_obj)
-    return
+# Records reach logs.log through a listener thread, so the Tk thread never waits on the file.
+log_queue = SimpleQueue()
+logger.addHandler(QueueHandler(log_queue))
+log_listener = QueueListener(log_queue, file_handler)
 
 
 CONFIG_FILE = "config.ini"
-SOUND_PATH = Path(__file__).parent / 'audio'
-config = read_config(CONFIG_FILE)
-
-
-def strf_delta(tdelta: int) -> str:
-    days = tdelta // 86400
-    hrs = tdelta // 3600
-    mins = (tdelta // 60) % 60
-    secs = tdelta % 60
-    return f'{days:02}:{hrs:02}:{mins:02}:{secs:02}' if hrs else f'{mins:02}:{secs:02}'
+settings_store = SettingsStore(CONFIG_FILE)
+SOUND_PATH = Path(__file__).parent / settings_store.settings.sound_path
+startup.mark("read config")
+# How often config.ini is checked for edits made outside the app.
+SETTINGS_POLL_MS = 1000
+# EventTimer method run for each control API command.
+CONTROL_COMMANDS = {"start": "start_timer", "stop": "stop_timer", "reset": "reset_timer", "start_heats": "start_heats"}
+# Sound settings starting with this name a cue synthesised by tones.py rather than a file. The
+# prefix is repeated here so that App need not import tones, and with it numpy, at start-up.
+SYNTH_PREFIX = "synth:"
+
+
+def sound_file(setting):
+    """Full path of a sound setting: a file in the sound folder, or a path of its own if absolute.
+
+    Synthesised sounds ("synth:horn", see tones.py) are passed on as they are.
+    """
+    if setting.startswith(SYNTH_PREFIX):
+        return setting
+    return str(SOUND_PATH / setting)
+
+
+def sound_setting(path):
+    """The setting naming the sound file at path, relative to the sound folder when it is in it."""
+    if path.startswith(SYNTH_PREFIX):
+        return path
+    try:
+        return str(Path(path).relative_to(SOUND_PATH))
+    except ValueError:
+        return str(path)
+
+
+def wall_time(deadline_ns):
+    """Wall-clock time at which a time.monotonic_ns() deadline falls."""
+    return datetime.datetime.now() + datetime.timedelta(microseconds=(deadline_ns - time.monotonic_ns()) / 1000)
+
+
+def leaderboard_lines(standings):
+    """One line per surfer of Leaderboard.standings(), e.g. "2. Kelly  13.50  needs 7.21"."""
+    lines = []
+    for place, row in enumerate(standings, 1):
+        line = f'{place}. {row["surfer"]}  {row["total"]:.2f}'
+        if row["needs"] is not None:
+            line += f'  needs {row["needs"]:.2f}'
+        elif row["combo"]:
+            line += '  combo'
+        lines.append(line)
+    return lines
 
 
 class EventTimer(Frame):
-    def __init__(self, parent):
+    def __init__(self, parent, arena=None):
         super().__init__(parent)
-        self.pack()
+        self.pack(side=LEFT)
+
+        # Name of the arena (peak) this timer runs; also its audio route. None for a single timer.
+        self.arena = arena
 
         self.fmt = "%H:%M:%S"
         self.color = "steelblue4"
-
-        # SOUND_PATH = BASE_PATH / config['AppSettings']['sound_path']
-        self.start_event_sound = str(SOUND_PATH / config["AppSettings"]["starting_sound"])
-        self.warning_sound = str(SOUND_PATH / config["AppSettings"]["warning_sound"])
-        self.end_event_sound = str(SOUND_PATH / config["AppSettings"]["ending_sound"])
+        # Widgets are only reconfigured when what they show changes; the counter proves it.
+        self.render_counter = RenderCounter()
+        self.time_now_strings = ClockStrings("Time-now: ", self.fmt)
+        self.countdown_strings = []
+        settings = settings_store.settings
+        # "canvas" draws the countdown on a Canvas and shows fractions of a second at the end of a heat.
+        self.display_mode = settings.display_mode
+        self.fine_countdown_seconds = settings.fine_countdown_seconds
+        self.fine_countdown_digits = settings.fine_countdown_digits
+        self.fine_countdown_fps = settings.fine_countdown_fps
+        self.fine_strings = []
+        self.frame_id = None
+        self.frame_times_ns = []
+        self.frame_lateness_ns = []
+        # Full-screen projector window, created the first time it is opened.
+        self.scoreboard = None
+        self.heat_info = ""
+
+        self.start_event_sound = sound_file(settings.starting_sound)
+        self.warning_sound = sound_file(settings.warning_sound)
+        self.end_event_sound = sound_file(settings.ending_sound)
+        self.cue_point_sound = sound_file(settings.cue_point_sound)
         # Get event_timings.
-        self.event_duration = int(config['AppSettings']['event_duration'])
-        self.warning_time = int(config['AppSettings']['warning_time'])
+        self.event_duration = settings.event_duration
+        self.warning_time = settings.warning_time
+        self.changeover_time = settings.changeover_time
+        # Extra cues, in seconds before the finish.
+        self.cue_points = parse_cue_points(settings.cue_points)
+        # Announce the time left at cue points instead of sounding cue_point_sound.
+        self.callouts = settings.callouts and audio_worker.callout_path is not None
+        # Fire cues early by the estimated output latency + leading silence of each sound.
+        self.latency_compensation = settings.latency_compensation
+        # Sound file for each cue of the heat on the clock.
+        self.cue_sounds = self.default_sounds()
         # Initialise variables
-        self.timer_running = False
         self.time_now = None
         self.start_time = None
         self.finish_time = None
         self.warning_start_time = None
         self.alarm_id = None
 
-        self.pack()
+        # All timing and state transitions live in the engine; the widget only displays them.
+        self.engine = TimerEngine(self.event_duration, self.warning_time, cue_lead=self.cue_lead_ns,
+                                  cue_points=self.cue_points)
+        # Judges' wave scores for the heat on the clock, sent through the control API. Subscribed
+        # first, so each heat's leaderboard is open before its start is published.
+        self.scores = HeatScores(self.engine, lambda: self.heat_queue.current)
+        self.engine.subscribe("start", self.on_start)
+        self.engine.subscribe("resume", self.on_resume)
+        self.engine.subscribe("tick", self.on_tick)
+        self.engine.subscribe("cue", self.play_sound)
+        self.engine.subscribe("late_cue", self.on_late_cue)
+        self.engine.subscribe("warning", self.on_warning)
+        self.engine.subscribe("finish", self.on_finish)
+        self.engine.subscribe("stop", self.on_stop)
+        self.engine.subscribe("reset", self.on_reset)
+        # Heats queued for the day; subscribed after on_finish so a heat is logged before the next starts.
+        self.heat_queue = HeatQueue(self.engine, self.changeover_time, cue_points=self.cue_points)
+        self.heat_queue.subscribe("heat", self.on_heat)
+        self.heat_count = 0
+        # Draw each queued draw heat belongs to, by heat name; results advance surfers through it.
+        self.draws = {}
+        # The heat on the clock, saved on every transition so a restarted app can carry on with it.
+        self.checkpoint = open_checkpoint(arena)
+
+        # Decode the cue sounds up front so nothing is loaded at horn time.
+        self.load_sounds()
 
         # Create application Notebook
         self.app_notebook = ttk.Notebook(self)
@@ -79,9 +177,19 @@ class EventTimer(Frame):
 
         self.create_widgets()
         # self.create_buttons()
-        self.create_settings_widgets()
+        # The Heats and Settings tabs are only filled in when first opened, so the clock paints sooner.
+        self.heats_tree = None
+        self.settings_frame = None
+        self.lazy_tabs = {}
+        self.add_lazy_tab("Heats", self.create_heats_widgets)
+        # One [AppSettings] for every arena, so saving it in one arena changes them all.
+        self.add_lazy_tab("Settings" if len(arenas) == 1 else "Settings (all arenas)", self.create_settings_widgets)
+        self.app_notebook.bind("<<NotebookTabChanged>>", self.build_tab)
+        self.heat_queue.subscribe("change", self.refresh_heats)
+        settings_store.subscribe(self.apply_settings)
 
         self.set_timer_display()
+        self.resume_heat()
 
     def create_widgets(self):
         # Create frame for main application.
@@ -96,7 +204,7 @@ class EventTimer(Frame):
                                 highlightbackground="silver", highlightthickness=1,
                                 relief="ridge", padx=10)
         self.time_frame.grid(row=5, column=0, columnspan=3, pady=10)
-        self.app_notebook.add(self.app_frame, text="Timer")
+        self.app_notebook.add(self.app_frame, text="Timer" if self.arena is None else self.arena)
 
         # Create Labels
         # Start-time label.
@@ -108,9 +216,23 @@ class EventTimer(Frame):
         # Current-time label
         self.time_now_label = Label(self.time_frame, font=('Helvetica', 10))
         self.time_now_label.grid(row=0, column=2, padx=40, pady=10)
+        self.start_time_view = WidgetView(self.start_time_label, self.render_counter)
+        self.finish_time_view = WidgetView(self.finish_time_label, self.render_counter)
+        self.time_now_view = WidgetView(self.time_now_label, self.render_counter)
         # Remaining-time label ... text to be created later.
-        self.remaining_time_label = Label(self.app_frame, font=('Helvetica', 80), fg=self.color)
-        self.remaining_time_label.grid(row=1, column=0, columnspan=4, pady=20)
+        if self.display_mode == "canvas":
+            countdown_view = GlyphText(self.app_frame, ('Helvetica', 80), self.color, self.render_counter)
+            countdown_view.grid(row=1, column=0, columnspan=4, pady=20)
+        else:
+            self.remaining_time_label = Label(self.app_frame, font=('Helvetica', 80), fg=self.color)
+            self.remaining_time_label.grid(row=1, column=0, columnspan=4, pady=20)
+            countdown_view = WidgetView(self.remaining_time_label, self.render_counter)
+        # The projector window, once opened, mirrors everything shown here.
+        self.remaining_time_view = ViewGroup(countdown_view)
+        # Leaderboard beside the countdown.
+        self.leaderboard_label = Label(self.app_frame, font=('Helvetica', 14), justify=LEFT, anchor=NW)
+        self.leaderboard_label.grid(row=1, column=4, rowspan=2, padx=20, sticky=N)
+        self.leaderboard_view = WidgetView(self.leaderboard_label, self.render_counter)
 
         # Add Start-button
         start_button = Button(self.app_frame,
@@ -127,6 +249,11 @@ class EventTimer(Frame):
                               text="Reset Timer", font=("Helvetica", 16), bg="Orange", fg="Black",
                               command=self.reset_timer)
         reset_button.grid(row=0, column=2, padx=20, pady=20, ipadx=20)
+        # Add Projector-button
+        scoreboard_button = Button(self.app_frame,
+                                   text="Projector", font=("Helvetica", 16), bg="steelblue4", fg="white",
+                                   command=self.open_scoreboard)
+        scoreboard_button.grid(row=0, column=3, padx=20, pady=20)
 
         # Create "Play-sounds" buttons
         self.create_play_audio_buttons()
@@ -145,31 +272,59 @@ class EventTimer(Frame):
         quit_button.grid(row=0, column=4, padx=15, pady=10, ipadx=20)
 
     def create_play_audio_buttons(self):
-        sounds = {"start": {"sound_track": self.start_event_sound,
-                            "button_text": "Play\nStart-sound"},
-                  "warning": {"sound_track": self.warning_sound,
-                              "button_text": "Play\nWarning-sound"},
-                  "ending": {"sound_track": self.end_event_sound,
-                             "button_text": "Play\nFinish-sound"}
+        sounds = {"start": "Play\nStart-sound",
+                  "warning": "Play\nWarning-sound",
+                  "ending": "Play\nFinish-sound"
                   }
 
         column = 0
 
-        for v in sounds.values():
-            sound_track = v.get("sound_track")
-            button_text = v.get("button_text")
-            play_audio_thread_button = Button(
+        for cue, button_text in sounds.items():
+            play_sound_button = Button(
                 self.sound_frame,
                 text=button_text, font=("Helvetica", 10),
-                command=lambda track=sound_track: self.play_audio_thread(track))
-            play_audio_thread_button.grid(row=0, column=column, padx=5, pady=10)
+                command=lambda name=cue: self.play_sound(name))
+            play_sound_button.grid(row=0, column=column, padx=5, pady=10)
             column += 1
 
-    def create_settings_widgets(self):
-        # Create frame to manage configuration options.
-        self.settings_frame = ttk.Frame(self.app_notebook, width=800, height=300, padding=(10))
-        self.settings_frame.pack(fill="both", expand=1)
-        self.app_notebook.add(self.settings_frame, text="Settings")
+    def add_lazy_tab(self, text, create):
+        frame = ttk.Frame(self.app_notebook, padding=(10))
+        self.app_notebook.add(frame, text=text)
+        self.lazy_tabs[str(frame)] = (frame, create)
+
+    def build_tab(self, event):
+        """Fill in a lazily created tab the first time it is selected."""
+        frame, create = self.lazy_tabs.pop(self.app_notebook.select(), (None, None))
+        if create is not None:
+            create(frame)
+
+    def create_heats_widgets(self, frame):
+        # Frame to manage the queue of heats.
+        self.heats_frame = frame
+
+        columns = {"heat": "Heat", "duration": "Duration", "warning": "Warning",
+                   "start": "Planned start", "finish": "Planned finish"}
+        self.heats_tree = ttk.Treeview(self.heats_frame, columns=list(columns), show="headings",
+                                       height=8, selectmode="browse")
+        for column, heading in columns.items():
+            self.heats_tree.heading(column, text=heading)
+            self.heats_tree.column(column, width=130, anchor=CENTER)
+        self.heats_tree.grid(row=0, column=0, columnspan=6, padx=10, pady=10)
+
+        heat_buttons = (("Add Heat", self.add_heat),
+                        ("Load Draw", self.load_draw),
+                        ("Delete Heat", self.delete_heat),
+                        ("Move Up", lambda: self.move_heat(-1)),
+                        ("Move Down", lambda: self.move_heat(1)),
+                        ("Start Heats", self.start_heats))
+        for column, (text, command) in enumerate(heat_buttons):
+            heat_button = ttk.Button(self.heats_frame, text=text, command=command)
+            heat_button.grid(row=1, column=column, padx=10, pady=10)
+        self.refresh_heats()
+
+    def create_settings_widgets(self, frame):
+        # Frame to manage configuration options.
+        self.settings_frame = frame
 
         self.sound_settings_frame = ttk.Frame(self.settings_frame, width=700, height=100)
         self.timer_settings_frame = ttk.Frame(self.settings_frame, width=700, height=300)
@@ -181,8 +336,6 @@ class EventTimer(Frame):
 
         self.start_sound_entry = ttk.Entry(
             self.sound_settings_frame, width=50)
-        self.start_sound_entry.insert(
-            END, self.start_event_sound)
         self.start_sound_entry.grid(row=0, column=1, padx=10, pady=10)
 
         self.start_sound_button = ttk.Button(
@@ -195,8 +348,6 @@ class EventTimer(Frame):
 
         self.warning_sound_entry = ttk.Entry(
             self.sound_settings_frame, width=50)
-        self.warning_sound_entry.insert(
-            END, self.warning_sound)
         self.warning_sound_entry.grid(row=1, column=1, padx=10, pady=10)
 
         self.warning_sound_button = ttk.Button(
@@ -209,8 +360,6 @@ class EventTimer(Frame):
 
         self.end_sound_entry = ttk.Entry(
             self.sound_settings_frame, width=50)
-        self.end_sound_entry.insert(
-            END, self.end_event_sound)
         self.end_sound_entry.grid(row=2, column=1, padx=10, pady=10)
 
         self.end_sound_button = ttk.Button(
@@ -227,8 +376,6 @@ class EventTimer(Frame):
 
         self.timer_entry = ttk.Entry(
             self.timer_settings_frame, width=10)
-        self.timer_entry.insert(
-            END, str(self.event_duration))
         self.timer_entry.grid(row=0, column=1, padx=10, pady=10)
 
         # Warning time setting
@@ -238,10 +385,17 @@ class EventTimer(Frame):
 
         self.warning_entry = ttk.Entry(
             self.timer_settings_frame, width=10)
-        self.warning_entry.insert(
-            END, str(self.warning_time))
         self.warning_entry.grid(row=1, column=1, padx=10, pady=10)
 
+        # Changeover time between queued heats
+        self.changeover_label = ttk.Label(
+            self.timer_settings_frame, text="Changeover Time (seconds):", font=("Arial", 12))
+        self.changeover_label.grid(row=2, column=0, padx=10, pady=10, sticky=W)
+
+        self.changeover_entry = ttk.Entry(
+            self.timer_settings_frame, width=10)
+        self.changeover_entry.grid(row=2, column=1, padx=10, pady=10)
+
         self.timer_settings_frame.pack()
 
         self.save_button = ttk.Button(
@@ -251,30 +405,40 @@ class EventTimer(Frame):
         self.reset_button = ttk.Button(
             self.settings_frame, text="Reset Settings", command=self.reset_settings)
         self.reset_button.pack(side=RIGHT, padx=10, pady=10)
+        self.fill_settings_entries()
 
     def browse_start_sound(self):
+        from tkinter import filedialog
         filename = filedialog.askopenfilename(
             initialdir=SOUND_PATH,
             title="Select Starting Sound",
             filetypes=(("MP3 files", "*.mp3"), ("WAV files", "*.wav"), ("All files", "*.*")))
-        self.start_sound_entry.delete(0, END)
-        self.start_sound_entry.insert(END, filename)
+        if filename:
+            self.start_sound_entry.delete(0, END)
+            self.start_sound_entry.insert(END, filename)
+            sound_cache.submit(filename)
 
     def browse_warning_sound(self):
+        from tkinter import filedialog
         filename = filedialog.askopenfilename(
             initialdir=SOUND_PATH,
             title="Select Warning Sound",
             filetypes=(("MP3 files", "*.mp3"), ("WAV files", "*.wav"), ("All files", "*.*")))
-        self.warning_sound_entry.delete(0, END)
-        self.warning_sound_entry.insert(END, filename)
+        if filename:
+            self.warning_sound_entry.delete(0, END)
+            self.warning_sound_entry.insert(END, filename)
+            sound_cache.submit(filename)
 
     def browse_end_sound(self):
+        from tkinter import filedialog
         filename = filedialog.askopenfilename(
             initialdir=SOUND_PATH,
             title="Select Ending Sound",
             filetypes=(("MP3 files", "*.mp3"), ("WAV files", "*.wav"), ("All files", "*.*")))
-        self.end_sound_entry.delete(0, END)
-        self.end_sound_entry.insert(END, filename)
+        if filename:
+            self.end_sound_entry.delete(0, END)
+            self.end_sound_entry.insert(END, filename)
+            sound_cache.submit(filename)
 
 
     def set_timer_display(self):
@@ -283,139 +447,663 @@ class EventTimer(Frame):
         self.finish_time = self.start_time + datetime.timedelta(seconds=self.event_duration)
         self.warning_start_time = self.finish_time - datetime.timedelta(seconds=self.event_duration)
 
-        self.start_time_label.configure(text=f"Start-time: {self.start_time.strftime(self.fmt)}")
-        self.finish_time_label.configure(text=f"Finish-time: {self.finish_time.strftime(self.fmt)}")
-        self.time_now_label.configure(text=f"Time-now: {self.time_now.strftime(self.fmt)}")
+        self.start_time_view.update(text=f"Start-time: {self.start_time.strftime(self.fmt)}")
+        self.finish_time_view.update(text=f"Finish-time: {self.finish_time.strftime(self.fmt)}")
+        self.time_now_view.update(text=self.time_now_strings.at())
+
+        self.remaining_time_view.update(text=strf_delta(self.event_duration))
 
-        time_text = strf_delta(self.event_duration)
-        self.remaining_time_label.configure(text=time_text)
+    @property
+    def timer_running(self):
+        return self.engine.running
 
     def start_timer(self):
+        """Run a single heat with the current settings via the Start-button."""
+        self.heat_queue.stop()
+        self.cue_sounds = self.default_sounds()
+        self.engine.configure(self.event_duration, self.warning_time, self.cue_points)
+        self.engine.start()
+        self.schedule_update()
+
+    def start_heats(self):
+        """Run the queued heats back to back, starting with the first one not yet run."""
+        self.heat_queue.start()
+        self.schedule_update()
+
+    def resume_heat(self):
+        """Pick up the heat that was on the clock when the app last exited, if there was one."""
+        saved = self.checkpoint.load() if self.checkpoint is not None else None
+        if saved is None:
+            return
+        if saved["heat"]:
+            heat = Heat(saved["heat"], saved["event_duration"], saved["warning_time"], self.default_sounds())
+            resumed = self.heat_queue.resume(heat, saved["start_ns"], saved["cues"])
+        else:
+            self.engine.configure(saved["event_duration"], saved["warning_time"])
+            resumed = self.engine.resume(saved["start_ns"], saved["cues"])
+        if resumed:
+            self.schedule_update()
+        else:
+            logger.info(f'Arena: {self.arena or "-"}, Heat: {saved["heat"] or "-"} finished while the app was closed')
+            self.checkpoint.clear()
+
+    def on_start(self):
+        self.show_heat()
+        heat = self.heat_queue.current
+        self.record("start", heat=heat.name if heat is not None else None, start_ns=self.engine.start_ns,
+                    finish_ns=self.engine.finish_ns, event_duration=self.engine.event_duration,
+                    warning_time=self.engine.warning_time)
+        self.save_checkpoint()
+        self.prepare_callouts()
+        self.show_leaderboard()
+
+    def on_resume(self, missed_cues):
+        self.show_heat()
+        self.remaining_time_view.update(
+            fg="red" if self.engine.state == WARNING else "dark green",
+            text=self.countdown_strings[min(self.engine.remaining_seconds(), self.engine.event_duration)])
+        self.publish_state()
+        if missed_cues:
+            logger.warning(f'Arena: {self.arena or "-"}, missed cues while closed: {", ".join(missed_cues)}')
+        heat = self.heat_queue.current
+        self.record("resume", heat=heat.name if heat is not None else None, start_ns=self.engine.start_ns,
+                    finish_ns=self.engine.finish_ns, missed_cues=missed_cues)
+        self.save_checkpoint()
+        self.prepare_callouts()
+        self.show_leaderboard()
+
+    def show_heat(self):
+        # The countdown runs on the engine's monotonic clock; the wall-clock times are for display only.
         self.time_now = datetime.datetime.now()
-        self.start_time = self.time_now
-        self.finish_time = self.start_time + datetime.timedelta(seconds=self.event_duration)
-        self.warning_start_time = self.finish_time - datetime.timedelta(seconds=self.warning_time)
+        self.start_time = wall_time(self.engine.start_ns)
+        self.finish_time = self.start_time + datetime.timedelta(seconds=self.engine.event_duration)
+        self.warning_start_time = self.finish_time - datetime.timedelta(seconds=self.engine.warning_time)
+
+        # Every string the countdown can show is formatted once, up front.
+        self.countdown_strings = countdown_table(self.engine.event_duration)
+        if self.display_mode == "canvas":
+            self.fine_strings = fine_countdown_table(self.fine_countdown_seconds, self.fine_countdown_digits)
+        self.render_counter.reset()
+        self.frame_times_ns = []
+        self.frame_lateness_ns = []
+
+        heat = self.heat_queue.current
+        self.heat_info = " - ".join(name for name in (self.arena, heat.name if heat is not None else None) if name)
+        if self.scoreboard is not None:
+            self.scoreboard.show_info(self.heat_info)
+        self.start_time_view.update(text=f"Start-time: {self.start_time.strftime(self.fmt)}")
+        self.finish_time_view.update(text=f"Finish-time: {self.finish_time.strftime(self.fmt)}")
+        self.time_now_view.update(text=self.time_now_strings.at())
+        self.remaining_time_view.update(fg="dark green", text=self.countdown_strings[-1])
+        self.publish_state()
+
+    def schedule_update(self):
+        """Queue update_timer on the shared scheduler for the engine's next tick or cue deadline."""
+        self.cancel_alarm()
+        deadline_ns = self.engine.next_deadline_ns()
+        if deadline_ns is not None:
+            self.alarm_id = scheduler.schedule(deadline_ns, self.update_timer)
+
+    def cancel_alarm(self):
+        if self.alarm_id is not None:
+            scheduler.cancel(self.alarm_id)
+            self.alarm_id = None
 
-        self.start_time_label.configure(text=f"Start-time: {self.start_time.strftime(self.fmt)}")
-        self.finish_time_label.configure(text=f"Finish-time: {self.finish_time.strftime(self.fmt)}")
-        self.time_now_label.configure(text=f"Time-now: {self.time_now.strftime(self.fmt)}")
-        self.timer_running = True
-        self.remaining_time_label.configure(foreground="dark green")
-        self.play_audio_thread(self.start_event_sound)
-        self.alarm_id = self.after(1000, self.update_timer)
+    def cue_lead_ns(self, cue):
+        """How early a cue must be triggered for its onset to land on the displayed second."""
+        bank = audio_worker.route_bank(self.arena)
+        if not self.latency_compensation or bank is None:
+            return 0
+        return bank.cue_lead_ns(self.cue_sound(cue))
 
     def stop_timer(self):
-        self.timer_running = False
-        if self.alarm_id is not None:
-            self.after_cancel(self.alarm_id)
-            self.alarm_id = None
+        self.engine.stop()
 
     def update_timer(self):
-        if self.timer_running:
-            self.time_now = datetime.datetime.now()
-            self.time_now_label.configure(text=f"Time-now: {self.time_now.strftime(self.fmt)}")
-            remaining_time_in_seconds = (self.finish_time - self.time_now).seconds + 1
-
-            if self.start_time <= self.time_now < self.warning_start_time:
-                self.remaining_time_label.configure(text=strf_delta(remaining_time_in_seconds))
-                self.alarm_id = self.after(1000, self.update_timer)
-
-            elif self.warning_start_time <= self.time_now <= self.finish_time:
-                self.remaining_time_label.configure(foreground="red")
-                self.remaining_time_label.configure(text=strf_delta(remaining_time_in_seconds))
-                if remaining_time_in_seconds == self.warning_time:
-                    self.play_audio_thread(self.warning_sound)
-                self.alarm_id = self.after(1000, self.update_timer)
-
-            else:
-                logger.info(
-                    f'Event_duration: {self.event_duration} secs, '
-                    f'Started: {self.start_time.strftime(self.fmt)}, '
-                    f'Planned_finish: {self.finish_time.strftime(self.fmt)}, '
-                    f'Finished: {self.time_now.strftime(self.fmt)}, '
-                    f'Time_error: {(self.time_now - self.finish_time).seconds}')
-
-                self.remaining_time_label.configure(text="Event Finished")
-                self.play_audio_thread(self.end_event_sound)
-                self.timer_running = False
-                if remaining_time_in_seconds == 0:
-                    self.play_audio_thread(self.end_event_sound)
+        self.alarm_id = None
+        self.engine.poll()
+        self.schedule_update()
+
+    def on_stop(self):
+        self.cancel_alarm()
+        self.cancel_frames()
+        self.publish_state()
+        self.record("stop", remaining_ns=self.engine.remaining_ns())
+        self.clear_checkpoint()
+
+    def on_tick(self, remaining_time_in_seconds):
+        self.time_now_view.update(text=self.time_now_strings.at())
+        if self.fine_strings and remaining_time_in_seconds <= self.fine_countdown_seconds:
+            # The frame loop owns the countdown display for the final seconds.
+            if self.frame_id is None:
+                self.schedule_frame()
+        else:
+            self.remaining_time_view.update(text=self.countdown_strings[remaining_time_in_seconds])
+        self.publish_state()
+
+    def schedule_frame(self):
+        """Queue the next frame on a grid of fine_countdown_fps slots that ends exactly on the finish.
+
+        The slot is taken from the current time, so a frame that overran skips the slots it missed
+        instead of queueing up behind them and starving the mainloop.
+        """
+        period_ns = NS_PER_SEC // self.fine_countdown_fps
+        remaining_ns = self.engine.finish_ns - time.monotonic_ns()
+        if remaining_ns <= 0:
+            return
+        deadline_ns = self.engine.finish_ns - (remaining_ns - 1) // period_ns * period_ns
+        self.frame_id = scheduler.schedule(deadline_ns, lambda: self.render_frame(deadline_ns))
+
+    def render_frame(self, deadline_ns):
+        self.frame_id = None
+        started_ns = time.monotonic_ns()
+        self.frame_lateness_ns.append(started_ns - deadline_ns)
+        index = fine_index(self.engine.remaining_ns(started_ns), self.fine_countdown_digits)
+        self.remaining_time_view.update(text=self.fine_strings[min(index, len(self.fine_strings) - 1)])
+        self.frame_times_ns.append(time.monotonic_ns() - started_ns)
+        if self.engine.running:
+            self.schedule_frame()
+
+    def cancel_frames(self):
+        if self.frame_id is not None:
+            scheduler.cancel(self.frame_id)
+            self.frame_id = None
+
+    def on_late_cue(self, cue, late_ns):
+        logger.warning(f'{self.arena or "Timer"}: {cue} cue fired {late_ns / 1e6:.1f} ms late')
+        self.record("late_cue", cue=cue, late_ns=late_ns)
+
+    def on_warning(self, remaining_time_in_seconds):
+        self.remaining_time_view.update(fg="red")
+        self.publish_state()
+        self.record("warning", remaining_seconds=remaining_time_in_seconds)
+        self.save_checkpoint()
+
+    def on_finish(self):
+        # Positive when the finish was noticed after the planned finish.
+        time_error_ns = time.monotonic_ns() - self.engine.finish_ns
+        self.cancel_frames()
+        self.clear_checkpoint()
+        self.time_now = datetime.datetime.now()
+        self.time_now_view.update(text=self.time_now_strings.at())
+        self.remaining_time_view.update(text="Event Finished")
+        results = self.scores.last_results["standings"]
+        self.show_leaderboard()
+        self.publish_state()
+        heat = self.heat_queue.current
+        if heat is not None and heat.name in self.draws:
+            # Before the queue starts the next heat, so it starts with the surfers who made it.
+            self.advance_draw(heat.name, [row["surfer"] for row in results])
+
+        lateness = self.engine.ticker.lateness_stats()
+        audio_stats = audio_worker.stats()
+        frame_time = summarise_ns(self.frame_times_ns)
+        frame_lateness = summarise_ns(self.frame_lateness_ns)
+        logger.info(
+            f'Arena: {self.arena or "-"}, '
+            f'Heat: {heat.name if heat is not None else "-"}, '
+            f'Event_duration: {self.engine.event_duration} secs, '
+            f'Started: {self.start_time.strftime(self.fmt)}, '
+            f'Planned_finish: {self.finish_time.strftime(self.fmt)}, '
+            f'Finished: {self.time_now.strftime(self.fmt)}, '
+            f'Time_error_ms: {time_error_ns / NS_PER_MS:+.3f}, '
+            f'Ticks: {lateness["count"]}, '
+            f'Mean_tick_lateness_ms: {lateness["mean_ms"]:.3f}, '
+            f'Max_tick_lateness_ms: {lateness["max_ms"]:.3f}, '
+            f'Max_cue_onset_ms: {audio_stats["onset"]["max_ms"]:.3f}, '
+            f'Max_audio_queue_depth: {audio_stats["max_queue_depth"]}, '
+            f'Widget_updates: {self.render_counter.updates}, '
+            f'Widget_updates_per_sec: {self.render_counter.per_second():.2f}, '
+            f'Frames: {frame_time["count"]}, '
+            f'Max_frame_ms: {frame_time["max_ms"]:.3f}, '
+            f'Max_frame_lateness_ms: {frame_lateness["max_ms"]:.3f}')
+        if control_server is not None:
+            control_stats = control_server.stats()
+            logger.info(f'Arena: {self.arena or "-"}, '
+                        f'Control_commands_run: {control_stats["commands_run"]}, '
+                        f'Control_commands_dropped: {control_stats["commands_dropped"]}')
+        self.record("finish", heat=heat.name if heat is not None else None, finish_ns=self.engine.finish_ns,
+                    time_error_ns=time_error_ns, ticks=lateness["count"], max_tick_lateness_ms=lateness["max_ms"],
+                    max_cue_onset_ms=audio_stats["onset"]["max_ms"], widget_updates=self.render_counter.updates,
+                    frames=frame_time["count"], max_frame_ms=frame_time["max_ms"], results=results)
 
     def reset_timer(self):
         """Reset the Timer via the Reset-button. """
-        self.timer_running = False
-        self.remaining_time_label.configure(fg=self.color)
-        self.set_timer_display()
-
-    @staticmethod
-    def play_audio_thread(sound_track):
-        """Method to Play the selected audio sound_track in separate thread to avoid timing issues"""
-        playback.load_file(sound_track)
-        playback.loop_at_end(False)
-
-        thread1 = Thread(target=playback.play())
-        thread1.start()
+        self.engine.reset()
+
+    def open_scoreboard(self):
+        """Show the full-screen projector window."""
+        if self.scoreboard is None:
+            self.scoreboard = ScoreboardWindow(self, self.render_counter,
+                                               geometry=settings_store.settings.scoreboard_geometry)
+            self.scoreboard.show_info(self.heat_info)
+            self.remaining_time_view.add(self.scoreboard)
+        else:
+            self.scoreboard.show()
+
+    def on_heat(self, heat):
+        self.cue_sounds = heat.sounds
+
+    def add_score(self, surfer, wave, points, received_ns):
+        """Take a judged wave score received at received_ns; raises ScoreError if it cannot count."""
+        self.scores.add(surfer, wave, points, received_ns)
+        self.record("score", surfer=surfer, wave=wave, score=points, received_ns=received_ns)
+        self.show_leaderboard()
+        self.publish_state()
+
+    def show_leaderboard(self):
+        lines = leaderboard_lines(self.scores.leaderboard.standings())
+        last_results = self.scores.last_results
+        if last_results is not None and self.scores.leaderboard.frozen is None:
+            # The next heat is on but has no scores yet: the last one's results stay up beneath it.
+            lines += ["", f'{last_results["heat"] or "Last heat"} final'] + leaderboard_lines(last_results["standings"])
+        self.leaderboard_view.update(text="\n".join(lines))
+
+    def add_heat(self):
+        """Queue a heat with the current timing and sound settings."""
+        self.heat_count += 1
+        self.heat_queue.add(Heat(f"Heat {self.heat_count}", self.event_duration, self.warning_time,
+                                 self.default_sounds()))
+
+    def load_draw(self):
+        """Draw a division from a file of entrants, best seed first, and queue every heat of it.
+
+        The file's name is the division's, so several divisions can be queued side by side.
+        """
+        from tkinter import filedialog, messagebox
+        filename = filedialog.askopenfilename(title="Select Entrants",
+                                              filetypes=(("Text files", "*.txt"), ("All files", "*.*")))
+        if not filename:
+            return
+        settings = settings_store.settings
+        try:
+            draw = Draw(read_entrants(filename), settings.draw_heat_size, settings.draw_advance,
+                        division=Path(filename).stem)
+        except (OSError, DrawError) as error:
+            messagebox.showerror("Draw not made", str(error))
+            return
+        taken = [name for name in draw.heats if name in self.draws]
+        if taken:
+            messagebox.showerror("Draw not made", f'{draw.division} has already been drawn')
+            return
+        heats = draw.queue_heats(self.event_duration, self.warning_time, self.default_sounds())
+        for heat in heats:
+            self.draws[heat.name] = draw
+        self.heat_queue.extend(heats)
+        self.record("draw", division=draw.division, heats=len(heats), rounds=len(draw.rounds))
+
+    def advance_draw(self, name, placings):
+        """Put heat name's qualifiers into the heats they go on to, from its final placings."""
+        draw = self.draws[name]
+        try:
+            draw.result(name, placings)
+        except DrawError as error:
+            logger.warning(f'Arena: {self.arena or "-"}, Heat: {name}, not advanced: {error}')
+            return
+        self.record("advance", heat=name, placings=placings)
+        for heat in self.heat_queue.heats:
+            if not heat.done and self.draws.get(heat.name) is draw:
+                heat.surfers = draw.surfers(heat.name)
+
+    def selected_heat(self):
+        selection = self.heats_tree.selection()
+        return self.heats_tree.index(selection[0]) if selection else None
+
+    def delete_heat(self):
+        index = self.selected_heat()
+        if index is not None:
+            self.heat_queue.remove(index)
+
+    def move_heat(self, step):
+        index = self.selected_heat()
+        if index is not None and 0 <= index + step < len(self.heat_queue.heats):
+            self.heat_queue.move(index, index + step)
+            self.heats_tree.selection_set(self.heats_tree.get_children()[index + step])
+
+    def refresh_heats(self):
+        """Redraw the heats list with the timeline recomputed from the heat on the clock."""
+        if self.heats_tree is None:
+            return
+        planned = {id(heat): (start_ns, finish_ns) for heat, start_ns, finish_ns in self.heat_queue.timeline()}
+        self.heats_tree.delete(*self.heats_tree.get_children())
+        for heat in self.heat_queue.heats:
+            if id(heat) in planned:
+                start_ns, finish_ns = planned[id(heat)]
+                start, finish = wall_time(start_ns).strftime(self.fmt), wall_time(finish_ns).strftime(self.fmt)
+            else:
+                start, finish = "Done", "Done"
+            self.heats_tree.insert("", END, values=(heat.name, strf_delta(heat.event_duration),
+                                                    heat.warning_time, start, finish))
 
-    @staticmethod
-    def stop_audio():
+    def on_reset(self):
+        self.remaining_time_view.update(fg=self.color)
+        self.set_timer_display()
+        self.publish_state()
+        self.record("reset")
+        self.clear_checkpoint()
+
+    def save_checkpoint(self):
+        if self.checkpoint is not None and self.engine.running:
+            heat = self.heat_queue.current
+            self.checkpoint.save(self.engine.state, heat.name if heat is not None else "",
+                                 self.engine.event_duration, self.engine.warning_time,
+                                 self.engine.start_ns, self.engine.finish_ns,
+                                 [cue for _, cue in self.engine.pending_cues])
+
+    def clear_checkpoint(self):
+        if self.checkpoint is not None:
+            self.checkpoint.clear()
+
+    def record(self, event, **fields):
+        """Add an entry for this arena to the heat journal, if one is kept."""
+        if journal is not None:
+            journal.record(event, self.arena, **fields)
+
+    def publish_state(self):
+        """Send the clock to the broadcast server's browsers, the time-sync slaves and the control API."""
+        if broadcast_server is None and timesync_master is None and control_server is None:
+            return
+        heat = self.heat_queue.current
+        state = {"heat": heat.name if heat is not None else "",
+                 "remaining_ms": self.engine.remaining_ns() // NS_PER_MS,
+                 "phase": self.engine.state,
+                 "colour": self.remaining_time_view.shown.get("fg", self.color),
+                 "running": self.engine.running}
+        if broadcast_server is not None:
+            broadcast_server.publish(self.arena or "", state)
+        if timesync_master is not None:
+            # Slaves count down locally from the finish time, mapped onto their own clocks.
+            timesync_master.publish(self.arena or "", dict(state, start_ns=self.engine.start_ns,
+                                                           finish_ns=self.engine.finish_ns))
+        if control_server is not None:
+            control_server.publish(self.arena or "", self.control_state(state))
+
+    def control_state(self, state=None):
+        """The clock as the control API reports it, with the engine's deadlines on the monotonic clock."""
+        if state is None:
+            heat = self.heat_queue.current
+            state = {"heat": heat.name if heat is not None else "",
+                     "remaining_ms": self.engine.remaining_ns() // NS_PER_MS,
+                     "phase": self.engine.state,
+                     "running": self.engine.running}
+        return {"heat": state["heat"], "remaining_ms": state["remaining_ms"], "phase": state["phase"],
+                "running": state["running"], "start_ns": self.engine.start_ns, "finish_ns": self.engine.finish_ns,
+                **self.scores.state()}
+
+    def default_sounds(self):
+        return {"start": self.start_event_sound,
+                "warning": self.warning_sound,
+                "ending": self.end_event_sound}
+
+    def cue_sound(self, cue, heat=None):
+        """The sound for cue in heat (by default the heat on the clock).
+
+        Cue points all share cue_point_sound, or with callouts on, announce the time left.
+        """
+        if cue.startswith(CUE_POINT_PREFIX) and self.callouts:
+            heat = heat or self.heat_queue.current
+            return callouts.words(int(cue[len(CUE_POINT_PREFIX):]), heat.name if heat is not None else "")
+        return self.cue_sounds.get(cue, self.cue_point_sound)
+
+    def prepare_callouts(self):
+        """Have the announcements for this heat's and the next heat's cue points composed ahead of time."""
+        if not self.callouts:
+            return
+        sounds = {self.cue_sound(cue) for _, cue in self.engine.pending_cues if cue.startswith(CUE_POINT_PREFIX)}
+        next_heat = self.heat_queue.next_heat()
+        if next_heat is not None:
+            sounds.update(self.cue_sound(cue_point(seconds), next_heat)
+                          for seconds in self.cue_points if 0 < seconds < next_heat.event_duration)
+        audio_worker.preload({sound: sound for sound in sounds})
+
+    def load_sounds(self):
+        """Queue every sound the settings and the queued heats use to be decoded by the audio worker."""
+        paths = set(self.default_sounds().values()) | set(self.cue_sounds.values()) | {self.cue_point_sound}
+        paths = {path for path in paths if not callouts.is_callout(path)}
+        for heat in self.heat_queue.heats:
+            paths.update(heat.sounds.values())
+        audio_worker.preload({path: path for path in paths})
+
+    def play_sound(self, cue):
+        """Method to Play a pre-decoded cue ("start", "warning", "ending" or a cue point) on the audio worker"""
+        sound = self.cue_sound(cue)
+        # An announcement that is not composed in time gives way to the plain cue point sound.
+        audio_worker.play(sound, route=self.arena,
+                          fallback=self.cue_point_sound if callouts.is_callout(sound) else None)
+        self.record("cue", cue=cue, sound=sound)
+        self.save_checkpoint()
+
+    def stop_audio(self):
         """Method to stop playing the audio"""
-        if playback.active:
-            playback.stop()
+        audio_worker.stop_sound(route=self.arena)
 
     def save_settings(self):
-        config['AppSettings']['starting_sound'] = Path(self.start_sound_entry.get()).name
-        config['AppSettings']['warning_sound'] = Path(self.warning_sound_entry.get()).name
-        config['AppSettings']['ending_sound'] = Path(self.end_sound_entry.get()).name
-        config['AppSettings']['event_duration'] = self.timer_entry.get()
-        config['AppSettings']['warning_time'] = self.warning_entry.get()
-
-        save_config(CONFIG_FILE, config)
-
-        self.start_event_sound = self.start_sound_entry.get()
-        self.warning_sound = str(SOUND_PATH / Path(self.warning_sound_entry.get()).name)
-        self.end_event_sound = str(SOUND_PATH / Path(self.end_sound_entry.get()).name)
-        self.event_duration = int(self.timer_entry.get())
-        self.warning_time = int(self.warning_entry.get())
-
-        self.create_play_audio_buttons()
+        try:
+            settings_store.update(starting_sound=sound_setting(self.start_sound_entry.get()),
+                                  warning_sound=sound_setting(self.warning_sound_entry.get()),
+                                  ending_sound=sound_setting(self.end_sound_entry.get()),
+                                  event_duration=self.timer_entry.get(),
+                                  warning_time=self.warning_entry.get(),
+                                  changeover_time=self.changeover_entry.get())
+        except SettingsError as error:
+            from tkinter import messagebox
+            messagebox.showerror("Settings not saved", str(error).replace("; ", "\n"), parent=self)
 
     def reset_settings(self):
-        self.config = read_config(CONFIG_FILE)
-
-        self.start_sound_entry.delete(0, END)
-        self.start_sound_entry.insert(END, config['AppSettings']['starting_sound'])
-
-        self.warning_sound_entry.delete(0, END)
-        self.warning_sound_entry.insert(END, config['AppSettings']['warning_sound'])
-
-        self.end_sound_entry.delete(0, END)
-        self.end_sound_entry.insert(END, config['AppSettings']['ending_sound'])
-
-        self.timer_entry.delete(0, END)
-        self.timer_entry.insert(END, config['AppSettings']['event_duration'])
-
-        self.warning_entry.delete(0, END)
-        self.warning_entry.insert(END, config['AppSettings']['warning_time'])
-
-        self.start_event_sound = str(SOUND_PATH / config['AppSettings']['starting_sound'])
-        self.warning_sound = str(SOUND_PATH / config['AppSettings']['warning_sound'])
-        self.end_event_sound = str(SOUND_PATH / config['AppSettings']['ending_sound'])
-        self.event_duration = int(config['AppSettings']['event_duration'])
-        self.warning_time = int(config['AppSettings']['warning_time'])
+        """Discard unsaved edits by reading config.ini again."""
+        settings_store.reload()
+
+    def apply_settings(self, settings):
+        """Take up new settings; a heat already on the clock keeps its timings until it is over."""
+        self.start_event_sound = sound_file(settings.starting_sound)
+        self.warning_sound = sound_file(settings.warning_sound)
+        self.end_event_sound = sound_file(settings.ending_sound)
+        self.cue_point_sound = sound_file(settings.cue_point_sound)
+        self.event_duration = settings.event_duration
+        self.warning_time = settings.warning_time
+        self.changeover_time = settings.changeover_time
+        self.cue_points = parse_cue_points(settings.cue_points)
+        self.callouts = settings.callouts and audio_worker.callout_path is not None
+        self.latency_compensation = settings.latency_compensation
+        self.heat_queue.set_changeover(self.changeover_time)
+        self.heat_queue.set_cue_points(self.cue_points)
+        if not self.engine.running:
+            self.engine.configure(self.event_duration, self.warning_time, self.cue_points)
+            self.cue_sounds = self.default_sounds()
+        if self.engine.state == IDLE:
+            self.set_timer_display()
+        self.fill_settings_entries()
+        self.load_sounds()
+
+    def fill_settings_entries(self):
+        """Show the settings in use in the Settings tab, once it has been built."""
+        if self.settings_frame is None:
+            return
+        for entry, value in ((self.start_sound_entry, self.start_event_sound),
+                             (self.warning_sound_entry, self.warning_sound),
+                             (self.end_sound_entry, self.end_event_sound),
+                             (self.timer_entry, self.event_duration),
+                             (self.warning_entry, self.warning_time),
+                             (self.changeover_entry, self.changeover_time)):
+            entry.delete(0, END)
+            entry.insert(END, str(value))
 
 
 class App(Tk):
-    def __init__(self):
+    def __init__(self, arena_count=1):
         super(App, self).__init__()
         self.base_path = Path(__file__).cwd()
-        self.title(config['AppSettings']['app_title'])
-        self.geometry(config['AppSettings']['app_geometry'])
-        self.iconbitmap(str(self.base_path / config['AppSettings']["app_iconbitmap"]))
+        settings = settings_store.settings
+        self.title(settings.app_title)
+        # One app_geometry wide per arena, side by side.
+        width, height = settings.app_geometry.split("x")
+        self.geometry(f"{int(width) * arena_count}x{height}")
+        self.iconbitmap(str(self.base_path / settings.app_iconbitmap))
+
+        # A single after() chain drives every arena: it always waits for the earliest deadline.
+        self.wake_id = None
+        self.wake_ns = None
+        scheduler.on_earlier = self.arm_wake
+        self.after(SETTINGS_POLL_MS, self.check_settings)
+        self.bind("<<ControlRequest>>", self.run_control_requests)
+        # Requests that came in before mainloop was running to take the event.
+        self.after_idle(self.run_control_requests)
+
+    def submit(self, function):
+        """Run function on the Tk thread as soon as it is idle; safe to call from any thread.
+
+        event_generate() is one of the calls _tkinter hands over to the Tk thread itself when Tcl
+        is built with threads (as it is in the python.org and Homebrew builds), so the event
+        wakes mainloop at once instead of waiting for a polling after() loop. It blocks until the
+        Tk thread takes it, so the control server calls this from a handoff thread.
+        """
+        control_requests.put(function)
+        try:
+            self.event_generate("<<ControlRequest>>", when="tail")
+        except RuntimeError:
+            # mainloop has not started yet (it drains the queue when it does) or has ended.
+            pass
+
+    def run_control_requests(self, event=None):
+        while not control_requests.empty():
+            control_requests.get()()
+
+    def check_settings(self):
+        """Pick up edits made to config.ini while the app is running."""
+        settings_store.check_for_edits()
+        self.after(SETTINGS_POLL_MS, self.check_settings)
+
+    def arm_wake(self):
+        deadline_ns = scheduler.next_deadline_ns()
+        if deadline_ns is None or deadline_ns == self.wake_ns:
+            return
+        if self.wake_id is not None:
+            self.after_cancel(self.wake_id)
+        self.wake_ns = deadline_ns
+        self.wake_id = self.after(delay_ms(deadline_ns, time.monotonic_ns()), self.wake)
+
+    def wake(self):
+        self.wake_id = None
+        self.wake_ns = None
+        scheduler.run_due()
+        self.arm_wake()
+
+
+def read_arenas():
+    """Arena names from the "arenas" setting, or [None] to run a single unnamed timer."""
+    names = [name.strip() for name in settings_store.settings.arenas.split(",")]
+    return [name for name in names if name] or [None]
+
+
+def open_checkpoint(arena):
+    """The checkpoint for arena's timer, or None when "checkpoint_path" is empty."""
+    path = settings_store.settings.checkpoint_path
+    if not path:
+        return None
+    if arena:
+        path = Path(path)
+        path = path.with_name(f'{path.stem}-{arena}{path.suffix}')
+    return Checkpoint(str(path))
+
+
+def report_startup():
+    """Print the --profile-startup timeline once the first frame is drawn, then quit."""
+    app.update_idletasks()
+    startup.mark("first frame")
+    audio_worker.opened.wait()
+    startup.mark("audio output open (in the background)")
+    startup.report()
+    app.quit()
+
+
+def run_control_command(command, arena, request):
+    """Carry out a control API command on the Tk thread; returns the arena's state afterwards."""
+    timer = timers.get(arena)
+    if timer is None:
+        raise ControlError(f'No arena "{arena}"' if arena or len(timers) == 1 else
+                           f'Name the arena, one of {", ".join(timers)}')
+    if command == "score":
+        try:
+            timer.add_score(request["surfer"], request["wave"], request["score"], request["received_ns"])
+        except KeyError as error:
+            raise ControlError(f'score needs surfer, wave and score, {error} is missing')
+        except ScoreError as error:
+            raise ControlError(str(error))
+    else:
+        getattr(timer, CONTROL_COMMANDS[command])()
+    return timer.control_state()
+
+
+def record_onset(route, name, latency_ns):
+    """Journal a cue's measured trigger-to-onset latency; called from the audio callback."""
+    journal.record("onset", route, sound=name, latency_ns=latency_ns)
 
 
 # if __name__ == "__main__":
-logger.setLevel(logging.INFO)
-playback = Playback()
-app = App()
-EventTimer(app)
+logger.setLevel(settings_store.settings.debug_level)
+log_listener.start()
+scheduler = DeadlineScheduler()
+arenas = read_arenas()
+# Structured record of every heat, written off the Tk thread; an empty journal_path turns it off.
+journal_path = settings_store.settings.journal_path
+journal = None
+if journal_path:
+    journal = Journal(journal_path, settings_store.settings.journal_fsync)
+    journal.start()
+# Sound files are played from normalised copies transcoded into the cache, not decoded at horn time.
+sound_cache = SoundCache(settings_store.settings.sound_cache_path, settings_store.settings.sound_cache_mb << 20)
+# Spoken callouts need their word recordings; the folder is fixed at start-up.
+callout_path = None
+if settings_store.settings.callouts:
+    callout_path = str(Path(__file__).parent / settings_store.settings.callout_path)
+audio_worker = AudioWorker(on_onset=record_onset if journal is not None else None, cache=sound_cache,
+                           callout_path=callout_path)
+for arena in arenas:
+    # Optional [Arena <name>] section routing that arena's horns to its own output device.
+    audio_device = settings_store.get(f'Arena {arena}', 'audio_device') if arena else ''
+    if audio_device:
+        audio_worker.add_route(arena, audio_device)
+audio_worker.start()
+startup.mark("start journal and audio worker")
+# Optional server streaming every arena's clock to browsers on the local network.
+broadcast_port = settings_store.settings.broadcast_port
+broadcast_server = None
+if broadcast_port is not None:
+    from broadcast import BroadcastServer
+    broadcast_server = BroadcastServer(settings_store.settings.broadcast_host, broadcast_port)
+    broadcast_server.start()
+# Optional multicast announcements for slave displays running slave_display.py.
+timesync_port = settings_store.settings.timesync_port
+timesync_master = None
+if timesync_port is not None:
+    from timesync import TimeSyncMaster
+    timesync_master = TimeSyncMaster(settings_store.settings.timesync_group, timesync_port,
+                                     interface=settings_store.settings.timesync_interface)
+    timesync_master.start()
+startup.mark("start network services")
+app = App(len(arenas))
+startup.mark("create window")
+# Optional local control API for scoring software, on a unix socket and/or a localhost port.
+control_requests = SimpleQueue()
+control_server = None
+if settings_store.settings.control_port is not None or settings_store.settings.control_socket:
+    from control import ControlError, ControlServer
+    control_server = ControlServer(app.submit, run_control_command, port=settings_store.settings.control_port,
+                                   socket_path=settings_store.settings.control_socket)
+timers = {}
+for arena in arenas:
+    timers[arena or ""] = EventTimer(app, arena)
+    startup.mark(f"create timer {arena or ''}".strip())
+if control_server is not None:
+    for timer in timers.values():
+        timer.publish_state()
+    control_server.start()
+    startup.mark("start control API")
+audio_worker.estimate_latency()
+if startup.PROFILE:
+    app.after(0, report_startup)
 app.mainloop()
+if journal is not None:
+    journal.close()
+settings_store.close()
+log_listener.stop()
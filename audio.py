@@ -0,0 +1,389 @@
+import logging
+import time
+from queue import SimpleQueue
+from threading import Event, Thread
+
+from scheduler import NS_PER_SEC, summarise_ns
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 44100
+NCHANNELS = 2
+SAMPLE_WIDTH = 2
+# Cues that can sound at once on one device; one started with all of them busy takes over the oldest.
+VOICES = 8
+# Short device period so a triggered cue reaches the output within one callback.
+BUFFERSIZE_MSEC = 10
+# Number of device periods queued ahead of the speaker, fixed so the output latency can be estimated.
+CALLBACK_PERIODS = 3
+# Samples quieter than this (about -40 dBFS) count as leading silence.
+SILENCE_THRESHOLD = 328
+# How long the device is watched for the size of the blocks it asks for.
+ESTIMATE_SECONDS = 0.25
+# miniaudio and the mixer are imported where they are used: between them they pull in numpy and
+# take a good part of a second to import on a slow laptop, which the audio worker thread pays
+# instead of the first frame.
+
+
+class AudioBank:
+    """Cue sounds decoded once into memory and played through a single open output device.
+
+    The device is started at construction and streams silence until a cue is triggered, so
+    play() only hands a buffer to a voice of the bank's Mixer and never opens or decodes a
+    file. Cues overlap: a warning that falls due while the start horn is still sounding is
+    mixed in rather than cutting it off.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, nchannels=NCHANNELS, buffersize_msec=BUFFERSIZE_MSEC,
+                 device_id=None, sounds_from=None, on_onset=None, voices=VOICES, cache=None, announcer=None):
+        self.sample_rate = sample_rate
+        self.nchannels = nchannels
+        # A soundcache.SoundCache to play files from, transcoded, instead of decoding them here.
+        self.cache = cache
+        # A callouts.Announcer composing "say:" sounds; it keeps them itself, in a bounded cache.
+        self.announcer = announcer
+        if sounds_from is None:
+            self.buffers = {}
+            self.paths = {}
+            self.leading_silence_ns = {}
+        else:
+            # Play the sounds already decoded by another bank instead of decoding them again.
+            self.buffers = sounds_from.buffers
+            self.paths = sounds_from.paths
+            self.leading_silence_ns = sounds_from.leading_silence_ns
+            self.announcer = sounds_from.announcer
+        self.onset_latency_ns = []
+        # on_onset(name, latency_ns) is called from the audio callback as each cue starts.
+        self.on_onset = on_onset
+        # Estimated, not measured: see estimate_latency().
+        self.estimated_latency_ns = 0
+        self.callback_frames = 0
+
+        import miniaudio
+        from mixer import Mixer
+        self.mixer = Mixer(nchannels, voices, on_start=self.started)
+        self.device = miniaudio.PlaybackDevice(output_format=miniaudio.SampleFormat.SIGNED16,
+                                               nchannels=nchannels,
+                                               sample_rate=sample_rate,
+                                               buffersize_msec=buffersize_msec,
+                                               device_id=device_id,
+                                               callback_periods=CALLBACK_PERIODS)
+        stream = self._stream()
+        next(stream)
+        self.device.start(stream)
+
+    def load(self, name, path):
+        """Decode path into the bank under name, unless that file is already resident.
+
+        A path such as "synth:horn" is synthesised by tones.py instead of decoded, and with a
+        cache, files are played from its transcoded copies. "say:" announcements are composed
+        by the announcer and stay in its cache rather than the bank.
+        """
+        if self.paths.get(name) == path:
+            return
+        import callouts
+        if callouts.is_callout(path):
+            if self.announcer is None:
+                raise ValueError("Spoken callouts are not set up")
+            self.announcer.compose(path)
+            return
+        import tones
+        if tones.is_synth(path):
+            self.buffers[name] = memoryview(tones.render(path, self.sample_rate, self.nchannels))
+        elif self.cache is not None:
+            self.buffers[name] = memoryview(self.cache.load(path))
+        else:
+            import miniaudio
+            decoded = miniaudio.decode_file(path,
+                                            output_format=miniaudio.SampleFormat.SIGNED16,
+                                            nchannels=self.nchannels,
+                                            sample_rate=self.sample_rate)
+            self.buffers[name] = memoryview(decoded.samples).cast("B")
+        self.leading_silence_ns[name] = self.leading_silence(self.buffers[name])
+        self.paths[name] = path
+
+    def install(self, name, path, samples):
+        """Keep PCM already loaded elsewhere, e.g. by the sound cache's thread, as name's sound."""
+        self.buffers[name] = memoryview(samples)
+        self.leading_silence_ns[name] = self.leading_silence(self.buffers[name])
+        self.paths[name] = path
+
+    def leading_silence(self, buffer):
+        """Time before the first sample louder than SILENCE_THRESHOLD, in nanoseconds."""
+        samples = buffer.cast("h")
+        # Scan 10 ms windows and only look at individual samples once a window is loud.
+        step = self.nchannels * self.sample_rate // 100
+        for start in range(0, len(samples), step):
+            window = samples[start:start + step]
+            if max(window) > SILENCE_THRESHOLD or min(window) < -SILENCE_THRESHOLD:
+                for index, sample in enumerate(window):
+                    if abs(sample) > SILENCE_THRESHOLD:
+                        return (start + index) // self.nchannels * NS_PER_SEC // self.sample_rate
+        return 0
+
+    def estimate_latency(self, seconds=ESTIMATE_SECONDS):
+        """Estimate the device output latency from the block size the running device asks for.
+
+        This is an estimate, not a measurement: the device keeps CALLBACK_PERIODS blocks queued
+        ahead of the speaker, so a sample handed over now is heard about that many of the largest
+        blocks seen later. Buffering in the OS mixer, driver or a Bluetooth link is not included;
+        only a loopback recording could measure that.
+        """
+        self.callback_frames = 0
+        time.sleep(seconds)
+        self.estimated_latency_ns = self.callback_frames * CALLBACK_PERIODS * NS_PER_SEC // self.sample_rate
+        return self.estimated_latency_ns
+
+    def cue_lead_ns(self, name):
+        """How far ahead of its audible onset a cue has to be triggered."""
+        return self.estimated_latency_ns + self.leading_silence_ns.get(name, 0)
+
+    def load_all(self, sounds):
+        """Decode every {name: path} entry, keeping the previous buffer for any file that fails."""
+        import miniaudio
+        loaded = True
+        for name, path in sounds.items():
+            try:
+                self.load(name, path)
+            except (OSError, ValueError, miniaudio.MiniaudioError) as error:
+                logger.error(f'Could not decode {name} sound {path}: {error}')
+                loaded = False
+        return loaded
+
+    @property
+    def active(self):
+        return self.mixer.active
+
+    def play(self, name, trigger_ns=None, gain=1.0):
+        """Start the named cue on a voice of its own and return the voice, or None if it is not loaded.
+
+        trigger_ns is when the cue was asked for, if earlier than now.
+        """
+        buffer = self.buffers.get(name)
+        if buffer is None and self.announcer is not None:
+            import callouts
+            buffer = self.announcer.cached(name)
+            if buffer is None and callouts.is_callout(name) and self.announcer.decoded(name):
+                # Evicted, but every word is still decoded, so composing it is only a copy.
+                buffer = self.announcer.compose(name)
+        if buffer is None:
+            logger.warning(f'No {name} sound loaded')
+            return None
+        return self.mixer.play(buffer, trigger_ns, name, gain)
+
+    def stop(self, name=None, voice=None):
+        """Stop every sound, every voice playing name, or one voice."""
+        self.mixer.stop(voice, name)
+
+    def set_gain(self, voice, gain):
+        self.mixer.set_gain(voice, gain)
+
+    def latency_stats(self):
+        """Summary of the time from the trigger to the cue's first samples being handed to the device."""
+        return summarise_ns(self.onset_latency_ns)
+
+    def close(self):
+        self.device.close()
+
+    def started(self, name, trigger_ns):
+        """Called by the mixer, in the audio callback, as a cue's first samples are handed over."""
+        latency_ns = time.perf_counter_ns() - trigger_ns
+        self.onset_latency_ns.append(latency_ns)
+        if self.on_onset is not None:
+            self.on_onset(name, latency_ns)
+
+    def _stream(self):
+        required_frames = yield b""
+        while True:
+            if required_frames > self.callback_frames:
+                self.callback_frames = required_frames
+            required_frames = yield self.mixer.mix(required_frames)
+
+
+def find_playback_device(name):
+    """miniaudio id of the first output device whose name contains name, or None."""
+    import miniaudio
+    for device in miniaudio.Devices().get_playbacks():
+        if name.lower() in device["name"].lower():
+            return device["id"]
+    return None
+
+
+class AudioWorker(Thread):
+    """Long-lived thread that owns the AudioBanks and runs the commands posted to it.
+
+    post() only appends to a SimpleQueue, which never blocks the caller, so the Tk thread can
+    trigger, stop or preload sounds without waiting on decoding or the audio device.
+    Each route (e.g. an arena) can be sent to its own output device with add_route(); unrouted
+    sounds play on the default device. All banks share the same decoded sounds.
+
+    The devices are opened by the thread itself once started, so constructing the worker costs
+    nothing; commands posted meanwhile wait in the queue. opened is set when that is done.
+
+    With a sound cache, files and callout word recordings are loaded on the cache's thread and
+    only the finished PCM is posted back here, so a transcode never holds up a horn queued
+    behind it.
+    """
+
+    def __init__(self, bank=None, on_onset=None, cache=None, callout_path=None):
+        super().__init__(name="audio-worker", daemon=True)
+        # on_onset(route, name, latency_ns) reports each cue's measured onset, from the audio callback.
+        self.on_onset = on_onset
+        self.cache = cache
+        # Folder of word recordings for spoken callouts, or None for none.
+        self.callout_path = callout_path
+        self.bank = bank
+        self.banks = {}
+        self.routes = {}
+        self.opened = Event()
+        self.commands = SimpleQueue()
+        # Announcements waiting for word recordings from the cache.
+        self.pending_callouts = set()
+        self.max_queue_depth = 0
+        self.commands_run = 0
+
+    def post(self, command, *args):
+        self.commands.put((command, args, time.perf_counter_ns()))
+        depth = self.commands.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+
+    def add_route(self, route, device_name):
+        """Play sounds posted for route on the output device whose name contains device_name; call before start()."""
+        self.routes[route] = device_name
+
+    def open_banks(self):
+        if self.bank is None:
+            announcer = None
+            if self.callout_path is not None:
+                from callouts import Announcer
+                announcer = Announcer(self.callout_path, SAMPLE_RATE, NCHANNELS, self.cache)
+            self.bank = AudioBank(on_onset=self.route_onset(None), cache=self.cache, announcer=announcer)
+        banks = {None: self.bank}
+        for route, device_name in self.routes.items():
+            device_id = find_playback_device(device_name)
+            if device_id is None:
+                logger.warning(f'No audio device matching "{device_name}", {route} uses the default device')
+                continue
+            banks[route] = AudioBank(device_id=device_id, sounds_from=self.bank, on_onset=self.route_onset(route))
+        self.banks = banks
+
+    def route_onset(self, route):
+        if self.on_onset is None:
+            return None
+        return lambda name, latency_ns: self.on_onset(route, name, latency_ns)
+
+    def route_bank(self, route):
+        """The bank playing route's sounds, or None until the devices are open."""
+        return self.banks.get(route, self.bank)
+
+    def play(self, name, route=None, gain=1.0, fallback=None):
+        """Play name on route's device, or fallback if name is an announcement that is not ready."""
+        self.post("play", name, route, gain, fallback)
+
+    def stop_sound(self, route=None, name=None):
+        """Stop every sound on route's device, or only those playing name."""
+        self.post("stop", route, name)
+
+    def preload(self, sounds):
+        self.post("preload", dict(sounds))
+
+    def estimate_latency(self):
+        self.post("estimate_latency")
+
+    def shutdown(self):
+        self.post("quit")
+
+    def run(self):
+        try:
+            self.open_banks()
+        except Exception as error:
+            # No miniaudio or no usable output device: the clock keeps running without horns.
+            logger.error(f'Could not open the audio output, cues will be silent: {error}')
+            return
+        finally:
+            self.opened.set()
+        while True:
+            command, args, posted_ns = self.commands.get()
+            self.commands_run += 1
+            if command == "play":
+                self.play_cue(*args, trigger_ns=posted_ns)
+            elif command == "stop":
+                self.route_bank(args[0]).stop(name=args[1])
+            elif command == "preload":
+                self.preload_sounds(args[0])
+            elif command == "install":
+                self.bank.install(*args)
+            elif command == "clip":
+                self.install_clip(*args)
+            elif command == "estimate_latency":
+                for route, bank in self.banks.items():
+                    bank.estimate_latency()
+                    logger.info(f'Estimated audio output latency ({route or "default"}): '
+                                f'{bank.estimated_latency_ns / 1e6:.1f} ms')
+                logger.info('Leading silence: ' + ', '.join(
+                    f'{name} {ns / 1e6:.1f} ms' for name, ns in self.bank.leading_silence_ns.items()))
+            elif command == "quit":
+                for bank in self.banks.values():
+                    bank.close()
+                return
+
+    def play_cue(self, name, route, gain, fallback, trigger_ns):
+        bank = self.route_bank(route)
+        if bank.play(name, trigger_ns, gain) is not None or fallback is None:
+            return
+        bank.play(fallback, trigger_ns, gain)
+        import callouts
+        if callouts.is_callout(name) and name not in self.pending_callouts:
+            # Compose it once the cue is out, with any words it lacks loaded on the cache's thread.
+            self.post("preload", {name: name})
+
+    def preload_sounds(self, sounds):
+        """Load {name: path} sounds, handing files and missing word recordings to the cache's thread."""
+        if self.cache is None:
+            self.bank.load_all(sounds)
+            return
+        import callouts
+        import tones
+        for name, path in sounds.items():
+            if self.bank.paths.get(name) == path:
+                continue
+            if tones.is_synth(path):
+                self.bank.load_all({name: path})
+            elif callouts.is_callout(path):
+                self.preload_callout(path)
+            else:
+                self.cache.submit(path, lambda path, samples, name=name: self.post("install", name, path, samples))
+
+    def preload_callout(self, sound):
+        announcer = self.bank.announcer
+        if announcer is None:
+            logger.error(f'Could not compose "{sound}": spoken callouts are not set up')
+            return
+        try:
+            missing = announcer.missing_clips(sound)
+        except FileNotFoundError as error:
+            logger.error(f'Could not compose "{sound}": {error}')
+            return
+        if not missing:
+            announcer.compose(sound)
+            return
+        self.pending_callouts.add(sound)
+        for word, path in missing.items():
+            self.cache.submit(path, lambda path, samples, word=word: self.post("clip", word, samples))
+
+    def install_clip(self, word, samples):
+        announcer = self.bank.announcer
+        announcer.add_clip(word, samples)
+        for sound in list(self.pending_callouts):
+            if not announcer.missing_clips(sound):
+                self.pending_callouts.discard(sound)
+                announcer.compose(sound)
+
+    def stats(self):
+        """Queue depth counters and trigger-to-onset latency, measured from the time of post()."""
+        return {"queue_depth": self.commands.qsize(),
+                "max_queue_depth": self.max_queue_depth,
+                "commands_run": self.commands_run,
+                "onset": summarise_ns([latency for bank in self.banks.values()
+                                       for latency in bank.onset_latency_ns])}
@@ -0,0 +1,221 @@
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import struct
+import time
+from threading import Event, Thread
+
+logger = logging.getLogger(__name__)
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC11B65"
+# A client that has this much unsent data is too slow to keep up and is dropped.
+MAX_CLIENT_BUFFER = 256 * 1024
+SNAPSHOT_INTERVAL = 5.0
+
+PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><meta name="viewport" content="width=device-width, initial-scale=1">
+<title>Surf Comp Timer</title>
+<style>
+body { background: black; color: white; font-family: Helvetica, sans-serif; text-align: center; margin: 0; }
+.arena { padding: 2vh 0; }
+.name { font-size: 5vh; }
+.clock { font-size: 25vh; font-variant-numeric: tabular-nums; }
+</style></head>
+<body><div id="arenas"></div>
+<script>
+const arenas = {};
+function pad(n) { return String(n).padStart(2, "0"); }
+function render() {
+  const now = performance.now();
+  let html = "";
+  for (const [name, s] of Object.entries(arenas)) {
+    let ms = s.remaining_ms;
+    if (s.phase === "running" || s.phase === "warning") { ms = Math.max(0, ms - (now - s.received)); }
+    const secs = Math.ceil(ms / 1000);
+    const text = s.phase === "finished" ? "Finished" : pad(Math.floor(secs / 60)) + ":" + pad(secs % 60);
+    html += '<div class="arena"><div class="name">' + [name, s.heat].filter(Boolean).join(" - ") +
+            '</div><div class="clock" style="color:' + s.colour + '">' + text + '</div></div>';
+  }
+  document.getElementById("arenas").innerHTML = html;
+  requestAnimationFrame(render);
+}
+function connect() {
+  const ws = new WebSocket("ws://" + location.host + "/ws");
+  ws.onmessage = (event) => {
+    const message = JSON.parse(event.data);
+    const received = performance.now();
+    if (message.type === "snapshot") {
+      for (const [name, s] of Object.entries(message.arenas)) { arenas[name] = Object.assign(s, {received}); }
+    } else {
+      const s = arenas[message.arena] || (arenas[message.arena] = {});
+      Object.assign(s, message.state, {received});
+    }
+  };
+  ws.onclose = () => setTimeout(connect, 1000);
+}
+connect();
+requestAnimationFrame(render);
+</script></body></html>
+"""
+
+
+def websocket_frame(payload, opcode=0x1):
+    """A single unmasked server-to-client WebSocket frame."""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 65536:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+
+def websocket_accept(key):
+    return base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()).decode()
+
+
+class BroadcastServer:
+    """Embedded HTTP/WebSocket server streaming timer state to browsers on the local network.
+
+    GET / serves a self-contained display page, GET /state the current state as JSON, and /ws
+    streams it: a full snapshot on connect and every SNAPSHOT_INTERVAL seconds, and in between
+    a delta holding only the fields of one arena that changed. Each message is serialised and
+    framed once and the same bytes are written to every client.
+
+    The server runs its own asyncio loop on a daemon thread; publish() is safe to call from Tk.
+    """
+
+    def __init__(self, host="0.0.0.0", port=8765, snapshot_interval=SNAPSHOT_INTERVAL):
+        self.host = host
+        self.port = port
+        self.snapshot_interval = snapshot_interval
+        self.states = {}
+        self.clients = set()
+        self.sequence = 0
+        self.last_snapshot = 0.0
+        self.frames_sent = 0
+        self.clients_dropped = 0
+        self.loop = None
+        self.ready = Event()
+        self.thread = Thread(target=self.run, name="broadcast-server", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        self.ready.wait()
+
+    def run(self):
+        asyncio.run(self.serve())
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        server = await asyncio.start_server(self.handle, self.host, self.port, backlog=1024)
+        self.port = server.sockets[0].getsockname()[1]
+        logger.info(f'Broadcasting timer state on http://{self.host}:{self.port}/')
+        self.ready.set()
+        async with server:
+            await server.serve_forever()
+
+    def publish(self, arena, state):
+        """Queue a new state for arena ("" for a single timer); called from any thread."""
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.fan_out, arena, dict(state))
+
+    def fan_out(self, arena, state):
+        previous = self.states.get(arena, {})
+        changed = {name: value for name, value in state.items() if previous.get(name) != value}
+        self.states[arena] = state
+        now = time.monotonic()
+        if now - self.last_snapshot >= self.snapshot_interval:
+            self.last_snapshot = now
+            message = self.snapshot()
+        elif changed:
+            message = self.message({"type": "delta", "arena": arena, "state": changed})
+        else:
+            return
+
+        for writer in list(self.clients):
+            if writer.transport.get_write_buffer_size() > MAX_CLIENT_BUFFER:
+                self.drop(writer)
+                continue
+            writer.write(message)
+            self.frames_sent += 1
+
+    def message(self, body):
+        self.sequence += 1
+        body["seq"] = self.sequence
+        body["sent_ns"] = time.monotonic_ns()
+        return websocket_frame(json.dumps(body, separators=(",", ":")).encode())
+
+    def snapshot(self):
+        return self.message({"type": "snapshot", "arenas": self.states})
+
+    def drop(self, writer):
+        self.clients.discard(writer)
+        self.clients_dropped += 1
+        writer.transport.abort()
+
+    async def handle(self, reader, writer):
+        try:
+            request = await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            writer.close()
+            return
+        lines = request.decode("latin-1").split("\r\n")
+        path = lines[0].split(" ")[1] if len(lines[0].split(" ")) > 1 else "/"
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+            if not headers.get("sec-websocket-key"):
+                self.respond(writer, "400 Bad Request", "text/plain", b"Sec-WebSocket-Key missing")
+                return
+            await self.stream(reader, writer, headers["sec-websocket-key"])
+        elif path == "/state":
+            self.respond(writer, "200 OK", "application/json", json.dumps(self.states).encode())
+        elif path == "/":
+            self.respond(writer, "200 OK", "text/html; charset=utf-8", PAGE.encode())
+        else:
+            self.respond(writer, "404 Not Found", "text/plain", b"Not found")
+
+    @staticmethod
+    def respond(writer, status, content_type, body):
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+        writer.close()
+
+    async def stream(self, reader, writer, key):
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {websocket_accept(key)}\r\n\r\n").encode())
+        writer.write(self.snapshot())
+        self.clients.add(writer)
+        try:
+            # Clients only ever send control frames; answer pings and stop on close.
+            while True:
+                head = await reader.readexactly(2)
+                opcode, length = head[0] & 0x0F, head[1] & 0x7F
+                if length == 126:
+                    length = struct.unpack("!H", await reader.readexactly(2))[0]
+                elif length == 127:
+                    length = struct.unpack("!Q", await reader.readexactly(8))[0]
+                mask = await reader.readexactly(4) if head[1] & 0x80 else b"\0\0\0\0"
+                payload = bytes(byte ^ mask[index % 4] for index, byte in enumerate(await reader.readexactly(length)))
+                if opcode == 0x8:
+                    writer.write(websocket_frame(payload[:2], opcode=0x8))
+                    break
+                if opcode == 0x9:
+                    writer.write(websocket_frame(payload, opcode=0xA))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.clients.discard(writer)
+            writer.close()
+
+    def stats(self):
+        return {"clients": len(self.clients),
+                "frames_sent": self.frames_sent,
+                "clients_dropped": self.clients_dropped}
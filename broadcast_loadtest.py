@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Load test for the timer broadcast server.
+
+Opens many WebSocket clients against a running app (or, with --serve, an in-process server
+publishing simulated ticks) and reports how many frames arrived and how long they took from
+publish to delivery, across all clients. With --serve the server shares the clients' event
+loop, so the delivery times also include the clients' own parsing.
+
+    python broadcast_loadtest.py --serve --clients 1000 --seconds 10
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import struct
+import time
+
+from broadcast import BroadcastServer
+from scheduler import summarise_ns
+
+
+def raise_file_limit(needed):
+    """Each client costs a socket (two with --serve), more than the default limit on some systems."""
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < needed:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(needed, hard), hard))
+
+
+async def client(host, port, seconds, latencies, counts):
+    reader, writer = await asyncio.open_connection(host, port)
+    key = base64.b64encode(os.urandom(16)).decode()
+    writer.write((f"GET /ws HTTP/1.1\r\nHost: {host}:{port}\r\nUpgrade: websocket\r\n"
+                  f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n").encode())
+    await reader.readuntil(b"\r\n\r\n")
+    deadline = time.monotonic() + seconds
+    frames = 0
+    try:
+        while True:
+            head = await asyncio.wait_for(reader.readexactly(2), max(deadline - time.monotonic(), 0.001))
+            length = head[1] & 0x7F
+            if length == 126:
+                length = struct.unpack("!H", await reader.readexactly(2))[0]
+            elif length == 127:
+                length = struct.unpack("!Q", await reader.readexactly(8))[0]
+            message = json.loads(await reader.readexactly(length))
+            latencies.append(time.monotonic_ns() - message["sent_ns"])
+            frames += 1
+    except asyncio.TimeoutError:
+        pass
+    counts.append(frames)
+    writer.close()
+
+
+async def publish_ticks(server, seconds, rate):
+    """Stand in for the app: a heat counting down, published rate times a second."""
+    remaining_ms = int(seconds * 1000)
+    while remaining_ms > 0:
+        server.fan_out("Load Test", {"heat": "Heat 1", "remaining_ms": remaining_ms, "phase": "running",
+                                     "colour": "dark green", "running": True})
+        await asyncio.sleep(1 / rate)
+        remaining_ms -= int(1000 / rate)
+
+
+async def main(arguments):
+    raise_file_limit(arguments.clients * 2 + 64)
+    server = None
+    if arguments.serve:
+        server = BroadcastServer("127.0.0.1", 0)
+        server.loop = asyncio.get_running_loop()
+        tcp_server = await asyncio.start_server(server.handle, "127.0.0.1", 0, backlog=arguments.clients)
+        arguments.port = tcp_server.sockets[0].getsockname()[1]
+
+    latencies, counts = [], []
+    clients = [client(arguments.host, arguments.port, arguments.seconds, latencies, counts)
+               for _ in range(arguments.clients)]
+    tasks = [asyncio.gather(*clients)]
+    if server is not None:
+        # Let the clients connect before the clock starts.
+        await asyncio.sleep(1)
+        tasks.append(publish_ticks(server, arguments.seconds - 1, arguments.rate))
+    await asyncio.gather(*tasks)
+
+    if not latencies:
+        print("No frames received")
+        return
+
+    delivery = summarise_ns(latencies)
+    print(f"clients: {len(counts)}, frames received: {len(latencies)}, "
+          f"per client min/max: {min(counts)}/{max(counts)}")
+    print(f"publish-to-delivery ms p50: {delivery['p50_ms']:.2f}, p95: {delivery['p95_ms']:.2f}, "
+          f"p99: {delivery['p99_ms']:.2f}, max: {delivery['max_ms']:.2f}")
+    if server is not None:
+        print(f"server: {server.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--rate", type=float, default=1, help="ticks per second published with --serve")
+    parser.add_argument("--serve", action="store_true", help="run an in-process server instead of the app's")
+    asyncio.run(main(parser.parse_args()))
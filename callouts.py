@@ -0,0 +1,150 @@
+"""Spoken announcements such as "five minutes remaining in heat twelve", put together from clips.
+
+An announcement is a sound named "say:" followed by its words. Each word is a short recording in
+the callout folder named after it ("five.wav", "minutes.mp3", ...); words() lists the ones an
+announcement needs, and WORDS every word the timer can use. Announcements are composed ahead of
+the cue they are for and held in a small LRU cache, so at the cue only a buffer is handed over.
+
+    python callouts.py audio/callouts 300 "Heat 12"    plays the 5-minute callout for heat 12
+"""
+import os
+import re
+import sys
+from collections import OrderedDict
+
+PREFIX = "say:"
+# Composed announcements kept ready; a few heats' worth of cue points.
+CACHE_SIZE = 16
+# Pause between words.
+GAP_SECONDS = 0.06
+EXTENSIONS = (".wav", ".mp3", ".flac", ".ogg")
+# numpy is only imported by the Announcer, on the audio worker, so App can name announcements
+# without paying for it at start-up.
+
+ONES = ("zero one two three four five six seven eight nine ten eleven twelve thirteen fourteen "
+        "fifteen sixteen seventeen eighteen nineteen").split()
+TENS = "twenty thirty forty fifty sixty seventy eighty ninety".split()
+WORDS = ONES + TENS + "hundred thousand minute minutes second seconds remaining in heat".split()
+
+
+def is_callout(sound):
+    return sound.startswith(PREFIX)
+
+
+def number_words(number):
+    """English words for 0 <= number < 1000000, e.g. 125 -> ["one", "hundred", "twenty", "five"]."""
+    if number >= 1000:
+        thousands, rest = divmod(number, 1000)
+        return number_words(thousands) + ["thousand"] + (number_words(rest) if rest else [])
+    if number >= 100:
+        hundreds, rest = divmod(number, 100)
+        return [ONES[hundreds], "hundred"] + (number_words(rest) if rest else [])
+    if number >= 20:
+        tens, rest = divmod(number, 10)
+        return [TENS[tens - 2]] + ([ONES[rest]] if rest else [])
+    return [ONES[number]]
+
+
+def words(seconds, heat=""):
+    """The announcement for seconds before the finish of heat, e.g. "say:one minute remaining in heat three".
+
+    Whole minutes are read as minutes; the heat is only named if its name ends in a number.
+    """
+    minutes, rest = divmod(seconds, 60)
+    count, unit = (minutes, "minute") if minutes and not rest else (seconds, "second")
+    spoken = number_words(count) + [unit if count == 1 else unit + "s", "remaining"]
+    number = re.search(r"(\d+)\s*$", heat or "")
+    if number and int(number.group(1)) < 1000:
+        spoken += ["in", "heat"] + number_words(int(number.group(1)))
+    return PREFIX + " ".join(spoken)
+
+
+class Announcer:
+    """Decodes word clips on first use and composes announcements from them.
+
+    Clips are loaded through the sound cache when there is one, so each word is trimmed of its
+    leading silence and brought to the same loudness as the others. Runs on the audio worker.
+    """
+
+    def __init__(self, directory, sample_rate, nchannels, cache=None):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.nchannels = nchannels
+        self.cache = cache
+        self.clips = {}
+        self.composed = OrderedDict()
+        import numpy as np
+        self.gap = np.zeros((int(GAP_SECONDS * sample_rate), nchannels), dtype=np.int16)
+
+    def clip_path(self, word):
+        for extension in EXTENSIONS:
+            path = os.path.join(self.directory, word + extension)
+            if os.path.exists(path):
+                return path
+        raise FileNotFoundError(f'No recording of "{word}" in {self.directory}')
+
+    def missing_clips(self, sound):
+        """{word: path} of the recordings sound needs that are not loaded yet; raises FileNotFoundError."""
+        return {word: self.clip_path(word) for word in sound[len(PREFIX):].split() if word not in self.clips}
+
+    def decoded(self, sound):
+        """Whether every word of sound is loaded, so composing it needs no file access."""
+        return all(word in self.clips for word in sound[len(PREFIX):].split())
+
+    def add_clip(self, word, pcm):
+        """Keep a word's recording, loaded elsewhere (e.g. on the sound cache's thread), as 16-bit PCM."""
+        import numpy as np
+        self.clips[word] = np.frombuffer(pcm, dtype=np.int16).reshape(-1, self.nchannels)
+
+    def clip(self, word):
+        samples = self.clips.get(word)
+        if samples is None:
+            import numpy as np
+            path = self.clip_path(word)
+            if self.cache is not None:
+                pcm = self.cache.load(path)
+            else:
+                import miniaudio
+                pcm = miniaudio.decode_file(path,
+                                            output_format=miniaudio.SampleFormat.SIGNED16,
+                                            nchannels=self.nchannels,
+                                            sample_rate=self.sample_rate).samples
+            samples = self.clips[word] = np.frombuffer(pcm, dtype=np.int16).reshape(-1, self.nchannels)
+        return samples
+
+    def compose(self, sound):
+        """The announcement as 16-bit PCM bytes, composed now unless it is still cached."""
+        buffer = self.cached(sound)
+        if buffer is None:
+            import numpy as np
+            parts = []
+            for word in sound[len(PREFIX):].split():
+                parts += [self.clip(word), self.gap]
+            buffer = self.composed[sound] = np.concatenate(parts[:-1]).tobytes() if parts else b""
+            while len(self.composed) > CACHE_SIZE:
+                self.composed.popitem(last=False)
+        return buffer
+
+    def cached(self, sound):
+        """The composed announcement, or None if it has not been composed or has been evicted."""
+        buffer = self.composed.get(sound)
+        if buffer is not None:
+            self.composed.move_to_end(sound)
+        return buffer
+
+
+if __name__ == "__main__":
+    import time
+    from audio import AudioBank, NCHANNELS, SAMPLE_RATE
+
+    directory, seconds, heat = sys.argv[1], int(sys.argv[2]), sys.argv[3] if len(sys.argv) > 3 else ""
+    sound = words(seconds, heat)
+    bank = AudioBank(announcer=Announcer(directory, SAMPLE_RATE, NCHANNELS))
+    started_ns = time.perf_counter_ns()
+    bank.load(sound, sound)
+    print(f"{sound}: composed in {(time.perf_counter_ns() - started_ns) / 1e6:.1f} ms")
+    bank.play(sound)
+    time.sleep(0.2)
+    while bank.active:
+        time.sleep(0.05)
+    bank.close()
@@ -0,0 +1,76 @@
+import logging
+import mmap
+import os
+import struct
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"SCT2"
+STATES = ("running", "warning")
+# magic, state, event_duration, warning_time, start and finish on the monotonic clock, start and
+# finish on the wall clock, heat name, pending cue names joined by commas; followed by a CRC32.
+LAYOUT = struct.Struct("<4sBxxxiiqqqq64s192s")
+CRC = struct.Struct("<I")
+SIZE = LAYOUT.size + CRC.size
+# Within this, the monotonic clock still has the same origin as when the checkpoint was written.
+SAME_CLOCK_TOLERANCE_NS = 1_000_000_000
+
+
+class Checkpoint:
+    """The running heat, kept in a small memory-mapped file so a restarted app can pick it up.
+
+    save() packs the heat into the mapping in place: no write() or fsync on the tick path, and
+    the page cache keeps the data if the app itself crashes. A CRC guards against a half
+    written record. Start and finish are kept on both clocks: the monotonic times are exact
+    but only mean something until a reboot or sleep, the wall-clock ones survive either.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < SIZE:
+                os.ftruncate(fd, SIZE)
+            self.map = mmap.mmap(fd, SIZE)
+        finally:
+            os.close(fd)
+
+    def save(self, state, heat, event_duration, warning_time, start_ns, finish_ns, cues):
+        """Record a running heat; cues are the names of the cues still to sound."""
+        wall_offset_ns = time.time_ns() - time.monotonic_ns()
+        record = LAYOUT.pack(MAGIC, STATES.index(state) + 1,
+                             event_duration, warning_time, start_ns, finish_ns,
+                             start_ns + wall_offset_ns, finish_ns + wall_offset_ns,
+                             (heat or "").encode()[:64], ",".join(cues).encode()[:192])
+        self.map[:SIZE] = record + CRC.pack(zlib.crc32(record))
+
+    def clear(self):
+        self.map[:len(MAGIC)] = bytes(len(MAGIC))
+
+    def load(self):
+        """The saved heat with start_ns and finish_ns on this run's monotonic clock, or None."""
+        record = self.map[:LAYOUT.size]
+        if record[:len(MAGIC)] != MAGIC:
+            return None
+        if CRC.unpack_from(self.map, LAYOUT.size)[0] != zlib.crc32(record):
+            logger.warning(f'Ignoring damaged checkpoint {self.path}')
+            return None
+        (_, state, event_duration, warning_time, start_ns, finish_ns,
+         start_wall_ns, finish_wall_ns, heat, cues) = LAYOUT.unpack(record)
+        wall_offset_ns = time.time_ns() - time.monotonic_ns()
+        if abs(start_wall_ns - start_ns - wall_offset_ns) > SAME_CLOCK_TOLERANCE_NS:
+            # Rebooted or slept since: only the wall-clock times still line up with real time.
+            start_ns = start_wall_ns - wall_offset_ns
+            finish_ns = finish_wall_ns - wall_offset_ns
+        return {"state": STATES[state - 1],
+                "heat": heat.rstrip(b"\0").decode(errors="replace"),
+                "event_duration": event_duration,
+                "warning_time": warning_time,
+                "start_ns": start_ns,
+                "finish_ns": finish_ns,
+                "cues": [cue for cue in cues.rstrip(b"\0").decode().split(",") if cue]}
+
+    def close(self):
+        self.map.close()
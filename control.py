@@ -0,0 +1,273 @@
+"""Local control API for scoring software: start, stop and reset heats and read the clock.
+
+The same protocol is served on a Unix domain socket ("control_socket") and on localhost TCP
+("control_port"). Either speak newline-delimited JSON on a connection kept open:
+
+    {"command": "start", "arena": "North Peak"}
+    {"ok": true, "command": "start", "arena": "North Peak", "state": {...}}
+
+or plain HTTP, one request per connection: "POST /start?arena=North%20Peak", "GET /state".
+The commands are start, stop, reset, start_heats, score, state and ping; arena can be left
+out when the app runs a single timer. score takes a judged wave for the heat on the clock:
+
+    {"command": "score", "surfer": "Kelly", "wave": 3, "score": 7.83}
+
+state answers from the last state each timer published, with remaining_ms worked out from the
+finish time at the moment of the query; the others run on the Tk thread and answer with the
+state straight after the command.
+
+    python control.py --port 8766 --bench 1000     round-trip times against a running app
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Lock, Thread
+from urllib.parse import parse_qs, urlsplit
+
+from scheduler import NS_PER_MS, summarise_ns
+
+logger = logging.getLogger(__name__)
+
+COMMANDS = ("start", "stop", "reset", "start_heats", "score", "state", "ping")
+# How long a command may wait for the Tk thread before the client is told it timed out.
+COMMAND_TIMEOUT = 2.0
+
+
+class ControlError(ValueError):
+    """A control request that cannot be carried out; its message is sent back to the client."""
+
+
+class ControlServer:
+    """Control API server on its own asyncio loop, like the broadcast server.
+
+    submit(function) must run function on the Tk thread soon and may be called from any
+    thread. It may block until Tk takes the request, so it is called from a handoff thread of
+    its own: the loop, and with it state and ping, never waits for Tk. run_command(command,
+    arena, request) is what it runs for every command but state and ping, returning the arena's
+    state afterwards or raising ControlError. request holds the request's other fields and
+    received_ns, when it arrived on the monotonic clock. publish() keeps the states that state
+    queries are answered from, and is safe to call from Tk.
+    """
+
+    def __init__(self, submit, run_command, port=None, socket_path="", host="127.0.0.1"):
+        self.submit = submit
+        self.run_command = run_command
+        self.port = port
+        self.socket_path = socket_path
+        self.host = host
+        self.states = {}
+        self.commands_run = 0
+        self.commands_dropped = 0
+        self.loop = None
+        self.handoff = ThreadPoolExecutor(max_workers=1, thread_name_prefix="control-handoff")
+        self.ready = Event()
+        self.thread = Thread(target=self.run, name="control-server", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        self.ready.wait()
+
+    def run(self):
+        asyncio.run(self.serve())
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        servers = []
+        if self.socket_path:
+            if os.path.exists(self.socket_path):
+                # Left behind by an app that did not exit cleanly.
+                os.remove(self.socket_path)
+            servers.append(await asyncio.start_unix_server(self.handle, self.socket_path))
+            logger.info(f'Control API on unix socket {self.socket_path}')
+        if self.port is not None:
+            server = await asyncio.start_server(self.handle, self.host, self.port)
+            self.port = server.sockets[0].getsockname()[1]
+            servers.append(server)
+            logger.info(f'Control API on http://{self.host}:{self.port}/')
+        self.ready.set()
+        await asyncio.gather(*(server.serve_forever() for server in servers))
+
+    def publish(self, arena, state):
+        """Keep arena's latest state for state queries; called from any thread."""
+        self.states[arena] = dict(state)
+
+    def state(self, arena):
+        state = self.states.get(self.arena_name(arena))
+        if state is None:
+            raise ControlError(f'No arena "{arena}"')
+        state = dict(state)
+        now_ns = time.monotonic_ns()
+        if state.get("running") and state.get("finish_ns") is not None:
+            state["remaining_ms"] = max(state["finish_ns"] - now_ns, 0) // NS_PER_MS
+        state["now_ns"] = now_ns
+        return state
+
+    def arena_name(self, arena):
+        if arena is None and len(self.states) == 1:
+            return next(iter(self.states))
+        return arena or ""
+
+    async def execute(self, command, arena, request):
+        if command not in COMMANDS:
+            raise ControlError(f'Unknown command "{command}", use one of {", ".join(COMMANDS)}')
+        if command == "ping":
+            return {}
+        if command == "state":
+            return {"state": self.state(arena)}
+
+        arena = self.arena_name(arena)
+        reply = self.loop.create_future()
+        # Whichever comes first, the Tk thread starting the command or the timeout, claims it, so
+        # a command the client was told timed out is dropped rather than carried out late.
+        claim = Lock()
+        claimed = []
+
+        def on_tk():
+            with claim:
+                if claimed:
+                    return
+                claimed.append("tk")
+            try:
+                result = self.run_command(command, arena, request)
+            except Exception as error:
+                self.loop.call_soon_threadsafe(reply.set_exception, error)
+            else:
+                self.loop.call_soon_threadsafe(reply.set_result, result)
+
+        self.loop.run_in_executor(self.handoff, self.submit, on_tk).add_done_callback(self.handed_off)
+        try:
+            state = await asyncio.wait_for(asyncio.shield(reply), COMMAND_TIMEOUT)
+        except asyncio.TimeoutError:
+            with claim:
+                timed_out = not claimed
+                claimed.append("timeout")
+            if timed_out:
+                self.commands_dropped += 1
+                raise ControlError(f'{command} timed out waiting for the timer and was not carried out')
+            # Tk started it just in time: it runs to the end, so report what it did.
+            state = await reply
+        self.commands_run += 1
+        return {"state": state}
+
+    def handed_off(self, future):
+        if future.exception() is not None:
+            logger.error(f'Could not hand a control command to the timer: {future.exception()!r}')
+
+    async def answer(self, command, arena, request):
+        try:
+            body = await self.execute(command, arena, request)
+            body.update(ok=True, command=command, arena=arena)
+        except ControlError as error:
+            body = {"ok": False, "command": command, "arena": arena, "error": str(error)}
+        except Exception as error:
+            logger.exception(f'Control command {command} failed')
+            body = {"ok": False, "command": command, "arena": arena, "error": repr(error)}
+        return body
+
+    async def handle(self, reader, writer):
+        try:
+            line = await reader.readline()
+            if line.split(None, 1)[:1] in ([b"GET"], [b"POST"]):
+                await self.handle_http(line, reader, writer)
+                return
+            while line:
+                received_ns = time.monotonic_ns()
+                try:
+                    request = json.loads(line)
+                    command, arena = request.pop("command"), request.pop("arena", None)
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    body = {"ok": False, "error": 'Send one JSON object per line, e.g. {"command": "state"}'}
+                else:
+                    body = await self.answer(command, arena, dict(request, received_ns=received_ns))
+                writer.write(json.dumps(body, separators=(",", ":")).encode() + b"\n")
+                line = await reader.readline()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def handle_http(self, request_line, reader, writer):
+        received_ns = time.monotonic_ns()
+        # Headers are read and ignored; the fields of a command are in the query string.
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass
+        parts = request_line.decode("latin-1").split()
+        if len(parts) < 2:
+            body = {"ok": False, "error": 'Send a request line such as "GET /state HTTP/1.1"'}
+            status = "400 Bad Request"
+        else:
+            method, target = parts[:2]
+            url = urlsplit(target)
+            command = url.path.strip("/")
+            request = {name: values[0] for name, values in parse_qs(url.query).items()}
+            arena = request.pop("arena", None)
+            if method == "GET" and command not in ("state", "ping"):
+                body, status = {"ok": False, "error": f'Use POST for {command}'}, "405 Method Not Allowed"
+            else:
+                body = await self.answer(command, arena, dict(request, received_ns=received_ns))
+                status = "200 OK" if body["ok"] else "400 Bad Request"
+        payload = json.dumps(body, separators=(",", ":")).encode()
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode() + payload)
+
+    def stats(self):
+        return {"commands_run": self.commands_run, "commands_dropped": self.commands_dropped}
+
+
+def connect(port=None, socket_path=""):
+    if socket_path:
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.connect(socket_path)
+    else:
+        client = socket.create_connection(("127.0.0.1", port))
+        client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return client
+
+
+def bench(client, commands, count):
+    """Round trips of count requests cycling through commands on one connection, in ns."""
+    reader = client.makefile("rb")
+    round_trips_ns = {command: [] for command in commands}
+    for index in range(count):
+        command = commands[index % len(commands)]
+        started_ns = time.perf_counter_ns()
+        client.sendall(json.dumps({"command": command}).encode() + b"\n")
+        reply = json.loads(reader.readline())
+        round_trips_ns[command].append(time.perf_counter_ns() - started_ns)
+        if not reply["ok"]:
+            raise SystemExit(f'{command}: {reply["error"]}')
+    return {command: summarise_ns(samples) for command, samples in round_trips_ns.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, help="control_port of the running app")
+    parser.add_argument("--socket", default="", help="control_socket of the running app")
+    parser.add_argument("--bench", type=int, metavar="N", help="time N start/stop round trips")
+    parser.add_argument("command", nargs="?", default="state", choices=COMMANDS)
+    parser.add_argument("--arena")
+    args = parser.parse_args()
+    if args.port is None and not args.socket:
+        parser.error("give --port or --socket")
+
+    client = connect(args.port, args.socket)
+    if args.bench:
+        print(f"{'command':<8} {'count':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  (ms)")
+        for command, stats in bench(client, ("start", "stop", "state"), args.bench).items():
+            print(f"{command:<8} {stats['count']:>6} {stats['p50_ms']:>8.3f} {stats['p95_ms']:>8.3f} "
+                  f"{stats['p99_ms']:>8.3f} {stats['max_ms']:>8.3f}")
+        client.sendall(b'{"command": "reset"}\n')
+        client.makefile("rb").readline()
+    else:
+        client.sendall(json.dumps({"command": args.command, "arena": args.arena}).encode() + b"\n")
+        print(client.makefile("rb").readline().decode().strip())
+    client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+from tkinter import CENTER, Canvas, Frame, Label, PhotoImage, Toplevel, font as tkfont
+
+# Lit segments of each seven-segment character:
+#    a
+#  f   b
+#    g
+#  e   c
+#    d
+SEGMENTS = {"0": "abcdef", "1": "bc", "2": "abdeg", "3": "abcdg", "4": "bcfg", "5": "acdfg",
+            "6": "acdefg", "7": "abc", "8": "abcdefg", "9": "abcdfg", "-": "g", " ": ""}
+UNLIT_SEGMENT = "#1c1c1c"
+
+
+class GlyphText:
+    """Text drawn on a Canvas as one item per character.
+
+    Changing the text only reconfigures the characters that differ, so a countdown that changes
+    its last digit many times a second costs one item update per frame. Offers the same
+    update(text=..., fg=...) call as render.WidgetView so either can display the countdown.
+    """
+
+    def __init__(self, parent, font, fg, counter, widest_text="Event Finished"):
+        self.font = tkfont.Font(font=font)
+        self.counter = counter
+        self.fg = fg
+        self.text = ""
+        self.items = []
+        self.positions = []
+        width = self.font.measure(widest_text) + 20
+        height = self.font.metrics("linespace") + 10
+        self.canvas = Canvas(parent, width=width, height=height, highlightthickness=0)
+        self.centre = (width // 2, height // 2)
+
+    def grid(self, **options):
+        self.canvas.grid(**options)
+
+    def layout(self, text):
+        """x position of the centre of every character, with the whole text centred."""
+        widths = [self.font.measure(char) for char in text]
+        x = self.centre[0] - sum(widths) / 2
+        positions = []
+        for width in widths:
+            positions.append(x + width / 2)
+            x += width
+        return positions
+
+    def update(self, text=None, fg=None):
+        if fg is not None and fg != self.fg:
+            self.fg = fg
+            for item in self.items:
+                self.canvas.itemconfigure(item, fill=fg)
+            self.counter.add()
+        if text is None or text == self.text:
+            return
+
+        positions = self.layout(text)
+        if len(text) != len(self.text):
+            for item in self.items:
+                self.canvas.delete(item)
+            self.items = [self.canvas.create_text(x, self.centre[1], text=char, font=self.font, fill=self.fg)
+                          for x, char in zip(positions, text)]
+        else:
+            for item, x, old_x, char, old_char in zip(self.items, positions, self.positions, text, self.text):
+                if char != old_char:
+                    self.canvas.itemconfigure(item, text=char)
+                if x != old_x:
+                    self.canvas.coords(item, x, self.centre[1])
+        self.text = text
+        self.positions = positions
+        self.counter.add()
+
+
+class SevenSegmentGlyphs:
+    """Seven-segment characters rasterised into PhotoImages once per (height, colour) and reused."""
+
+    def __init__(self, master, background="black"):
+        self.master = master
+        self.background = background
+        self.cache = {}
+
+    def glyph(self, char, height, colour):
+        key = (char, height, colour)
+        image = self.cache.get(key)
+        if image is None:
+            image = self.cache[key] = self.render(char, height, colour)
+        return image
+
+    def rgb(self, colour):
+        # PhotoImage.put() needs #rrggbb, not Tk colour names such as "dark green".
+        red, green, blue = self.master.winfo_rgb(colour)
+        return f"#{red >> 8:02x}{green >> 8:02x}{blue >> 8:02x}"
+
+    def render(self, char, height, colour):
+        thickness = max(height // 10, 2)
+        width = thickness * 3 if char in ":." else height * 11 // 20
+        image = PhotoImage(master=self.master, width=width + thickness, height=height)
+        image.put(self.rgb(self.background), to=(0, 0, width + thickness, height))
+        lit = self.rgb(colour)
+        # Glyphs are drawn with a thickness-wide gap on the right to space the characters.
+        if char == ":":
+            for centre in (height // 3, height * 2 // 3):
+                image.put(lit, to=(thickness, centre - thickness // 2, thickness * 2, centre + thickness - thickness // 2))
+            return image
+        if char == ".":
+            image.put(lit, to=(thickness, height - thickness, thickness * 2, height))
+            return image
+
+        half = height // 2
+        boxes = {"a": (thickness, 0, width - thickness, thickness),
+                 "b": (width - thickness, thickness, width, half),
+                 "c": (width - thickness, half, width, height - thickness),
+                 "d": (thickness, height - thickness, width - thickness, height),
+                 "e": (0, half, thickness, height - thickness),
+                 "f": (0, thickness, thickness, half),
+                 "g": (thickness, half - thickness // 2, width - thickness, half + thickness - thickness // 2)}
+        lit_segments = SEGMENTS.get(char, "")
+        for segment, box in boxes.items():
+            image.put(lit if segment in lit_segments else UNLIT_SEGMENT, to=box)
+        return image
+
+
+class ScoreboardWindow:
+    """Chrome-free full-screen window for a projector: a seven-segment countdown and a heat info line.
+
+    Each character of the countdown is its own Label, and a new text only swaps the images of
+    the characters that changed. Glyphs are re-rasterised only when the window size changes.
+    Offers the same update(text=..., fg=...) call as render.WidgetView. Escape hides the window.
+    """
+
+    def __init__(self, master, counter, fg="white", geometry=""):
+        self.window = Toplevel(master, bg="black")
+        if geometry:
+            # e.g. "+1920+0" to open on a second screen before going full screen.
+            self.window.geometry(geometry)
+        self.window.attributes("-fullscreen", True)
+        self.counter = counter
+        self.glyphs = SevenSegmentGlyphs(self.window)
+        self.fg = fg
+        self.text = ""
+        self.digit_height = 0
+        self.slots = []
+
+        self.digits_frame = Frame(self.window, bg="black")
+        self.digits_frame.place(relx=0.5, rely=0.45, anchor=CENTER)
+        self.info_label = Label(self.window, bg="black", fg="white", font=("Helvetica", 48))
+        self.info_label.place(relx=0.5, rely=0.88, anchor=CENTER)
+
+        self.window.bind("<Configure>", self.on_resize)
+        self.window.bind("<Escape>", lambda event: self.window.withdraw())
+
+    def show(self):
+        self.window.deiconify()
+
+    def show_info(self, text):
+        if self.info_label.cget("text") != text:
+            self.info_label.configure(text=text)
+            self.counter.add()
+
+    def update(self, text=None, fg=None):
+        if text is not None and any(char not in SEGMENTS and char not in ":." for char in text):
+            # Words such as "Event Finished" go on the info line and the digits show dashes.
+            self.show_info(text)
+            text = "".join("-" if char.isdigit() else char for char in self.text)
+        if fg is not None and fg != self.fg:
+            self.fg = fg
+            self.draw(self.text, redraw=True)
+        if text is not None and text != self.text:
+            self.draw(text, redraw=len(text) != len(self.text))
+
+    def draw(self, text, redraw=False):
+        if not self.digit_height:
+            # Not mapped yet; on_resize draws the text once the window has a size.
+            self.text = text
+            return
+        if len(self.slots) != len(text):
+            for slot in self.slots:
+                slot.destroy()
+            self.slots = [Label(self.digits_frame, bg="black", borderwidth=0) for _ in text]
+            for column, slot in enumerate(self.slots):
+                slot.grid(row=0, column=column)
+        for slot, char, old_char in zip(self.slots, text, self.text.ljust(len(text))):
+            if redraw or char != old_char:
+                slot.configure(image=self.glyphs.glyph(char, self.digit_height, self.fg))
+                self.counter.add()
+        self.text = text
+
+    def on_resize(self, event):
+        if event.widget is not self.window:
+            return
+        # Fill 60% of the height, or the width if the countdown is long.
+        chars = max(len(self.text), 5)
+        height = int(min(event.height * 0.6, event.width * 0.9 / chars / 0.65))
+        if height > 0 and height != self.digit_height:
+            self.digit_height = height
+            self.draw(self.text, redraw=True)
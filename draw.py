@@ -0,0 +1,242 @@
+"""Heat draws for a division: seeded rounds of 2, 3 or 4 surfer heats, filled in from results.
+
+Entrants are listed best seed first. Each round's field is spread over its heats in snake order,
+so with H heats, heat 1 gets seeds 1, 2H, 2H+1, ... and heat H gets seeds H, H+1, 3H, ..., and the
+top `advance` of each heat go through to the next round. Where they go is fixed when the draw is
+made: the winners of a round are its best seeds, heat by heat, then the runners-up starting half
+way down the heats, so the two from a heat are usually split up in the next round. The whole
+bracket is drawn at once and a result only fills in names.
+
+A heat with no more surfers than go through is a bye: it is not run and its surfers advance in
+seed order.
+
+    python draw.py entrants.txt --heat-size 4 --advance 2 --duration 1200    prints the draw and its timings
+"""
+import argparse
+import datetime
+
+from heats import Heat
+
+HEAT_SIZES = (2, 3, 4)
+ORDINALS = {1: "1st", 2: "2nd", 3: "3rd"}
+# The last rounds are named after what they are; earlier ones are numbered.
+ROUND_NAMES = ("Final", "Semifinal", "Quarterfinal")
+
+
+class DrawError(ValueError):
+    """A draw that cannot be made, or a result that does not fit it."""
+
+
+def snake(seed, heats):
+    """Index of the heat that seed (0 is the top seed) is drawn into, out of heats."""
+    lap, position = divmod(seed, heats)
+    return position if lap % 2 == 0 else heats - 1 - position
+
+
+class DrawHeat:
+    def __init__(self, name, round_number, advance):
+        self.name = name
+        self.round = round_number
+        # Who fills each place in the heat: a surfer's name, or for a place still to be won, the
+        # heat and finishing place it comes from, e.g. "Round 1 Heat 3 2nd".
+        self.slots = []
+        self.surfers = []
+        self.advance = advance
+        # Where each of the first `advance` places goes on to: [(heat, slot index), ...].
+        self.feeds = []
+        self.placings = None
+
+    @property
+    def bye(self):
+        return len(self.slots) <= self.advance
+
+    @property
+    def drawn(self):
+        """Whether every surfer in the heat is known."""
+        return None not in self.surfers
+
+    def entrants(self):
+        """The heat's surfers, with the place each unknown one comes from in their stead."""
+        return [surfer or slot for surfer, slot in zip(self.surfers, self.slots)]
+
+
+class Draw:
+    """The heats of every round of a division, from the first round to the final.
+
+    Building the draw and taking a result are both linear in what they touch: a result fills
+    in the few places it decides, so advancing a heat costs the same in a field of 8 or 800.
+    """
+
+    def __init__(self, entrants, heat_size=4, advance=2, division=""):
+        entrants = [str(name).strip() for name in entrants if str(name).strip()]
+        if heat_size not in HEAT_SIZES:
+            raise DrawError(f'Heats must have {", ".join(map(str, HEAT_SIZES))} surfers, not {heat_size}')
+        if not 1 <= advance <= heat_size // 2:
+            raise DrawError(f'From heats of {heat_size}, between 1 and {heat_size // 2} can advance, not {advance}')
+        if len(entrants) < 2:
+            raise DrawError('A draw needs at least two entrants')
+        if len(set(entrants)) != len(entrants):
+            duplicates = sorted({name for name in entrants if entrants.count(name) > 1})
+            raise DrawError(f'Entrants are listed twice: {", ".join(duplicates)}')
+        self.heat_size = heat_size
+        self.advance = advance
+        self.division = division
+        self.rounds = []
+        self.heats = {}
+        self.build(len(entrants))
+        for seed, name in enumerate(entrants):
+            heat_index, slot = self.first_round_slots[seed]
+            self.fill(self.rounds[0][heat_index], slot, name)
+
+    def round_sizes(self, field):
+        """[(field, heats), ...] for every round, the final last."""
+        sizes = []
+        while True:
+            heats = -(-field // self.heat_size)
+            sizes.append((field, heats))
+            if heats == 1:
+                return sizes
+            # Heat sizes differ by at most one; a heat of fewer than advance sends everyone through.
+            small, large = divmod(field, heats)
+            field = sum(min(small + (index < large), self.advance) for index in range(heats))
+
+    def round_name(self, round_number, rounds):
+        from_last = rounds - round_number
+        return ROUND_NAMES[from_last] if from_last < len(ROUND_NAMES) else f"Round {round_number}"
+
+    def build(self, field):
+        sizes = self.round_sizes(field)
+        seeds = None
+        for round_number, (field, heats) in enumerate(sizes, 1):
+            name = " ".join(part for part in (self.division, self.round_name(round_number, len(sizes))) if part)
+            heats_of_round = [DrawHeat(name if heats == 1 else f"{name} Heat {index}", round_number, self.advance)
+                              for index in range(1, heats + 1)]
+            self.rounds.append(heats_of_round)
+            # (heat index, slot) each seed of the round is drawn into.
+            slots = []
+            for seed in range(field):
+                heat_index = snake(seed, heats)
+                heat = heats_of_round[heat_index]
+                slots.append((heat_index, len(heat.slots)))
+                heat.slots.append(seeds[seed] if seeds else "")
+                heat.surfers.append(None)
+            if seeds is None:
+                self.first_round_slots = slots
+            else:
+                for seed, (heat_index, slot) in enumerate(slots):
+                    source, place = self.sources[seed]
+                    source.feeds[place] = (heats_of_round[heat_index], slot)
+            for heat in heats_of_round:
+                self.heats[heat.name] = heat
+            if heats == 1:
+                heats_of_round[0].advance = 0
+                break
+            seeds, self.sources = self.advancing(heats_of_round)
+
+    def advancing(self, heats_of_round):
+        """Labels and (heat, place) of the next round's seeds, best first.
+
+        Winners rank ahead of runners-up, both in heat order, except that the runners-up start
+        half way down, so a winner and the runner-up from the same heat are snaked apart.
+        """
+        count = len(heats_of_round)
+        ranked = []
+        for index, heat in enumerate(heats_of_round):
+            for place in range(min(len(heat.slots), heat.advance)):
+                rank = place * count + (index + place * (count // 2)) % count
+                ranked.append((rank, heat, place))
+            heat.feeds = [None] * min(len(heat.slots), heat.advance)
+        ranked.sort(key=lambda entry: entry[0])
+        labels = [f"{heat.name} {ORDINALS[place + 1]}" for _, heat, place in ranked]
+        return labels, [(heat, place) for _, heat, place in ranked]
+
+    def fill(self, heat, slot, name):
+        heat.surfers[slot] = name
+        if heat.bye and heat.drawn:
+            self.advance_heat(heat, list(heat.surfers))
+
+    def result(self, name, placings):
+        """Record heat name's finishing order (surfer names, winner first) and advance its qualifiers.
+
+        Returns the heats of the next round that the result filled in. A heat can be resulted
+        again, e.g. after a judges' review, until the heat it fed has a result of its own.
+        """
+        heat = self.heats.get(name)
+        if heat is None:
+            raise DrawError(f'No heat "{name}" in the draw')
+        if not heat.drawn:
+            waiting = [slot for surfer, slot in zip(heat.surfers, heat.slots) if surfer is None]
+            raise DrawError(f'{name} is still waiting for {", ".join(waiting)}')
+        placings = [str(surfer) for surfer in placings]
+        strangers = [surfer for surfer in placings if surfer not in heat.surfers]
+        if strangers:
+            raise DrawError(f'{", ".join(strangers)} did not surf {name}')
+        if len(set(placings)) != len(placings):
+            raise DrawError(f'A surfer is placed twice in {name}')
+        if len(placings) < len(heat.feeds):
+            raise DrawError(f'{name} needs at least its top {len(heat.feeds)} placed')
+        decided = [target for target, _ in heat.feeds if target.placings is not None]
+        if decided:
+            raise DrawError(f'{decided[0].name} already has a result; {name} can no longer change')
+        return self.advance_heat(heat, placings)
+
+    def advance_heat(self, heat, placings):
+        heat.placings = placings
+        filled = []
+        for (target, slot), surfer in zip(heat.feeds, placings):
+            self.fill(target, slot, surfer)
+            filled.append(target)
+        return filled
+
+    def winner(self):
+        final = self.rounds[-1][0]
+        return final.placings[0] if final.placings else None
+
+    def running_order(self):
+        """Every heat that is run, round by round; byes are left out."""
+        return [heat for heats in self.rounds for heat in heats if not heat.bye]
+
+    def queue_heats(self, event_duration, warning_time, sounds):
+        """The draw as Heats for a HeatQueue, in running order, each with the surfers known so far."""
+        return [Heat(heat.name, event_duration, warning_time, sounds, [surfer for surfer in heat.surfers if surfer])
+                for heat in self.running_order()]
+
+    def surfers(self, name):
+        """The surfers known so far for heat name."""
+        return [surfer for surfer in self.heats[name].surfers if surfer]
+
+
+def read_entrants(path):
+    """Entrant names from a text file, one per line, best seed first; blank lines and # comments skipped."""
+    with open(path, encoding="utf-8") as file:
+        return [line.split("#", 1)[0].strip() for line in file if line.split("#", 1)[0].strip()]
+
+
+def main():
+    import time
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("entrants", help="text file with one entrant per line, best seed first")
+    parser.add_argument("--heat-size", type=int, default=4, choices=HEAT_SIZES)
+    parser.add_argument("--advance", type=int, default=2)
+    parser.add_argument("--division", default="")
+    parser.add_argument("--duration", type=int, default=1200, help="heat length in seconds")
+    parser.add_argument("--changeover", type=int, default=0, help="seconds between heats")
+    parser.add_argument("--start", default="08:00", help="time of the first horn, HH:MM")
+    args = parser.parse_args()
+
+    started_ns = time.perf_counter_ns()
+    try:
+        draw = Draw(read_entrants(args.entrants), args.heat_size, args.advance, args.division)
+    except DrawError as error:
+        raise SystemExit(error)
+    elapsed_ms = (time.perf_counter_ns() - started_ns) / 1e6
+    start = datetime.datetime.combine(datetime.date.today(), datetime.time.fromisoformat(args.start))
+    for heat in draw.running_order():
+        finish = start + datetime.timedelta(seconds=args.duration)
+        print(f'{start:%H:%M} - {finish:%H:%M}  {heat.name:<32} {", ".join(heat.entrants())}')
+        start = finish + datetime.timedelta(seconds=args.changeover)
+    print(f'{len(draw.running_order())} heats in {len(draw.rounds)} rounds, drawn in {elapsed_ms:.1f} ms')
+
+
+if __name__ == "__main__":
+    main()
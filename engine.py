@@ -0,0 +1,227 @@
+import time
+from bisect import bisect_right
+
+from scheduler import NS_PER_SEC, TickScheduler, remaining_seconds
+
+IDLE = "idle"
+RUNNING = "running"
+WARNING = "warning"
+FINISHED = "finished"
+STOPPED = "stopped"
+
+EVENTS = ("start", "resume", "tick", "cue", "late_cue", "warning", "finish", "stop", "reset")
+# A cue fired more than this after its deadline is reported to the late_cue listeners.
+LATE_CUE_NS = 20_000_000
+# Cue points are named after the seconds left when they sound, e.g. "T-60".
+CUE_POINT_PREFIX = "T-"
+
+
+def cue_point(seconds):
+    return f"{CUE_POINT_PREFIX}{seconds}"
+
+
+class TimerEngine:
+    """Tk-free heat countdown: state machine, tick deadlines and horn cues.
+
+    States run idle -> running -> warning -> finished, with stop possible from running or
+    warning and reset returning any state to idle. Listeners subscribe to EVENTS:
+
+      start()                    countdown started
+      resume(missed_cues)        countdown picked up from an earlier run, see resume()
+      tick(remaining_seconds)    a whole second boundary was reached
+      cue(name)                  a horn ("start", "warning", "ending" or a cue point) is due
+      late_cue(name, late_ns)    name fired more than LATE_CUE_NS after its deadline
+      warning(remaining_seconds) the warning period was entered
+      finish()                   the countdown reached zero
+      stop() / reset()
+
+    Besides the start, warning and ending horns, a heat can have any number of cue points
+    (seconds before the finish, e.g. 300, 60, 10), each sounding as cue "T-<seconds>".
+
+    Nothing here sleeps or schedules: the owner calls poll() at (or after) the time returned by
+    next_deadline_ns(), so the engine runs equally under Tk's after() or a simulated clock.
+    A heat's cues are kept as a sorted list of deadlines and an index of the next one due, so
+    poll() finds everything that fell due since the last call with one bisect; however late
+    or irregular the polls, each cue fires exactly once.
+    """
+
+    def __init__(self, event_duration, warning_time, clock=time.monotonic_ns, cue_lead=None, cue_points=()):
+        self.event_duration = event_duration
+        self.warning_time = warning_time
+        self.cue_points = tuple(cue_points)
+        self.clock = clock
+        # cue_lead(name) -> ns a horn must be triggered ahead of its boundary to be heard on it.
+        self.cue_lead = cue_lead or (lambda cue: 0)
+        self.ticker = TickScheduler(clock)
+        self.state = IDLE
+        self.start_ns = None
+        self.finish_ns = None
+        self.tick_deadline_ns = None
+        # Parallel lists sorted by deadline; cue_deadlines[next_cue:] are still to fire.
+        self.cue_deadlines = []
+        self.cue_names = []
+        self.next_cue = 0
+        self.listeners = {event: [] for event in EVENTS}
+
+    @property
+    def running(self):
+        return self.state in (RUNNING, WARNING)
+
+    @property
+    def pending_cues(self):
+        """(deadline_ns, name) of every cue still to fire, earliest first."""
+        return list(zip(self.cue_deadlines[self.next_cue:], self.cue_names[self.next_cue:]))
+
+    def arm_cues(self, cues):
+        deadlines = sorted((self.cue_deadline_ns(cue), cue) for cue in cues)
+        self.cue_deadlines = [deadline_ns for deadline_ns, _ in deadlines]
+        self.cue_names = [cue for _, cue in deadlines]
+        self.next_cue = 0
+
+    def subscribe(self, event, callback):
+        self.listeners[event].append(callback)
+
+    def emit(self, event, *args):
+        for callback in self.listeners[event]:
+            callback(*args)
+
+    def configure(self, event_duration, warning_time, cue_points=None):
+        """Change the timings used by the next start(); cue_points None keeps the current ones."""
+        self.event_duration = event_duration
+        self.warning_time = warning_time
+        if cue_points is not None:
+            self.cue_points = tuple(cue_points)
+
+    def start(self, start_ns=None, start_cue=True):
+        """Start the countdown now, or at start_ns when it is given.
+
+        Started now, the start horn sounds immediately and the countdown begins once it is
+        actually audible. With start_ns the start horn is armed like any other cue, and
+        start_cue=False leaves it out (e.g. when the previous finish horn doubles as the start).
+        """
+        if self.running:
+            self.stop()
+        cues = ["ending"]
+        if 0 < self.warning_time < self.event_duration:
+            cues.append("warning")
+        cues.extend(cue_point(seconds) for seconds in set(self.cue_points) if 0 < seconds < self.event_duration)
+        sound_start_now = start_ns is None and start_cue
+        if start_ns is None:
+            start_ns = self.clock() + self.cue_lead("start")
+        elif start_cue:
+            cues.append("start")
+        self.start_ns = self.ticker.start(start_ns)
+        self.finish_ns = self.start_ns + self.event_duration * NS_PER_SEC
+        self.arm_cues(cues)
+        self.tick_deadline_ns = self.ticker.next_deadline_ns()
+
+        self.state = RUNNING
+        self.emit("start")
+        if sound_start_now:
+            self.emit("cue", "start")
+
+    def resume(self, start_ns, cues, now_ns=None):
+        """Pick up a countdown that began at start_ns before the app was restarted.
+
+        cues are the names of the cues that were still pending when it was saved; the others
+        already sounded and are not armed again. Pending cues whose time passed while the app
+        was down are dropped rather than sounded late, and are passed to the resume listeners.
+        Returns False, leaving the engine as it was, if the countdown would already be over.
+        """
+        now_ns = self.clock() if now_ns is None else now_ns
+        finish_ns = start_ns + self.event_duration * NS_PER_SEC
+        if finish_ns <= now_ns:
+            return False
+        if self.running:
+            self.stop()
+        self.start_ns = self.ticker.start(start_ns)
+        self.finish_ns = finish_ns
+        self.arm_cues(cues)
+        self.next_cue = bisect_right(self.cue_deadlines, now_ns)
+        missed = self.cue_names[:self.next_cue]
+        self.tick_deadline_ns = self.ticker.next_deadline_ns(now_ns)
+        warning = start_ns <= now_ns and remaining_seconds(finish_ns, now_ns) <= self.warning_time
+        self.state = WARNING if warning else RUNNING
+        self.emit("resume", missed)
+        return True
+
+    def cue_deadline_ns(self, cue):
+        """When cue has to be triggered to be heard on its boundary."""
+        if cue == "start":
+            boundary_ns = self.start_ns
+        elif cue == "warning":
+            boundary_ns = self.finish_ns - self.warning_time * NS_PER_SEC
+        elif cue.startswith(CUE_POINT_PREFIX):
+            boundary_ns = self.finish_ns - int(cue[len(CUE_POINT_PREFIX):]) * NS_PER_SEC
+        else:
+            boundary_ns = self.finish_ns
+        return boundary_ns - self.cue_lead(cue)
+
+    def next_deadline_ns(self):
+        """Monotonic time poll() next has work to do, or None when the countdown is not running."""
+        if not self.running:
+            return None
+        if self.next_cue < len(self.cue_deadlines) and self.cue_deadlines[self.next_cue] < self.tick_deadline_ns:
+            return self.cue_deadlines[self.next_cue]
+        return self.tick_deadline_ns
+
+    def poll(self, now_ns=None):
+        """Fire every cue and tick due by now_ns and return the next deadline."""
+        if not self.running:
+            return None
+        now_ns = self.clock() if now_ns is None else now_ns
+
+        deadlines, names = self.cue_deadlines, self.cue_names
+        due = bisect_right(deadlines, now_ns, lo=self.next_cue)
+        # Stops early if a listener stopped or restarted the heat, which replaces the lists.
+        while self.next_cue < due and self.cue_deadlines is deadlines:
+            index = self.next_cue
+            self.next_cue += 1
+            self.emit("cue", names[index])
+            late_ns = now_ns - deadlines[index]
+            if late_ns > LATE_CUE_NS:
+                self.emit("late_cue", names[index], late_ns)
+
+        if now_ns >= self.tick_deadline_ns:
+            self.ticker.record_tick(now_ns)
+            remaining = remaining_seconds(self.finish_ns, now_ns)
+            if remaining <= 0:
+                self.state = FINISHED
+                self.emit("finish")
+                # A finish listener may already have started the next heat.
+                return self.next_deadline_ns()
+            if remaining <= self.warning_time and self.state == RUNNING:
+                self.state = WARNING
+                self.emit("warning", remaining)
+            self.emit("tick", remaining)
+            self.tick_deadline_ns = self.ticker.next_deadline_ns(now_ns)
+
+        return self.next_deadline_ns()
+
+    def remaining_seconds(self, now_ns=None):
+        if self.finish_ns is None:
+            return self.event_duration
+        now_ns = self.clock() if now_ns is None else now_ns
+        return max(remaining_seconds(self.finish_ns, now_ns), 0)
+
+    def remaining_ns(self, now_ns=None):
+        if self.finish_ns is None:
+            return self.event_duration * NS_PER_SEC
+        now_ns = self.clock() if now_ns is None else now_ns
+        return max(self.finish_ns - now_ns, 0)
+
+    def stop(self):
+        if not self.running:
+            return
+        self.cue_deadlines = []
+        self.cue_names = []
+        self.next_cue = 0
+        self.state = STOPPED
+        self.emit("stop")
+
+    def reset(self):
+        self.stop()
+        self.start_ns = None
+        self.finish_ns = None
+        self.state = IDLE
+        self.emit("reset")
@@ -0,0 +1,143 @@
+import time
+
+from scheduler import NS_PER_SEC
+
+QUEUE_EVENTS = ("heat", "change")
+
+
+class Heat:
+    """One heat of the day: its timings, the sound file played for each cue and who surfs it."""
+
+    def __init__(self, name, event_duration, warning_time, sounds, surfers=()):
+        self.name = name
+        self.event_duration = event_duration
+        self.warning_time = warning_time
+        # {"start": path, "warning": path, "ending": path}
+        self.sounds = dict(sounds)
+        # Listed on the leaderboard from the start; anyone else appears with their first score.
+        self.surfers = list(surfers)
+        self.done = False
+
+
+class HeatQueue:
+    """Ordered heats run back to back on a TimerEngine.
+
+    When a heat finishes the next one is started on the engine straight away, with its start
+    set to the previous finish plus changeover_time. With no changeover the finish horn doubles
+    as the next start horn, so there is no gap at all between heats. Every heat is started with
+    the queue's cue_points, so cue points changed while a heat is on the clock apply from the
+    next one; None leaves the engine's own.
+
+    Listeners subscribe to QUEUE_EVENTS: heat(heat) just before a heat is started on the engine,
+    and change() whenever the list of heats or its timeline changes.
+    """
+
+    def __init__(self, engine, changeover_time=0, clock=time.monotonic_ns, cue_points=None):
+        self.engine = engine
+        self.changeover_time = changeover_time
+        self.cue_points = cue_points
+        self.clock = clock
+        self.heats = []
+        self.current = None
+        self.listeners = {event: [] for event in QUEUE_EVENTS}
+        engine.subscribe("finish", self.on_finish)
+
+    def subscribe(self, event, callback):
+        self.listeners[event].append(callback)
+
+    def emit(self, event, *args):
+        for callback in self.listeners[event]:
+            callback(*args)
+
+    def add(self, heat, index=None):
+        self.heats.insert(len(self.heats) if index is None else index, heat)
+        self.emit("change")
+
+    def extend(self, heats):
+        """Queue several heats at the end, e.g. a whole draw, with a single change."""
+        self.heats.extend(heats)
+        self.emit("change")
+
+    def remove(self, index):
+        """Delete a heat, unless it is the one on the clock. Returns whether it was removed."""
+        if self.heats[index] is self.current and self.engine.running:
+            return False
+        del self.heats[index]
+        self.emit("change")
+        return True
+
+    def move(self, index, new_index):
+        self.heats.insert(new_index, self.heats.pop(index))
+        self.emit("change")
+
+    def set_changeover(self, changeover_time):
+        self.changeover_time = changeover_time
+        self.emit("change")
+
+    def set_cue_points(self, cue_points):
+        self.cue_points = cue_points
+
+    def next_heat(self):
+        for heat in self.heats:
+            if not heat.done and heat is not self.current:
+                return heat
+        return None
+
+    def start(self):
+        """Start the first heat that has not been run yet."""
+        self.current = None
+        heat = self.next_heat()
+        if heat is not None:
+            self.begin(heat)
+
+    def begin(self, heat, start_ns=None, start_cue=True):
+        self.current = heat
+        self.engine.configure(heat.event_duration, heat.warning_time, self.cue_points)
+        self.emit("heat", heat)
+        self.engine.start(start_ns, start_cue)
+        self.emit("change")
+
+    def resume(self, heat, start_ns, cues):
+        """Put a heat saved before a restart back on the clock; see TimerEngine.resume()."""
+        self.heats.insert(0, heat)
+        self.current = heat
+        self.engine.configure(heat.event_duration, heat.warning_time, self.cue_points)
+        self.emit("heat", heat)
+        if not self.engine.resume(start_ns, cues):
+            heat.done = True
+            self.current = None
+        self.emit("change")
+        return heat is self.current
+
+    def on_finish(self):
+        if self.current is None:
+            return
+        self.current.done = True
+        heat = self.next_heat()
+        if heat is None:
+            self.current = None
+            self.emit("change")
+            return
+        start_ns = self.engine.finish_ns + self.changeover_time * NS_PER_SEC
+        self.begin(heat, start_ns, start_cue=self.changeover_time > 0)
+
+    def stop(self):
+        """Stop advancing; the heat on the clock is left to the engine."""
+        self.current = None
+        self.emit("change")
+
+    def timeline(self, now_ns=None):
+        """Planned (heat, start_ns, finish_ns) for the heat on the clock and every heat not yet run."""
+        now_ns = self.clock() if now_ns is None else now_ns
+        plan = []
+        next_start_ns = now_ns
+        if self.current is not None and self.engine.running:
+            plan.append((self.current, self.engine.start_ns, self.engine.finish_ns))
+            next_start_ns = self.engine.finish_ns + self.changeover_time * NS_PER_SEC
+        for heat in self.heats:
+            if heat.done or heat is self.current:
+                continue
+            finish_ns = next_start_ns + heat.event_duration * NS_PER_SEC
+            plan.append((heat, next_start_ns, finish_ns))
+            next_start_ns = finish_ns + self.changeover_time * NS_PER_SEC
+        return plan
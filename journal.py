@@ -0,0 +1,87 @@
+import json
+import logging
+import os
+import time
+from queue import Empty, SimpleQueue
+from threading import Thread
+
+logger = logging.getLogger(__name__)
+
+# fsync policies: after every batch, at most every FSYNC_INTERVAL seconds, or left to the OS.
+FSYNC_ALWAYS = "always"
+FSYNC_INTERVAL = "interval"
+FSYNC_NEVER = "never"
+FSYNC_POLICIES = (FSYNC_ALWAYS, FSYNC_INTERVAL, FSYNC_NEVER)
+FSYNC_INTERVAL_SECONDS = 1.0
+
+
+class Journal:
+    """Append-only JSONL record of heat state changes, cue triggers and measured cue onsets.
+
+    record() only timestamps the entry and puts it on a queue, so it is cheap enough to call
+    from the tick path and from the audio callback. A writer thread serialises whatever has
+    queued up, writes it as one batch and fsyncs according to the policy. Every line has
+    "mono_ns" (time.monotonic_ns(), comparable with the engine's deadlines), "wall_ns"
+    (time.time_ns()), "event" and "arena", plus the event's own fields.
+    """
+
+    def __init__(self, path, fsync=FSYNC_INTERVAL, fsync_interval=FSYNC_INTERVAL_SECONDS):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f'fsync policy must be one of {", ".join(FSYNC_POLICIES)}, not {fsync!r}')
+        self.path = path
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.entries = SimpleQueue()
+        self.batches = 0
+        self.records_written = 0
+        self.file = open(path, "a", encoding="utf-8")
+        self.thread = Thread(target=self.run, name="journal-writer", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def record(self, event, arena=None, **fields):
+        self.entries.put((time.monotonic_ns(), time.time_ns(), event, arena or "", fields))
+
+    def close(self):
+        """Write everything recorded so far, sync it and stop the writer."""
+        self.entries.put(None)
+        self.thread.join()
+
+    def run(self):
+        last_sync = time.monotonic()
+        unsynced = False
+        closing = False
+        while not closing:
+            batch = []
+            try:
+                # With writes awaiting an interval fsync, wake up in time to do it even if nothing else arrives.
+                timeout = (max(last_sync + self.fsync_interval - time.monotonic(), 0)
+                           if unsynced and self.fsync == FSYNC_INTERVAL else None)
+                batch.append(self.entries.get(timeout=timeout))
+                while True:
+                    batch.append(self.entries.get_nowait())
+            except Empty:
+                pass
+            if batch and batch[-1] is None:
+                batch.pop()
+                closing = True
+
+            lines = [json.dumps({"mono_ns": mono_ns, "wall_ns": wall_ns, "event": event, "arena": arena, **fields},
+                                separators=(",", ":"), default=str)
+                     for mono_ns, wall_ns, event, arena, fields in batch]
+            try:
+                if lines:
+                    self.file.write("\n".join(lines) + "\n")
+                    self.file.flush()
+                    self.batches += 1
+                    self.records_written += len(lines)
+                    unsynced = self.fsync != FSYNC_NEVER
+                now = time.monotonic()
+                if unsynced and (closing or self.fsync == FSYNC_ALWAYS or now - last_sync >= self.fsync_interval):
+                    os.fsync(self.file.fileno())
+                    last_sync = now
+                    unsynced = False
+            except OSError as error:
+                logger.error(f'Could not write heat journal {self.path}: {error}')
+        self.file.close()
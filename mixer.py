@@ -0,0 +1,105 @@
+import time
+
+import numpy as np
+
+INT16_MIN = -32768
+INT16_MAX = 32767
+
+
+class Mixer:
+    """A fixed pool of voices summed into one 16-bit output stream.
+
+    play() and stop() run on the audio worker thread and mix() in the device callback, so they
+    share no locks: each voice slot holds a request tuple that play()/stop() replace (never
+    mutate), and mix() notices a new request by identity, as AudioBank did with its single
+    request. Gains are plain floats read on every block, so set_gain() takes effect mid-sound.
+
+    Mixing works on preallocated numpy blocks, one vectorised add per sounding voice, so the
+    cost of a block is bounded by the pool size however many cues overlap.
+    """
+
+    def __init__(self, nchannels, voices, on_start=None):
+        self.nchannels = nchannels
+        # on_start(name, trigger_ns) is called from mix() as each voice's first samples go out.
+        self.on_start = on_start
+        # (samples, trigger_ns, name) or (None, stop_ns, None), written by play()/stop().
+        self.requests = [(None, 0, None)] * voices
+        # The request mix() last picked up for each voice, and whether it still has samples left.
+        self.started = list(self.requests)
+        self.sounding = [False] * voices
+        # Where each voice has got to in its samples; only mix() touches these.
+        self.positions = [0] * voices
+        self.gains = [1.0] * voices
+        self.accumulator = np.zeros((0, nchannels), dtype=np.float32)
+        self.scaled = np.zeros((0, nchannels), dtype=np.float32)
+
+    @property
+    def voices(self):
+        return len(self.requests)
+
+    @property
+    def active(self):
+        return any(self.sounding)
+
+    def samples(self, buffer):
+        """A (frames, channels) int16 view of an interleaved 16-bit PCM buffer, without copying."""
+        return np.frombuffer(buffer, dtype=np.int16).reshape(-1, self.nchannels)
+
+    def play(self, buffer, trigger_ns=None, name=None, gain=1.0):
+        """Start buffer on a free voice and return the voice, which stop() and set_gain() take."""
+        voice = self.free_voice()
+        self.gains[voice] = gain
+        self.requests[voice] = (self.samples(buffer), time.perf_counter_ns() if trigger_ns is None else trigger_ns,
+                                name)
+        return voice
+
+    def free_voice(self):
+        for voice, request in enumerate(self.requests):
+            # Free once mix() has picked up its last request and played it out.
+            if request is self.started[voice] and not self.sounding[voice]:
+                return voice
+        # All busy: take over the voice that was started longest ago.
+        return min(range(self.voices), key=lambda voice: self.requests[voice][1])
+
+    def stop(self, voice=None, name=None):
+        """Silence one voice, every voice playing name, or (with neither) all of them."""
+        stop_ns = time.perf_counter_ns()
+        for index, request in enumerate(self.requests):
+            if (voice is None or index == voice) and (name is None or request[2] == name) and request[0] is not None:
+                self.requests[index] = (None, stop_ns, None)
+
+    def set_gain(self, voice, gain):
+        self.gains[voice] = gain
+
+    def mix(self, frames):
+        """The next frames of output as bytes, or b"" while every voice is silent."""
+        if len(self.accumulator) < frames:
+            self.accumulator = np.zeros((frames, self.nchannels), dtype=np.float32)
+            self.scaled = np.zeros((frames, self.nchannels), dtype=np.float32)
+        block = None
+        for voice, request in enumerate(self.requests):
+            if request is not self.started[voice]:
+                self.started[voice] = request
+                self.positions[voice] = 0
+                self.sounding[voice] = request[0] is not None
+                if request[0] is not None and self.on_start is not None:
+                    self.on_start(request[2], request[1])
+            if not self.sounding[voice]:
+                continue
+
+            samples, position = request[0], self.positions[voice]
+            chunk = samples[position:position + frames]
+            self.positions[voice] = position + len(chunk)
+            if self.positions[voice] >= len(samples):
+                self.sounding[voice] = False
+            if block is None:
+                block = self.accumulator[:frames]
+                block.fill(0)
+            scaled = self.scaled[:len(chunk)]
+            np.multiply(chunk, self.gains[voice], out=scaled)
+            block[:len(chunk)] += scaled
+
+        if block is None:
+            return b""
+        np.clip(block, INT16_MIN, INT16_MAX, out=block)
+        return block.astype(np.int16).tobytes()
@@ -0,0 +1,102 @@
+import time
+
+from scheduler import NS_PER_SEC
+
+
+def strf_delta(tdelta: int) -> str:
+    days = tdelta // 86400
+    hrs = tdelta // 3600
+    mins = (tdelta // 60) % 60
+    secs = tdelta % 60
+    return f'{days:02}:{hrs:02}:{mins:02}:{secs:02}' if hrs else f'{mins:02}:{secs:02}'
+
+
+def countdown_table(event_duration):
+    """Every countdown string a heat of event_duration seconds can show, indexed by seconds remaining."""
+    return [strf_delta(seconds) for seconds in range(event_duration + 1)]
+
+
+def fine_countdown_table(seconds, digits):
+    """Countdown strings with digits decimal places for the final seconds, indexed by tenths (or hundredths)."""
+    scale = 10 ** digits
+    return [f'{units // scale:02}.{units % scale:0{digits}}' for units in range(seconds * scale + 1)]
+
+
+def fine_index(remaining_ns, digits):
+    """Index into fine_countdown_table for remaining_ns, truncating the fraction as a sports clock does."""
+    return remaining_ns * 10 ** digits // NS_PER_SEC
+
+
+class ClockStrings:
+    """prefix + strftime(fmt) of the wall clock, formatted once per whole second."""
+
+    def __init__(self, prefix, fmt):
+        self.prefix = prefix
+        self.fmt = fmt
+        self.second = None
+        self.text = None
+
+    def at(self, epoch_seconds=None):
+        second = int(time.time() if epoch_seconds is None else epoch_seconds)
+        if second != self.second:
+            self.second = second
+            self.text = self.prefix + time.strftime(self.fmt, time.localtime(second))
+        return self.text
+
+
+class RenderCounter:
+    """Counts widget reconfigurations so the render cost of a heat can be reported."""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.updates = 0
+        self.started = clock()
+
+    def add(self):
+        self.updates += 1
+
+    def reset(self):
+        self.updates = 0
+        self.started = self.clock()
+
+    def per_second(self):
+        elapsed = self.clock() - self.started
+        return self.updates / elapsed if elapsed > 0 else 0.0
+
+
+class WidgetView:
+    """Remembers what was last pushed to a Tk widget and only configures properties that changed."""
+
+    def __init__(self, widget, counter):
+        self.widget = widget
+        self.counter = counter
+        self.shown = {}
+
+    def update(self, **properties):
+        changed = {name: value for name, value in properties.items() if self.shown.get(name) != value}
+        if changed:
+            self.widget.configure(**changed)
+            self.shown.update(changed)
+            self.counter.add()
+
+
+class ViewGroup:
+    """Sends the same update() to several views, e.g. the window's countdown and a projector mirror."""
+
+    def __init__(self, *views):
+        self.views = list(views)
+        self.shown = {}
+
+    def add(self, view):
+        """Add a view, bringing it up to date with what the others show."""
+        self.views.append(view)
+        if self.shown:
+            view.update(**self.shown)
+
+    def remove(self, view):
+        self.views.remove(view)
+
+    def update(self, **properties):
+        self.shown.update(properties)
+        for view in self.views:
+            view.update(**properties)
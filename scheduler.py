@@ -0,0 +1,119 @@
+import heapq
+import itertools
+import time
+
+NS_PER_SEC = 1_000_000_000
+NS_PER_MS = 1_000_000
+
+
+class TickScheduler:
+    """Schedule timer ticks on whole seconds of a fixed time.monotonic_ns() origin.
+
+    Every tick is aimed at origin + n seconds rather than "1000 ms after the last one",
+    so a late Tk callback shortens the next delay instead of pushing every later tick back.
+    """
+
+    def __init__(self, clock=time.monotonic_ns, interval_ns=NS_PER_SEC):
+        self.clock = clock
+        self.interval_ns = interval_ns
+        self.origin_ns = None
+        self.tick_index = 0
+        self.lateness_ns = []
+
+    def start(self, origin_ns=None):
+        """Fix the origin all later deadlines are measured from and clear the statistics."""
+        self.origin_ns = self.clock() if origin_ns is None else origin_ns
+        self.tick_index = 0
+        self.lateness_ns = []
+        return self.origin_ns
+
+    def deadline_ns(self, tick_index):
+        return self.origin_ns + tick_index * self.interval_ns
+
+    def next_deadline_ns(self, now_ns=None):
+        """Advance to the first whole-second deadline after now_ns and return it."""
+        now_ns = self.clock() if now_ns is None else now_ns
+        self.tick_index = max((now_ns - self.origin_ns) // self.interval_ns + 1, 0)
+        return self.deadline_ns(self.tick_index)
+
+    def next_delay_ms(self, now_ns=None):
+        """Return the after() delay that lands on the next whole-second deadline."""
+        now_ns = self.clock() if now_ns is None else now_ns
+        return delay_ms(self.next_deadline_ns(now_ns), now_ns)
+
+    def record_tick(self, now_ns=None):
+        """Record how late the current tick ran and return the time it was handled."""
+        now_ns = self.clock() if now_ns is None else now_ns
+        self.lateness_ns.append(now_ns - self.deadline_ns(self.tick_index))
+        return now_ns
+
+    def lateness_stats(self):
+        """Summary of per-tick lateness in milliseconds."""
+        return summarise_ns(self.lateness_ns)
+
+
+PERCENTILES = (50, 95, 99)
+
+
+def summarise_ns(samples_ns):
+    """Count, mean, p50/p95/p99 (nearest rank) and max of nanosecond measurements, in milliseconds."""
+    if not samples_ns:
+        return {"count": 0, "mean_ms": 0.0, **{f"p{p}_ms": 0.0 for p in PERCENTILES}, "max_ms": 0.0}
+    ordered = sorted(samples_ns)
+    count = len(ordered)
+    return {"count": count,
+            "mean_ms": sum(ordered) / count / NS_PER_MS,
+            **{f"p{p}_ms": ordered[max(-(-count * p // 100) - 1, 0)] / NS_PER_MS for p in PERCENTILES},
+            "max_ms": ordered[-1] / NS_PER_MS}
+
+
+def delay_ms(deadline_ns, now_ns):
+    """after() delay to deadline_ns, rounded up so the callback never runs before its deadline."""
+    return max(-(-(deadline_ns - now_ns) // NS_PER_MS), 0)
+
+
+def remaining_seconds(finish_ns, now_ns):
+    """Whole seconds left until finish_ns, rounded up as a countdown displays them."""
+    return -(-(finish_ns - now_ns) // NS_PER_SEC)
+
+
+class DeadlineScheduler:
+    """One heap of (deadline_ns, callback) entries shared by every timer in the process.
+
+    The owner only ever needs to wake at next_deadline_ns(), however many timers are running.
+    on_earlier, if set, is called whenever a newly scheduled entry becomes the earliest deadline
+    so the owner can re-arm its wake-up.
+    """
+
+    def __init__(self, clock=time.monotonic_ns):
+        self.clock = clock
+        self.heap = []
+        self.counter = itertools.count()
+        self.on_earlier = None
+
+    def schedule(self, deadline_ns, callback):
+        """Call callback() at deadline_ns; returns an entry that can be passed to cancel()."""
+        entry = [deadline_ns, next(self.counter), callback]
+        heapq.heappush(self.heap, entry)
+        if self.heap[0] is entry and self.on_earlier is not None:
+            self.on_earlier()
+        return entry
+
+    @staticmethod
+    def cancel(entry):
+        # Cancelled entries stay in the heap and are skipped when they reach the top.
+        entry[2] = None
+
+    def next_deadline_ns(self):
+        while self.heap and self.heap[0][2] is None:
+            heapq.heappop(self.heap)
+        return self.heap[0][0] if self.heap else None
+
+    def run_due(self, now_ns=None):
+        """Run every callback due by now_ns and return the next deadline."""
+        now_ns = self.clock() if now_ns is None else now_ns
+        while self.heap and self.heap[0][0] <= now_ns:
+            callback = heapq.heappop(self.heap)[2]
+            if callback is not None:
+                callback()
+        return self.next_deadline_ns()
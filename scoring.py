@@ -0,0 +1,205 @@
+import heapq
+import itertools
+import math
+
+# Wave scores are kept in hundredths of a point, so totals add up exactly.
+MAX_POINTS = 1000
+COUNTED_WAVES = 2
+
+
+class ScoreError(ValueError):
+    """A wave score that cannot be taken, e.g. out of range or sent after the finish."""
+
+
+def hundredths(points):
+    """A score such as 7.83 or "7.83" in hundredths of a point; raises ScoreError."""
+    try:
+        value = float(points) * 100
+    except (TypeError, ValueError):
+        value = math.nan
+    # True would otherwise count as 1.00; inf and nan cannot be rounded.
+    if isinstance(points, bool) or not math.isfinite(value):
+        raise ScoreError(f'Score must be a number, not {points!r}')
+    value = round(value)
+    if not 0 <= value <= MAX_POINTS:
+        raise ScoreError(f'Score must be between 0 and {MAX_POINTS / 100:.2f}, not {points}')
+    return value
+
+
+class Surfer:
+    def __init__(self, name):
+        self.name = name
+        # {wave number: score}; a wave scored again (a judge's correction) replaces its score.
+        self.waves = {}
+        # The best COUNTED_WAVES scores, highest first.
+        self.best = []
+
+    @property
+    def total(self):
+        return sum(self.best)
+
+    def rank_key(self):
+        """Higher is better: the best-two total, then the best single wave breaks a tie."""
+        return self.total, self.best[0] if self.best else 0
+
+    def score(self, wave, value):
+        previous = self.waves.get(wave)
+        self.waves[wave] = value
+        if previous is not None and previous in self.best:
+            # A counting wave was rescored, possibly downwards: pick the best ones again.
+            self.best = heapq.nlargest(COUNTED_WAVES, self.waves.values())
+        else:
+            self.best = sorted(self.best + [value], reverse=True)[:COUNTED_WAVES]
+
+
+class Leaderboard:
+    """Best-two-wave standings of one heat, updated as each judged wave score comes in.
+
+    The ranking is a max-heap of (rank key, surfer) entries with lazy deletion: a new score
+    pushes a fresh entry for its surfer and the stale one is dropped when it reaches the top,
+    so a score costs O(log n) and leader() and needs() amortised O(log n). Only standings(),
+    which the display calls, sorts the whole field, and only once per score it has not seen.
+
+    Scores count from opens_ns, the heat's start, until closes_ns, its finish, both on the
+    engine's monotonic clock: one received outside that window is refused, however soon after
+    it is processed. freeze() then fixes the standings for good.
+    """
+
+    def __init__(self, surfers=(), opens_ns=None, closes_ns=None):
+        self.surfers = {}
+        self.heap = []
+        self.counter = itertools.count()
+        self.opens_ns = opens_ns
+        self.closes_ns = closes_ns
+        self.frozen = None
+        self.rows = None
+        for name in surfers:
+            self.surfer(name)
+
+    def surfer(self, name):
+        surfer = self.surfers.get(name)
+        if surfer is None:
+            surfer = self.surfers[name] = Surfer(name)
+            self.push(surfer)
+            self.rows = None
+        return surfer
+
+    def push(self, surfer):
+        total, best_wave = surfer.rank_key()
+        # The counter keeps the order stable between equal surfers and stands in for comparing them.
+        heapq.heappush(self.heap, (-total, -best_wave, next(self.counter), surfer, (total, best_wave)))
+
+    def add(self, surfer, wave, points, at_ns):
+        """Take a judged wave score received at at_ns; raises ScoreError if it cannot count."""
+        if self.frozen is not None or (self.closes_ns is not None and at_ns >= self.closes_ns):
+            raise ScoreError('The heat is over, scores are frozen')
+        if self.opens_ns is not None and at_ns < self.opens_ns:
+            raise ScoreError('The heat has not started yet')
+        value = hundredths(points)
+        try:
+            wave = int(wave)
+        except (TypeError, ValueError, OverflowError):
+            raise ScoreError(f'Wave must be a whole number, not {wave!r}')
+        surfer = self.surfer(str(surfer))
+        surfer.score(wave, value)
+        self.push(surfer)
+        self.rows = None
+
+    def leader(self):
+        """The surfer in the lead, dropping stale heap entries on the way, or None before any surfer."""
+        while self.heap:
+            entry = self.heap[0]
+            surfer = entry[3]
+            if entry[4] == surfer.rank_key():
+                return surfer
+            heapq.heappop(self.heap)
+        return None
+
+    def needs(self, surfer, leader=None):
+        """What surfer needs on one more wave to take the lead, in hundredths, or None if one wave won't do.
+
+        A new wave x counts with the surfer's best wave b, so the total becomes b + x: it has to
+        reach the leader's total, and pass it by a hundredth unless the higher of b and x beats
+        the leader's best wave on the tie.
+        """
+        leader = leader or self.leader()
+        if leader is None or surfer is leader:
+            return None
+        best = surfer.best[0] if surfer.best else 0
+        needed = leader.total - best
+        if max(best, needed) <= (leader.best[0] if leader.best else 0):
+            needed += 1
+        needed = max(needed, 0)
+        return needed if needed <= MAX_POINTS else None
+
+    def freeze(self):
+        if self.frozen is None:
+            self.frozen = self.standings()
+        return self.frozen
+
+    def standings(self):
+        """[{"surfer", "total", "waves", "needs"}, ...] best first, in points; the leader needs nothing."""
+        if self.frozen is not None:
+            return self.frozen
+        if self.rows is not None:
+            return self.rows
+        leader = self.leader()
+        ranked = sorted(self.surfers.values(), key=lambda surfer: (surfer is leader, surfer.rank_key()), reverse=True)
+        rows = []
+        for place, surfer in enumerate(ranked):
+            needs = self.needs(surfer, leader) if place else None
+            rows.append({"surfer": surfer.name,
+                         "total": surfer.total / 100,
+                         "waves": [value / 100 for value in surfer.best],
+                         "needs": needs / 100 if needs is not None else None,
+                         "combo": place > 0 and needs is None})
+        self.rows = rows
+        return rows
+
+
+class HeatScores:
+    """The Leaderboard of the heat on a TimerEngine: opened as each heat starts, frozen as it finishes.
+
+    It subscribes to the engine itself, so create it before anything that publishes on start or
+    finish, and before a HeatQueue, which starts the next heat from inside the finish. The next
+    heat's board is then open by the time its start is announced. A finished heat's results are
+    kept, with its name, as last_results until the next heat takes its first score, so a
+    changeover with no gap does not wipe them the moment they are final.
+
+    current_heat() returns the Heat on the clock, or None when there is none (a single timer).
+    """
+
+    def __init__(self, engine, current_heat):
+        self.engine = engine
+        self.current_heat = current_heat
+        self.leaderboard = Leaderboard()
+        # {"heat": name, "standings": [...]} of the last heat to finish, or None.
+        self.last_results = None
+        engine.subscribe("start", self.open)
+        engine.subscribe("resume", lambda missed_cues: self.open())
+        engine.subscribe("finish", self.close)
+
+    def open(self):
+        """Take scores for the heat on the clock from its start to its finish, to the nanosecond.
+
+        During a changeover the next heat is already on the clock with its start still to come,
+        so scores sent then are refused rather than counted for it.
+        """
+        heat = self.current_heat()
+        self.leaderboard = Leaderboard(heat.surfers if heat is not None else (),
+                                       opens_ns=self.engine.start_ns, closes_ns=self.engine.finish_ns)
+
+    def close(self):
+        heat = self.current_heat()
+        self.last_results = {"heat": heat.name if heat is not None else "", "standings": self.leaderboard.freeze()}
+
+    def add(self, surfer, wave, points, at_ns):
+        """Take a judged wave score received at at_ns; raises ScoreError if it cannot count."""
+        if not self.engine.running and self.leaderboard.frozen is None:
+            raise ScoreError('No heat is on the clock')
+        self.leaderboard.add(surfer, wave, points, at_ns)
+        self.last_results = None
+
+    def state(self):
+        return {"leaderboard": self.leaderboard.standings(), "final": self.leaderboard.frozen is not None,
+                "last_results": self.last_results}
@@ -0,0 +1,304 @@
+import configparser
+import logging
+import os
+import re
+import tempfile
+from io import StringIO
+from queue import SimpleQueue
+from threading import Thread
+from typing import Optional
+
+from journal import FSYNC_POLICIES
+
+logger = logging.getLogger(__name__)
+
+SECTION = "AppSettings"
+
+
+class SettingsError(ValueError):
+    """One or more settings that do not parse or are out of range; args[0] lists them all."""
+
+
+def at_least(minimum):
+    return lambda value: None if value >= minimum else f"must be at least {minimum}"
+
+
+def between(minimum, maximum):
+    return lambda value: (None if value is None or minimum <= value <= maximum
+                          else f"must be between {minimum} and {maximum}")
+
+
+def one_of(*options):
+    return lambda value: None if value in options else f"must be one of {', '.join(map(str, options))}"
+
+
+def matches(pattern, example):
+    return lambda value: None if re.fullmatch(pattern, value) else f"must look like {example}"
+
+
+def not_empty(value):
+    return None if value.strip() else "must not be empty"
+
+
+# Enough for any sensible heat, and few enough that a heat's pending cues fit in its checkpoint.
+MAX_CUE_POINTS = 20
+
+
+def cue_point_list(value):
+    if not re.fullmatch(r"\s*(\d+\s*(,\s*\d+\s*)*)?", value):
+        return "must look like 300, 60, 10"
+    if len(parse_cue_points(value)) > MAX_CUE_POINTS:
+        return f"must list at most {MAX_CUE_POINTS} cue points"
+    return None
+
+
+def parse_cue_points(value):
+    """The seconds before the finish listed in a cue_points setting, largest first."""
+    return tuple(sorted({int(seconds) for seconds in value.split(",") if seconds.strip()}, reverse=True))
+
+
+# Checks beyond the type, each returning an error message or None.
+CHECKS = {"event_duration": at_least(1),
+          "warning_time": at_least(0),
+          "changeover_time": at_least(0),
+          "draw_heat_size": one_of(2, 3, 4),
+          "draw_advance": one_of(1, 2),
+          "cue_points": cue_point_list,
+          "display_mode": one_of("label", "canvas"),
+          "fine_countdown_seconds": at_least(0),
+          "fine_countdown_digits": one_of(1, 2),
+          "fine_countdown_fps": between(1, 240),
+          "broadcast_port": between(0, 65535),
+          "timesync_port": between(0, 65535),
+          "control_port": between(0, 65535),
+          "journal_fsync": one_of(*FSYNC_POLICIES),
+          "sound_cache_mb": at_least(1),
+          "starting_sound": not_empty,
+          "warning_sound": not_empty,
+          "ending_sound": not_empty,
+          "cue_point_sound": not_empty,
+          "app_geometry": matches(r"\d+x\d+", "800x400"),
+          "debug_level": one_of("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")}
+
+
+class Settings:
+    """The [AppSettings] section of config.ini as typed, checked values.
+
+    Every setting is a class attribute holding its default, annotated with its type; parse()
+    turns the strings of a config section into an instance and format() turns one back.
+    """
+
+    event_duration: int = 10
+    warning_time: int = 5
+    changeover_time: int = 0
+    cue_points: str = ""
+    draw_heat_size: int = 4
+    draw_advance: int = 2
+    arenas: str = ""
+    display_mode: str = "label"
+    fine_countdown_seconds: int = 10
+    fine_countdown_digits: int = 1
+    fine_countdown_fps: int = 30
+    scoreboard_geometry: str = ""
+    broadcast_host: str = "0.0.0.0"
+    broadcast_port: Optional[int] = None
+    timesync_group: str = "239.255.42.99"
+    timesync_port: Optional[int] = None
+    timesync_interface: str = "0.0.0.0"
+    control_port: Optional[int] = None
+    control_socket: str = ""
+    journal_path: str = "heats.jsonl"
+    journal_fsync: str = "interval"
+    checkpoint_path: str = "checkpoint.bin"
+    sound_cache_path: str = "sound_cache"
+    sound_cache_mb: int = 200
+    starting_sound: str = "starting_sound.mp3"
+    warning_sound: str = "warning_sound.mp3"
+    ending_sound: str = "finish_sound.mp3"
+    cue_point_sound: str = "synth:beep,count=2"
+    callouts: bool = False
+    callout_path: str = "audio/callouts"
+    app_title: str = "SurfCompTimer"
+    app_geometry: str = "800x400"
+    app_iconbitmap: str = "whale.ico"
+    sound_path: str = "audio"
+    debug_level: str = "INFO"
+    latency_compensation: bool = True
+
+    def __init__(self, **values):
+        for name, value in values.items():
+            if name not in self.__annotations__:
+                raise TypeError(f"Unknown setting {name}")
+            setattr(self, name, value)
+
+    @classmethod
+    def parse(cls, section, fallback=None):
+        """Settings from a {name: string} section; missing names take their defaults.
+
+        Raises SettingsError naming every bad value, unless fallback is given, in which case
+        each bad value is logged and fallback's value used instead.
+        """
+        values, errors = {}, []
+        for name, kind in cls.__annotations__.items():
+            if name not in section:
+                continue
+            try:
+                value = parse_value(section[name], kind)
+            except ValueError:
+                errors.append((name, f"{section[name]!r} is not {TYPE_NAMES[kind]}"))
+                continue
+            problem = CHECKS[name](value) if name in CHECKS else None
+            if problem:
+                errors.append((name, f"{section[name]!r} {problem}"))
+                continue
+            values[name] = value
+
+        if errors and fallback is None:
+            raise SettingsError("; ".join(f"{name} {problem}" for name, problem in errors))
+        for name, problem in errors:
+            logger.error(f'Setting {name} {problem}, using {getattr(fallback, name)!r}')
+            values[name] = getattr(fallback, name)
+        return cls(**values)
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__annotations__}
+
+    def format(self):
+        """The settings as config strings."""
+        return {name: format_value(value) for name, value in self.as_dict().items()}
+
+
+TYPE_NAMES = {int: "a whole number", Optional[int]: "a whole number or empty", str: "text", bool: "yes or no"}
+
+
+def parse_value(text, kind):
+    text = text.strip()
+    if kind is bool:
+        if text.lower() not in configparser.ConfigParser.BOOLEAN_STATES:
+            raise ValueError(text)
+        return configparser.ConfigParser.BOOLEAN_STATES[text.lower()]
+    if kind == Optional[int]:
+        return int(text) if text else None
+    if kind is int:
+        return int(text)
+    return text
+
+
+def format_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "yes" if value else "no"
+    return str(value)
+
+
+class SettingsStore:
+    """config.ini, parsed once into Settings and kept in step with the file.
+
+    update() validates new values on the calling (Tk) thread and hands the file's new text to a
+    writer thread, which writes it to a temporary file beside config.ini, fsyncs it and renames
+    it over the original, so a crash mid-save never leaves a half-written config. reload() and
+    check_for_edits() pick up changes made to the file by something else. Listeners are called
+    with the new Settings whenever they change.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.config = configparser.ConfigParser()
+        self.settings = Settings()
+        self.mtime_ns = None
+        self.listeners = []
+        self.saves = SimpleQueue()
+        self.writer = Thread(target=self.write_saves, name="settings-writer", daemon=True)
+        self.writer.start()
+        self.load(fallback=Settings())
+
+    def subscribe(self, callback):
+        self.listeners.append(callback)
+
+    def get(self, section, name, fallback=""):
+        """A raw value from another section of the file, e.g. [Arena <name>]."""
+        return self.config.get(section, name, fallback=fallback)
+
+    def load(self, fallback=None):
+        config = configparser.ConfigParser()
+        config.read(self.path)
+        self.mtime_ns = self.stat()
+        settings = Settings.parse(config[SECTION] if config.has_section(SECTION) else {}, fallback)
+        self.config = config
+        self.settings = settings
+
+    def reload(self):
+        """Read the file again and pass its settings on; a bad file is logged and ignored."""
+        try:
+            self.load()
+        except SettingsError as error:
+            logger.error(f'Ignoring the edited {self.path}: {error}')
+            return False
+        self.notify()
+        return True
+
+    def check_for_edits(self):
+        """Reload if the file was changed by something other than update()."""
+        if self.stat() != self.mtime_ns:
+            return self.reload()
+        return False
+
+    def update(self, **values):
+        """Replace settings from config strings, save them and pass them on; raises SettingsError."""
+        settings = Settings.parse({**self.settings.format(), **values})
+        if not self.config.has_section(SECTION):
+            self.config.add_section(SECTION)
+        for name, text in settings.format().items():
+            self.config[SECTION][name] = text
+        self.settings = settings
+        text = StringIO()
+        self.config.write(text)
+        self.saves.put(text.getvalue())
+        self.notify()
+        return settings
+
+    def notify(self):
+        for callback in self.listeners:
+            callback(self.settings)
+
+    def stat(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def close(self):
+        """Finish any save still queued."""
+        self.saves.put(None)
+        self.writer.join()
+
+    def write_saves(self):
+        closing = False
+        while not closing:
+            text = self.saves.get()
+            closing = text is None
+            # Only the newest of several queued saves needs writing.
+            while not self.saves.empty():
+                newer = self.saves.get()
+                if newer is None:
+                    closing = True
+                else:
+                    text = newer
+            if text is not None:
+                self.write(text)
+
+    def write(self, text):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        file = tempfile.NamedTemporaryFile("w", dir=directory, prefix=".config-", suffix=".tmp", delete=False)
+        try:
+            with file:
+                file.write(text)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(file.name, self.path)
+            self.mtime_ns = self.stat()
+        except OSError as error:
+            logger.error(f'Could not save {self.path}: {error}')
+            if os.path.exists(file.name):
+                os.remove(file.name)
@@ -16,8 +16,8 @@ DATA_FILES = ['config.ini', 'logs.log', 'surfer.icns', 'whale.ico',
               ]
 OPTIONS = {
     'argv_emulation': False,
-    'includes': {'just_playback'},
-    'packages': {'cffi'},
+    'includes': {'miniaudio', 'mixer', 'tones', 'soundcache', 'callouts', 'control', 'scoring', 'draw'},
+    'packages': {'cffi', 'numpy'},
     'iconfile': 'surfer.icns',
     'plist': {
         'CFBundleName': APP_NAME,
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Remote scoreboard following a master timer over the network.
+
+Listens for the master's multicast heat announcements (set "timesync_port" in the master's
+config.ini), keeps its own clock synchronised with the master, and counts down locally from
+the heat's finish time, so the display keeps running smoothly between packets.
+
+    python slave_display.py --port 5007 --arena "Arena 1"
+
+With no --arena the first arena announced is shown. Escape quits.
+"""
+import argparse
+import logging
+from tkinter import Tk
+
+from display import ScoreboardWindow
+from render import RenderCounter, fine_countdown_table, fine_index, strf_delta
+from scheduler import NS_PER_SEC
+from timesync import ANNOUNCE_PORT, MULTICAST_GROUP, TimeSyncSlave
+
+FRAME_MS = 50
+
+
+class SlaveDisplay:
+    def __init__(self, root, slave, arena, geometry, fine_seconds, fine_digits):
+        self.root = root
+        self.slave = slave
+        self.arena = arena
+        self.fine_digits = fine_digits
+        self.fine_strings = fine_countdown_table(fine_seconds, fine_digits)
+        self.fine_ns = fine_seconds * NS_PER_SEC
+        self.scoreboard = ScoreboardWindow(root, RenderCounter(), geometry=geometry)
+        self.scoreboard.window.bind("<Escape>", lambda event: root.destroy())
+        self.scoreboard.update(text="--:--")
+        self.scoreboard.show_info("Waiting for master")
+
+    def frame(self):
+        self.root.after(FRAME_MS, self.frame)
+        if self.arena is None and self.slave.states:
+            self.arena = next(iter(self.slave.states))
+        remaining_ns = self.slave.remaining_ns(self.arena)
+        if remaining_ns is None:
+            return
+        state = self.slave.states[self.arena]
+        self.scoreboard.show_info(" - ".join(name for name in (self.arena, state["heat"]) if name))
+        if state["phase"] == "finished":
+            self.scoreboard.update(text="Event Finished", fg=state["colour"])
+        elif 0 < remaining_ns <= self.fine_ns and state["phase"] in ("running", "warning"):
+            self.scoreboard.update(text=self.fine_strings[fine_index(remaining_ns, self.fine_digits)],
+                                   fg=state["colour"])
+        else:
+            self.scoreboard.update(text=strf_delta(-(-remaining_ns // NS_PER_SEC)), fg=state["colour"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--group", default=MULTICAST_GROUP)
+    parser.add_argument("--port", type=int, default=ANNOUNCE_PORT)
+    parser.add_argument("--interface", default="0.0.0.0", help="address of the network card facing the master")
+    parser.add_argument("--arena", default=None)
+    parser.add_argument("--geometry", default="", help='e.g. "+1920+0" to open on a second screen')
+    parser.add_argument("--fine-seconds", type=int, default=10)
+    parser.add_argument("--fine-digits", type=int, default=1)
+    arguments = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    slave = TimeSyncSlave(arguments.group, arguments.port, arguments.interface)
+    slave.start()
+    root = Tk()
+    root.withdraw()
+    display = SlaveDisplay(root, slave, arguments.arena, arguments.geometry,
+                           arguments.fine_seconds, arguments.fine_digits)
+    display.frame()
+    root.mainloop()
@@ -0,0 +1,154 @@
+import hashlib
+import logging
+import os
+import tempfile
+from queue import SimpleQueue
+from threading import Lock, Thread
+
+from audio import NCHANNELS, SAMPLE_RATE, SILENCE_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+# Bump when the transcoding changes, so files cached by an older version are not reused.
+FORMAT_VERSION = 1
+# Loudness every cached sound is brought to, as RMS, unless that would push its peaks past PEAK_DBFS.
+LOUDNESS_DBFS = -16.0
+PEAK_DBFS = -1.0
+HASH_CHUNK = 1 << 20
+SUFFIX = ".pcm"
+
+
+def dbfs_to_amplitude(dbfs):
+    return 32767 * 10 ** (dbfs / 20)
+
+
+class SoundCache:
+    """Sound files transcoded once into ready-to-play PCM, kept in a directory keyed by content.
+
+    Each file is decoded to SAMPLE_RATE/NCHANNELS 16-bit PCM, trimmed of leading silence and
+    brought to LOUDNESS_DBFS, then stored under a hash of the file's bytes, so the same sound
+    picked from two places is transcoded once and an edited file gets a fresh entry. load()
+    reads the stored PCM straight into memory; files are only decoded on a miss.
+
+    The directory is kept under max_bytes by evicting the least recently used entries; a
+    hit touches its file, so modification times double as the LRU order and survive restarts.
+    submit() loads on the cache's own thread, so neither Tk nor the audio worker ever waits for
+    a transcode: done(path, samples) is called there with the result.
+    """
+
+    def __init__(self, directory, max_bytes, sample_rate=SAMPLE_RATE, nchannels=NCHANNELS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.sample_rate = sample_rate
+        self.nchannels = nchannels
+        # (path, size, mtime_ns) -> key, so an unchanged file is only hashed once per run.
+        self.keys = {}
+        self.lock = Lock()
+        self.jobs = SimpleQueue()
+        self.thread = Thread(target=self.run, name="sound-cache", daemon=True)
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, path):
+        stat = os.stat(path)
+        identity = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        key = self.keys.get(identity)
+        if key is None:
+            digest = hashlib.sha256(f"{FORMAT_VERSION}:{self.sample_rate}:{self.nchannels}:".encode())
+            with open(path, "rb") as file:
+                for chunk in iter(lambda: file.read(HASH_CHUNK), b""):
+                    digest.update(chunk)
+            key = self.keys[identity] = digest.hexdigest()[:32]
+        return key
+
+    def cached_path(self, key):
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def load(self, path):
+        """path's transcoded PCM as bytes, transcoding it first if it is not cached yet."""
+        cached = self.cached_path(self.key(path))
+        try:
+            with open(cached, "rb") as file:
+                samples = file.read()
+            os.utime(cached)
+            return samples
+        except FileNotFoundError:
+            pass
+        samples = self.transcode(path)
+        self.store(cached, samples)
+        return samples
+
+    def transcode(self, path):
+        import miniaudio
+        import numpy as np
+        decoded = miniaudio.decode_file(path,
+                                        output_format=miniaudio.SampleFormat.SIGNED16,
+                                        nchannels=self.nchannels,
+                                        sample_rate=self.sample_rate)
+        samples = np.frombuffer(decoded.samples, dtype=np.int16).reshape(-1, self.nchannels)
+        loud = np.flatnonzero(np.abs(samples).max(axis=1) > SILENCE_THRESHOLD)
+        if not len(loud):
+            return b""
+        samples = samples[loud[0]:].astype(np.float32)
+        rms = float(np.sqrt(np.mean(np.square(samples))))
+        peak = float(np.abs(samples).max())
+        gain = min(dbfs_to_amplitude(LOUDNESS_DBFS) / rms, dbfs_to_amplitude(PEAK_DBFS) / peak)
+        return np.round(samples * gain).astype(np.int16).tobytes()
+
+    def store(self, cached, samples):
+        file = tempfile.NamedTemporaryFile("wb", dir=self.directory, suffix=".tmp", delete=False)
+        try:
+            with file:
+                file.write(samples)
+            os.replace(file.name, cached)
+        except OSError as error:
+            logger.error(f'Could not cache sound {cached}: {error}')
+            if os.path.exists(file.name):
+                os.remove(file.name)
+            return
+        self.evict(keep=cached)
+
+    def evict(self, keep):
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        with self.lock:
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(SUFFIX):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError as error:
+                    logger.warning(f'Could not evict cached sound {path}: {error}')
+
+    def submit(self, path, done=None):
+        """Load path on the cache's thread, transcoding it on a miss, then call done(path, samples).
+
+        done is not called if the file cannot be read or decoded; the error is logged instead.
+        If an earlier done raised and took the thread down, a new one takes over its queue.
+        """
+        with self.lock:
+            if not self.thread.is_alive():
+                if self.thread.ident is not None:
+                    logger.error('Sound cache thread stopped; starting a new one')
+                    self.thread = Thread(target=self.run, name="sound-cache", daemon=True)
+                self.thread.start()
+        self.jobs.put((path, done))
+
+    def run(self):
+        import miniaudio
+        while True:
+            path, done = self.jobs.get()
+            try:
+                samples = self.load(path)
+            except (OSError, miniaudio.MiniaudioError) as error:
+                logger.error(f'Could not transcode sound {path}: {error}')
+                continue
+            if done is not None:
+                done(path, samples)
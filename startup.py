@@ -0,0 +1,23 @@
+"""Startup timeline for "App.py --profile-startup".
+
+Imported first by App.py, so the timeline starts as the app's own imports begin. Each mark()
+records a step that has just finished; report() prints when each finished and how long it took.
+"""
+import sys
+import time
+
+STARTED_NS = time.perf_counter_ns()
+PROFILE = "--profile-startup" in sys.argv
+marks = []
+
+
+def mark(step):
+    marks.append((time.perf_counter_ns(), step))
+
+
+def report(file=sys.stdout):
+    print(f"{'at ms':>8} {'took ms':>8}  step", file=file)
+    previous_ns = STARTED_NS
+    for mark_ns, step in marks:
+        print(f"{(mark_ns - STARTED_NS) / 1e6:>8.1f} {(mark_ns - previous_ns) / 1e6:>8.1f}  {step}", file=file)
+        previous_ns = mark_ns
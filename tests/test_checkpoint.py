@@ -0,0 +1,34 @@
+import time
+
+from checkpoint import LAYOUT, MAGIC, Checkpoint
+from scheduler import NS_PER_SEC
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "checkpoint.bin")
+    start_ns = time.monotonic_ns()
+    checkpoint = Checkpoint(path)
+    checkpoint.save("warning", "Heat 7", 1200, 300, start_ns, start_ns + 1200 * NS_PER_SEC, ["T-60", "ending"])
+    checkpoint.close()
+
+    saved = Checkpoint(path).load()
+    assert saved == {"state": "warning", "heat": "Heat 7", "event_duration": 1200, "warning_time": 300,
+                     "start_ns": start_ns, "finish_ns": start_ns + 1200 * NS_PER_SEC, "cues": ["T-60", "ending"]}
+
+
+def test_empty_and_cleared_checkpoints_load_nothing(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint.bin"))
+    assert checkpoint.load() is None
+    checkpoint.save("running", "", 10, 5, 0, 10 * NS_PER_SEC, ["ending"])
+    checkpoint.clear()
+    assert checkpoint.load() is None
+
+
+def test_damaged_record_is_rejected(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint.bin"))
+    checkpoint.save("running", "Heat 1", 10, 5, 0, 10 * NS_PER_SEC, ["warning", "ending"])
+    # Flip a bit in the heat name: the magic is intact, the CRC no longer matches.
+    offset = LAYOUT.size - 200
+    checkpoint.map[offset] ^= 1
+    assert checkpoint.map[:len(MAGIC)] == MAGIC
+    assert checkpoint.load() is None
@@ -0,0 +1,87 @@
+import json
+import threading
+import time
+
+import pytest
+
+import control
+from control import ControlError, ControlServer, connect
+
+
+class BusyTk:
+    """Stands in for the Tk thread: runs submitted functions, unless it is told to be busy."""
+
+    def __init__(self):
+        self.free = threading.Event()
+        self.free.set()
+        self.ran = []
+
+    def submit(self, function):
+        # Like event_generate(), blocks the caller until the Tk thread takes the request.
+        self.free.wait()
+        function()
+
+    def run_command(self, command, arena, request):
+        if command == "score":
+            raise ControlError("No heat is on the clock")
+        self.ran.append(command)
+        return {"ran": list(self.ran)}
+
+
+@pytest.fixture
+def tk():
+    return BusyTk()
+
+
+@pytest.fixture
+def client(tk, monkeypatch):
+    monkeypatch.setattr(control, "COMMAND_TIMEOUT", 0.2)
+    server = ControlServer(tk.submit, tk.run_command, port=0)
+    server.publish("", {"running": False, "remaining_ms": 0})
+    server.start()
+    client = connect(server.port)
+    reader = client.makefile("rb")
+
+    def send(command, **fields):
+        client.sendall(json.dumps(dict(fields, command=command)).encode() + b"\n")
+        return json.loads(reader.readline())
+
+    send.server = server
+    yield send
+    tk.free.set()
+    client.close()
+
+
+def test_commands_run_on_tk_and_report_its_state(client, tk):
+    assert client("start") == {"ok": True, "command": "start", "arena": None, "state": {"ran": ["start"]}}
+    assert client("score", surfer="Kelly", wave=1, score=5)["error"] == "No heat is on the clock"
+    assert client("launch")["ok"] is False
+
+
+def test_state_and_ping_are_answered_while_tk_is_busy(client, tk):
+    tk.free.clear()
+    started = time.perf_counter()
+    assert client("ping")["ok"]
+    assert client("state")["ok"]
+    assert time.perf_counter() - started < 0.1
+
+
+def test_a_timed_out_command_is_dropped_not_run_late(client, tk):
+    tk.free.clear()
+    reply = client("stop")
+    assert reply["ok"] is False and "not carried out" in reply["error"]
+    tk.free.set()
+    assert client("start")["state"] == {"ran": ["start"]}
+    assert client.server.stats() == {"commands_run": 1, "commands_dropped": 1}
+
+
+@pytest.mark.parametrize("request_line, status", [(b"POST /start?arena= HTTP/1.1", b"200 OK"),
+                                                  (b"GET /start HTTP/1.1", b"405 Method Not Allowed"),
+                                                  (b"GET", b"400 Bad Request"),
+                                                  (b"POST   ", b"400 Bad Request")])
+def test_http_requests(client, request_line, status):
+    with connect(client.server.port) as http:
+        http.sendall(request_line + b"\r\nHost: localhost\r\n\r\n")
+        response = http.makefile("rb").read()
+    assert response.startswith(b"HTTP/1.1 " + status + b"\r\n")
+    assert json.loads(response.split(b"\r\n\r\n", 1)[1])["ok"] is (status == b"200 OK")
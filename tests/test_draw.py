@@ -0,0 +1,84 @@
+import time
+
+import pytest
+
+from draw import Draw, DrawError, snake
+
+
+def entrants(count):
+    return [f"S{seed}" for seed in range(1, count + 1)]
+
+
+def test_snake_seeding():
+    assert [snake(seed, 4) for seed in range(12)] == [0, 1, 2, 3, 3, 2, 1, 0, 0, 1, 2, 3]
+    draw = Draw(entrants(16))
+    assert [heat.surfers for heat in draw.rounds[0]] == [["S1", "S8", "S9", "S16"], ["S2", "S7", "S10", "S15"],
+                                                         ["S3", "S6", "S11", "S14"], ["S4", "S5", "S12", "S13"]]
+    assert [heat.name for heat in draw.running_order()] == [
+        "Quarterfinal Heat 1", "Quarterfinal Heat 2", "Quarterfinal Heat 3", "Quarterfinal Heat 4",
+        "Semifinal Heat 1", "Semifinal Heat 2", "Final"]
+
+
+def test_results_fill_in_the_next_round():
+    draw = Draw(entrants(16))
+    semifinal = draw.heats["Semifinal Heat 1"]
+    assert semifinal.entrants() == ["Quarterfinal Heat 1 1st", "Quarterfinal Heat 4 1st",
+                                    "Quarterfinal Heat 3 2nd", "Quarterfinal Heat 2 2nd"]
+    assert draw.result("Quarterfinal Heat 1", ["S9", "S1", "S8", "S16"]) == [semifinal, draw.heats["Semifinal Heat 2"]]
+    assert draw.surfers("Semifinal Heat 1") == ["S9"]
+    assert draw.surfers("Semifinal Heat 2") == ["S1"]
+    # Corrected after a review, until the heat it feeds has a result of its own.
+    draw.result("Quarterfinal Heat 1", ["S1", "S9", "S8", "S16"])
+    assert draw.surfers("Semifinal Heat 1") == ["S1"]
+
+
+def test_byes_advance_without_a_heat():
+    # 5 surfers in heats of 4: one heat of 3 and a bye of 2, who go straight to the final.
+    draw = Draw(entrants(5))
+    first = draw.rounds[0]
+    assert [heat.surfers for heat in first] == [["S1", "S4", "S5"], ["S2", "S3"]]
+    assert first[1].bye and not first[0].bye
+    assert [heat.name for heat in draw.running_order()] == ["Semifinal Heat 1", "Final"]
+    assert draw.rounds[1][0].entrants() == ["Semifinal Heat 1 1st", "S2", "S3", "Semifinal Heat 1 2nd"]
+    draw.result("Semifinal Heat 1", ["S5", "S4", "S1"])
+    draw.result("Final", ["S3", "S5", "S2", "S4"])
+    assert draw.winner() == "S3"
+
+
+@pytest.mark.parametrize("heat_size, advance", [(2, 1), (3, 1), (4, 1), (4, 2)])
+@pytest.mark.parametrize("count", [2, 3, 7, 33, 100])
+def test_every_draw_reaches_a_winner(heat_size, advance, count):
+    draw = Draw(entrants(count), heat_size, advance)
+    for heat in draw.running_order():
+        assert heat.drawn and 2 <= len(heat.surfers) <= heat_size
+        draw.result(heat.name, heat.surfers)
+    assert draw.winner() == "S1"
+
+
+def test_bad_draws_and_results_are_refused():
+    with pytest.raises(DrawError):
+        Draw(["Kelly"])
+    with pytest.raises(DrawError):
+        Draw(entrants(8), heat_size=5)
+    with pytest.raises(DrawError):
+        Draw(entrants(8), heat_size=4, advance=3)
+    with pytest.raises(DrawError, match="twice"):
+        Draw(["Kelly", "John", "Kelly"])
+    draw = Draw(entrants(16))
+    with pytest.raises(DrawError, match="waiting"):
+        draw.result("Final", [])
+    with pytest.raises(DrawError, match="did not surf"):
+        draw.result("Quarterfinal Heat 1", ["S2", "S1"])
+    with pytest.raises(DrawError, match="top 2"):
+        draw.result("Quarterfinal Heat 1", ["S1"])
+
+
+def test_a_512_entrant_draw_and_every_advancement_in_well_under_a_second():
+    started = time.perf_counter()
+    draw = Draw(entrants(512))
+    for heat in draw.running_order():
+        draw.result(heat.name, list(reversed(heat.surfers)))
+    elapsed = time.perf_counter() - started
+    assert len(draw.running_order()) == 255
+    assert draw.winner() is not None
+    assert elapsed < 0.5
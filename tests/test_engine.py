@@ -0,0 +1,211 @@
+import time
+
+import pytest
+
+from engine import EVENTS, FINISHED, IDLE, LATE_CUE_NS, RUNNING, STOPPED, WARNING, TimerEngine
+from heats import Heat, HeatQueue
+from scheduler import NS_PER_MS, NS_PER_SEC
+
+
+def record_events(engine, clock):
+    """[(event, args, seconds since the clock's start), ...] of everything engine emits."""
+    events = []
+    origin_ns = clock()
+    for event in EVENTS:
+        engine.subscribe(event, lambda *args, event=event: events.append(
+            (event, args, (clock() - origin_ns) / NS_PER_SEC)))
+    return events
+
+
+def run(engine, clock, until_ns=None):
+    """Poll engine at each deadline it asks for, as the Tk after() chain does."""
+    deadline_ns = engine.next_deadline_ns()
+    while deadline_ns is not None and (until_ns is None or deadline_ns <= until_ns):
+        clock.now_ns = deadline_ns
+        deadline_ns = engine.poll()
+
+
+def named(events, *names):
+    return [event for event in events if event[0] in names]
+
+
+def test_heat_runs_through_every_state(clock):
+    engine = TimerEngine(10, 5, clock=clock)
+    events = record_events(engine, clock)
+    assert engine.state == IDLE
+
+    engine.start()
+    assert engine.state == RUNNING
+    assert engine.finish_ns == engine.start_ns + 10 * NS_PER_SEC
+    run(engine, clock)
+
+    assert engine.state == FINISHED
+    assert engine.next_deadline_ns() is None
+    assert named(events, "start", "cue", "warning", "finish") == [
+        ("start", (), 0.0),
+        ("cue", ("start",), 0.0),
+        ("cue", ("warning",), 5.0),
+        ("warning", (5,), 5.0),
+        ("cue", ("ending",), 10.0),
+        ("finish", (), 10.0)]
+    assert [args[0] for event, args, _ in events if event == "tick"] == [9, 8, 7, 6, 5, 4, 3, 2, 1]
+    assert not named(events, "late_cue")
+
+
+def test_cue_points_fire_once_each_in_order(clock):
+    engine = TimerEngine(10, 0, clock=clock, cue_points=(8, 3, 30))
+    events = record_events(engine, clock)
+    engine.start()
+    run(engine, clock)
+    # 30 is longer than the heat and is left out.
+    assert named(events, "cue") == [("cue", ("start",), 0.0), ("cue", ("T-8",), 2.0),
+                                    ("cue", ("T-3",), 7.0), ("cue", ("ending",), 10.0)]
+
+
+def test_late_poll_fires_each_cue_once_and_reports_it_late(clock):
+    engine = TimerEngine(10, 5, clock=clock, cue_points=(7,))
+    events = record_events(engine, clock)
+    engine.start()
+    late_ns = 100 * NS_PER_MS
+    clock.now_ns = engine.start_ns + 5 * NS_PER_SEC + late_ns
+    engine.poll()
+
+    assert [args[0] for _, args, _ in named(events, "cue")] == ["start", "T-7", "warning"]
+    assert named(events, "late_cue") == [("late_cue", ("T-7", 2 * NS_PER_SEC + late_ns), 5.1),
+                                         ("late_cue", ("warning", late_ns), 5.1)]
+    assert engine.state == WARNING
+    # A poll just inside the tolerance is not late.
+    clock.now_ns = engine.finish_ns + LATE_CUE_NS
+    engine.poll()
+    assert [args[0] for _, args, _ in named(events, "late_cue")] == ["T-7", "warning"]
+    assert engine.state == FINISHED
+
+
+def test_cue_lead_triggers_cues_early(clock):
+    engine = TimerEngine(10, 5, clock=clock, cue_lead=lambda cue: 50 * NS_PER_MS)
+    events = record_events(engine, clock)
+    engine.start()
+    # Started now, the countdown begins once the start horn is audible.
+    assert engine.start_ns == clock() + 50 * NS_PER_MS
+    run(engine, clock)
+    assert [(args[0], at) for _, args, at in named(events, "cue")] == [
+        ("start", 0.0), ("warning", 5.0), ("ending", 10.0)]
+
+
+def test_stop_drops_pending_cues(clock):
+    engine = TimerEngine(10, 5, clock=clock)
+    events = record_events(engine, clock)
+    engine.start()
+    run(engine, clock, until_ns=engine.start_ns + 3 * NS_PER_SEC)
+    engine.stop()
+
+    assert engine.state == STOPPED
+    assert engine.pending_cues == []
+    assert engine.next_deadline_ns() is None
+    clock.now_ns += 20 * NS_PER_SEC
+    assert engine.poll() is None
+    engine.stop()
+    assert len(named(events, "stop")) == 1
+    assert not named(events, "warning", "finish")
+    assert engine.remaining_seconds() == 0
+
+
+def test_reset_returns_to_idle(clock):
+    engine = TimerEngine(10, 5, clock=clock)
+    events = record_events(engine, clock)
+    engine.start()
+    clock.now_ns += 2 * NS_PER_SEC
+    engine.poll()
+    engine.reset()
+
+    assert engine.state == IDLE
+    assert engine.start_ns is None and engine.finish_ns is None
+    assert engine.remaining_seconds() == 10
+    assert [event for event, _, _ in events][-2:] == ["stop", "reset"]
+
+
+def test_resume_skips_cues_missed_while_closed(clock):
+    engine = TimerEngine(10, 5, clock=clock, cue_points=(8,))
+    events = record_events(engine, clock)
+    start_ns = clock() - 6 * NS_PER_SEC
+    assert engine.resume(start_ns, ["T-8", "warning", "ending"])
+
+    assert named(events, "resume") == [("resume", (["T-8", "warning"],), 0.0)]
+    assert engine.state == WARNING
+    run(engine, clock)
+    assert [args[0] for _, args, _ in named(events, "cue")] == ["ending"]
+    assert engine.finish_ns == start_ns + 10 * NS_PER_SEC
+
+
+def test_resume_of_a_finished_heat_is_refused(clock):
+    engine = TimerEngine(10, 5, clock=clock)
+    assert not engine.resume(clock() - 11 * NS_PER_SEC, ["ending"])
+    assert engine.state == IDLE
+
+
+@pytest.mark.parametrize("changeover", [0, 3])
+def test_queue_changes_over_into_the_next_heat(clock, changeover):
+    engine = TimerEngine(10, 5, clock=clock)
+    queue = HeatQueue(engine, changeover, clock=clock)
+    events = record_events(engine, clock)
+    started = []
+    queue.subscribe("heat", lambda heat: started.append(heat.name))
+    queue.add(Heat("Heat 1", 10, 5, {}))
+    queue.add(Heat("Heat 2", 6, 2, {}))
+
+    queue.start()
+    first_finish_ns = engine.finish_ns
+    planned = [(heat.name, start_ns, finish_ns) for heat, start_ns, finish_ns in queue.timeline()]
+    assert planned[1] == ("Heat 2", first_finish_ns + changeover * NS_PER_SEC,
+                          first_finish_ns + (changeover + 6) * NS_PER_SEC)
+    run(engine, clock)
+
+    assert started == ["Heat 1", "Heat 2"]
+    assert all(heat.done for heat in queue.heats)
+    assert queue.current is None
+    assert engine.finish_ns == planned[1][2]
+    cues = [(args[0], at) for _, args, at in named(events, "cue")]
+    if changeover:
+        # The next heat's start horn sounds at the end of the changeover.
+        assert cues == [("start", 0.0), ("warning", 5.0), ("ending", 10.0),
+                        ("start", 13.0), ("warning", 17.0), ("ending", 19.0)]
+    else:
+        # The finish horn doubles as the next start horn.
+        assert cues == [("start", 0.0), ("warning", 5.0), ("ending", 10.0),
+                        ("warning", 14.0), ("ending", 16.0)]
+
+
+def test_cue_points_changed_mid_heat_apply_from_the_next_heat(clock):
+    engine = TimerEngine(10, 0, clock=clock, cue_points=(8,))
+    queue = HeatQueue(engine, 0, clock=clock, cue_points=(8,))
+    events = record_events(engine, clock)
+    queue.add(Heat("Heat 1", 10, 0, {}))
+    queue.add(Heat("Heat 2", 10, 0, {}))
+
+    queue.start()
+    run(engine, clock, until_ns=engine.start_ns + 5 * NS_PER_SEC)
+    queue.set_cue_points((4, 2))
+    run(engine, clock)
+
+    assert [(args[0], at) for _, args, at in named(events, "cue")] == [
+        ("start", 0.0), ("T-8", 2.0), ("ending", 10.0),
+        ("T-4", 16.0), ("T-2", 18.0), ("ending", 20.0)]
+
+
+def test_thousands_of_simulated_heats_per_second(clock):
+    heats = 2000
+    engine = TimerEngine(10, 5, clock=clock)
+    queue = HeatQueue(engine, 0, clock=clock)
+    finished = []
+    engine.subscribe("finish", lambda: finished.append(clock()))
+    for number in range(heats):
+        queue.add(Heat(f"Heat {number + 1}", 10, 5, {}))
+
+    started_ns = time.perf_counter_ns()
+    queue.start()
+    run(engine, clock)
+    elapsed_s = (time.perf_counter_ns() - started_ns) / NS_PER_SEC
+
+    assert len(finished) == heats
+    assert finished[-1] - finished[0] == (heats - 1) * 10 * NS_PER_SEC
+    assert heats / elapsed_s > 1000
@@ -0,0 +1,89 @@
+import json
+import time
+
+import pytest
+
+import journal
+from journal import FSYNC_ALWAYS, FSYNC_INTERVAL, FSYNC_NEVER, Journal
+
+
+@pytest.fixture
+def fsyncs(monkeypatch):
+    calls = []
+    real_fsync = journal.os.fsync
+
+    def fsync(fd):
+        calls.append(fd)
+        real_fsync(fd)
+
+    monkeypatch.setattr(journal.os, "fsync", fsync)
+    return calls
+
+
+def read_back(path):
+    with open(path, encoding="utf-8") as file:
+        return [json.loads(line) for line in file]
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert condition()
+
+
+def test_entries_queued_together_are_written_as_one_batch(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    log = Journal(str(path))
+    for second in range(5):
+        log.record("tick", "North Peak", remaining=300 - second)
+    log.start()
+    log.close()
+
+    assert (log.batches, log.records_written) == (1, 5)
+    entries = read_back(path)
+    assert [entry["remaining"] for entry in entries] == [300, 299, 298, 297, 296]
+    assert {entry["event"] for entry in entries} == {"tick"}
+    assert {entry["arena"] for entry in entries} == {"North Peak"}
+    assert all(entry["mono_ns"] > 0 and entry["wall_ns"] > 0 for entry in entries)
+
+
+def test_close_writes_what_is_still_queued(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    path.write_text('{"event":"earlier"}\n')
+    log = Journal(str(path))
+    log.start()
+    log.record("start", heat="Heat 1")
+    log.record("finish", heat="Heat 1", results=["Kelly", "Stephanie"])
+    log.close()
+
+    assert not log.thread.is_alive()
+    assert [entry["event"] for entry in read_back(path)] == ["earlier", "start", "finish"]
+    assert read_back(path)[-1]["results"] == ["Kelly", "Stephanie"]
+
+
+@pytest.mark.parametrize("policy, syncs", [(FSYNC_ALWAYS, 2), (FSYNC_INTERVAL, 1), (FSYNC_NEVER, 0)])
+def test_fsync_policy(tmp_path, fsyncs, policy, syncs):
+    # Two batches well inside one interval: always syncs each, interval only once on close.
+    log = Journal(str(tmp_path / "journal.jsonl"), fsync=policy, fsync_interval=3600)
+    log.start()
+    log.record("start")
+    wait_for(lambda: log.batches == 1)
+    log.record("stop")
+    wait_for(lambda: log.batches == 2)
+    log.close()
+    assert len(fsyncs) == syncs
+
+
+def test_interval_fsync_happens_without_further_records(tmp_path, fsyncs):
+    log = Journal(str(tmp_path / "journal.jsonl"), fsync=FSYNC_INTERVAL, fsync_interval=0.05)
+    log.start()
+    log.record("start")
+    wait_for(lambda: fsyncs)
+    log.close()
+    assert log.records_written == 1
+
+
+def test_unknown_fsync_policy_is_refused(tmp_path):
+    with pytest.raises(ValueError, match="fsync policy"):
+        Journal(str(tmp_path / "journal.jsonl"), fsync="sometimes")
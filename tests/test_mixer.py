@@ -0,0 +1,78 @@
+import numpy as np
+
+from mixer import INT16_MAX, INT16_MIN, Mixer
+
+
+def level(value, frames, nchannels=1):
+    """A buffer of frames held at value, as 16-bit PCM bytes."""
+    return np.full((frames, nchannels), value, dtype=np.int16).tobytes()
+
+
+def output(mixer, frames):
+    return np.frombuffer(mixer.mix(frames), dtype=np.int16).reshape(-1, mixer.nchannels)
+
+
+def test_overlapping_voices_are_summed():
+    mixer = Mixer(2, voices=8)
+    mixer.play(level(1000, 6, 2), name="horn")
+    mixer.play(level(-300, 3, 2), name="beep")
+
+    first = output(mixer, 4)
+    assert first.shape == (4, 2)
+    assert first[:, 0].tolist() == [700, 700, 700, 1000]
+    second = output(mixer, 4)
+    # The horn runs out two frames in; the rest of the block is silence.
+    assert second[:, 1].tolist() == [1000, 1000, 0, 0]
+    assert not mixer.active
+    assert mixer.mix(4) == b""
+
+
+def test_a_new_sound_takes_the_oldest_voice_when_all_are_busy():
+    started = []
+    mixer = Mixer(1, voices=8, on_start=lambda name, trigger_ns: started.append(name))
+    for index in range(8):
+        assert mixer.play(level(1, 100), trigger_ns=index, name=f"cue {index}") == index
+    mixer.mix(10)
+    assert mixer.play(level(1, 100), trigger_ns=100, name="late") == 0
+
+    assert output(mixer, 10)[:, 0].tolist() == [8] * 10
+    assert started == [f"cue {index}" for index in range(8)] + ["late"]
+    # A voice that has played out is free again before the oldest busy one is taken.
+    assert mixer.play(level(1, 5), trigger_ns=200, name="short") == 1
+    mixer.mix(5)
+    assert mixer.play(level(1, 5), trigger_ns=300) == 1
+
+
+def test_stop_by_name_leaves_other_voices_playing():
+    mixer = Mixer(1, voices=8)
+    mixer.play(level(100, 50), name="horn")
+    mixer.play(level(10, 50), name="beep")
+    mixer.play(level(1, 50), name="horn")
+    mixer.mix(5)
+
+    mixer.stop(name="horn")
+    assert output(mixer, 5)[:, 0].tolist() == [10] * 5
+    mixer.stop()
+    assert mixer.mix(5) == b""
+
+
+def test_gain_scales_and_can_change_mid_sound():
+    mixer = Mixer(1, voices=8)
+    voice = mixer.play(level(1000, 20), gain=0.5)
+    assert output(mixer, 5)[:, 0].tolist() == [500] * 5
+    mixer.set_gain(voice, 0.25)
+    assert output(mixer, 5)[:, 0].tolist() == [250] * 5
+
+
+def test_sums_beyond_16_bits_are_clipped():
+    mixer = Mixer(1, voices=8)
+    mixer.play(level(30000, 4))
+    mixer.play(level(30000, 2))
+    mixer.play(level(-30000, 4), gain=2.0)
+    mixer.play(level(-30000, 4), gain=2.0)
+    assert output(mixer, 4)[:, 0].tolist() == [INT16_MIN, INT16_MIN, INT16_MIN, INT16_MIN]
+
+    mixer = Mixer(1, voices=8)
+    mixer.play(level(INT16_MAX, 4))
+    mixer.play(level(INT16_MAX, 4))
+    assert output(mixer, 4)[:, 0].tolist() == [INT16_MAX] * 4
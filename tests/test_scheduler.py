@@ -0,0 +1,49 @@
+from scheduler import (NS_PER_MS, NS_PER_SEC, DeadlineScheduler, TickScheduler, delay_ms, remaining_seconds,
+                       summarise_ns)
+
+
+def test_ticks_stay_on_whole_seconds_of_the_origin(clock):
+    ticker = TickScheduler(clock)
+    origin_ns = ticker.start()
+    assert ticker.next_deadline_ns() == origin_ns + NS_PER_SEC
+    # A late tick shortens the next delay instead of pushing later ticks back.
+    clock.now_ns = origin_ns + NS_PER_SEC + 300 * NS_PER_MS
+    ticker.record_tick()
+    assert ticker.next_delay_ms() == 700
+    assert ticker.next_deadline_ns() == origin_ns + 2 * NS_PER_SEC
+    # Missed ticks are skipped, not queued up.
+    clock.now_ns = origin_ns + 5 * NS_PER_SEC + 1
+    assert ticker.next_deadline_ns() == origin_ns + 6 * NS_PER_SEC
+    assert ticker.lateness_stats()["max_ms"] == 300.0
+
+
+def test_rounding():
+    assert delay_ms(NS_PER_MS + 1, 0) == 2
+    assert delay_ms(0, NS_PER_MS) == 0
+    assert remaining_seconds(10 * NS_PER_SEC, NS_PER_SEC // 2) == 10
+    assert remaining_seconds(10 * NS_PER_SEC, 10 * NS_PER_SEC) == 0
+
+
+def test_summary_percentiles():
+    stats = summarise_ns([ms * NS_PER_MS for ms in range(1, 101)])
+    assert (stats["count"], stats["p50_ms"], stats["p95_ms"], stats["p99_ms"], stats["max_ms"]) == (100, 50, 95, 99, 100)
+    assert summarise_ns([])["count"] == 0
+
+
+def test_deadlines_run_in_order_and_cancelled_ones_are_skipped(clock):
+    scheduler = DeadlineScheduler(clock)
+    ran = []
+    earlier = []
+    scheduler.on_earlier = lambda: earlier.append(scheduler.next_deadline_ns())
+    scheduler.schedule(30, lambda: ran.append("c"))
+    scheduler.schedule(10, lambda: ran.append("a"))
+    cancelled = scheduler.schedule(5, lambda: ran.append("cancelled"))
+    scheduler.schedule(10, lambda: ran.append("b"))
+    DeadlineScheduler.cancel(cancelled)
+
+    assert earlier == [30, 10, 5]
+    assert scheduler.next_deadline_ns() == 10
+    assert scheduler.run_due(10) == 30
+    assert ran == ["a", "b"]
+    assert scheduler.run_due(100) is None
+    assert ran == ["a", "b", "c"]
@@ -0,0 +1,130 @@
+import itertools
+import random
+
+import pytest
+
+from engine import TimerEngine
+from heats import Heat, HeatQueue
+from scheduler import NS_PER_SEC
+from scoring import HeatScores, Leaderboard, ScoreError, hundredths
+
+
+def totals(board):
+    return [(row["surfer"], row["total"], row["needs"], row["combo"]) for row in board.standings()]
+
+
+def test_best_two_waves_count():
+    board = Leaderboard(["Kelly", "John"])
+    for wave, score in enumerate([4.5, 7.0, 6.5, 2.0], 1):
+        board.add("Kelly", wave, score, 0)
+    assert board.surfers["Kelly"].total == 1350
+    assert board.standings()[0]["waves"] == [7.0, 6.5]
+    assert board.leader().name == "Kelly"
+
+
+def test_needs_score_includes_the_tie_break():
+    board = Leaderboard()
+    board.add("Kelly", 1, 8.0, 0)
+    board.add("Kelly", 2, 5.0, 0)
+    board.add("John", 1, 6.0, 0)
+    # 6.0 + 7.0 ties 13.00, and John's best wave (7.0) would lose the tie to Kelly's 8.0.
+    assert totals(board)[1] == ("John", 6.0, 7.01, False)
+    board.add("Mick", 1, 8.5, 0)
+    # 8.5 + 4.5 ties 13.00 and wins it on the best wave.
+    assert [row for row in totals(board) if row[0] == "Mick"] == [("Mick", 8.5, 4.5, False)]
+
+
+def test_combo_when_no_single_wave_will_do():
+    board = Leaderboard(["Joel"])
+    board.add("Kelly", 1, 9.5, 0)
+    board.add("Kelly", 2, 9.0, 0)
+    board.add("John", 1, 3.0, 0)
+    assert totals(board)[1:] == [("John", 3.0, None, True), ("Joel", 0.0, None, True)]
+
+
+def test_rescoring_a_wave_replaces_it():
+    board = Leaderboard()
+    board.add("Kelly", 1, 9.0, 0)
+    board.add("Kelly", 2, 6.0, 0)
+    board.add("Kelly", 3, 5.0, 0)
+    board.add("John", 1, 7.0, 0)
+    board.add("John", 2, 7.0, 0)
+    assert board.leader().name == "Kelly"
+    # A judges' review marks Kelly's best wave down: her third wave counts again, John leads.
+    board.add("Kelly", 1, 3.0, 0)
+    assert board.surfers["Kelly"].best == [600, 500]
+    assert board.leader().name == "John"
+    # 6.0 + 8.0 ties John's 14.00 and wins it on the best wave.
+    assert totals(board)[1] == ("Kelly", 11.0, 8.0, False)
+
+
+def test_needs_matches_a_brute_force_search():
+    generator = random.Random(7)
+    for _ in range(100):
+        board = Leaderboard()
+        for surfer, wave in itertools.product("ABCD", range(generator.randint(0, 3))):
+            board.add(surfer, wave, generator.randint(0, 1000) / 100, 0)
+        leader = board.leader()
+        for surfer in board.surfers.values():
+            if surfer is leader:
+                continue
+            wins = []
+            for x in range(1001):
+                best = sorted(surfer.best + [x], reverse=True)[:2]
+                if (sum(best), best[0]) > leader.rank_key():
+                    wins.append(x)
+            assert board.needs(surfer) == (wins[0] if wins else None)
+
+
+def test_scores_only_count_while_the_heat_is_on():
+    board = Leaderboard(["Kelly"], opens_ns=1_000, closes_ns=2_000)
+    with pytest.raises(ScoreError, match="not started"):
+        board.add("Kelly", 1, 5.0, 999)
+    board.add("Kelly", 1, 5.0, 1_000)
+    board.add("Kelly", 2, 6.0, 1_999)
+    with pytest.raises(ScoreError, match="over"):
+        board.add("Kelly", 3, 9.0, 2_000)
+    final = board.freeze()
+    with pytest.raises(ScoreError):
+        board.add("Kelly", 3, 9.0, 1_500)
+    assert board.standings() is final
+    assert final[0]["total"] == 11.0
+
+
+@pytest.mark.parametrize("bad", ["", "high", None, -0.5, 10.01, True, "inf", "nan", 1e308])
+def test_bad_scores_are_refused(bad):
+    with pytest.raises(ScoreError):
+        hundredths(bad)
+    with pytest.raises(ScoreError):
+        Leaderboard().add("Kelly", "first", 5.0, 0)
+
+
+def test_queued_heats_publish_their_own_board_across_the_changeover(clock):
+    engine = TimerEngine(10, 0, clock=clock)
+    scores = HeatScores(engine, lambda: queue.current)
+    published = []
+
+    def publish():
+        # As EventTimer does on start and finish, before the queue moves on.
+        published.append(dict(scores.state(), heat=queue.current.name))
+
+    engine.subscribe("start", publish)
+    engine.subscribe("finish", publish)
+    queue = HeatQueue(engine, 0, clock=clock)
+    queue.extend([Heat("Heat 1", 10, 0, {}, ["Kelly", "John"]), Heat("Heat 2", 10, 0, {}, ["Carissa", "Tyler"])])
+    queue.start()
+    scores.add("Kelly", 1, 7.5, engine.start_ns + NS_PER_SEC)
+    clock.now_ns = engine.finish_ns
+    engine.poll()
+
+    finished, started = published[1:]
+    assert (finished["heat"], finished["final"]) == ("Heat 1", True)
+    assert [row["surfer"] for row in finished["leaderboard"]] == ["Kelly", "John"]
+    assert (started["heat"], started["final"]) == ("Heat 2", False)
+    assert [(row["surfer"], row["total"]) for row in started["leaderboard"]] == [("Carissa", 0), ("Tyler", 0)]
+    assert started["last_results"] == {"heat": "Heat 1", "standings": finished["leaderboard"]}
+
+    # The last results stay up until the next heat is scored.
+    scores.add("Tyler", 1, 5.0, engine.start_ns + NS_PER_SEC)
+    assert scores.state()["last_results"] is None
+    assert scores.state()["leaderboard"][0]["surfer"] == "Tyler"
@@ -0,0 +1,86 @@
+import configparser
+import os
+
+import pytest
+
+from settings import SECTION, Settings, SettingsError, SettingsStore, parse_cue_points
+
+
+def write_config(path, **values):
+    lines = [f"[{SECTION}]"] + [f"{name} = {value}" for name, value in values.items()]
+    path.write_text("\n".join(lines) + "\n")
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = tmp_path / "config.ini"
+    write_config(path, event_duration=1200, warning_time=300)
+    store = SettingsStore(str(path))
+    yield store
+    store.close()
+
+
+def test_values_are_typed_and_defaulted():
+    settings = Settings.parse({"event_duration": "1200", "callouts": "yes", "broadcast_port": ""})
+    assert settings.event_duration == 1200
+    assert settings.callouts is True
+    assert settings.broadcast_port is None
+    assert settings.warning_time == Settings.warning_time
+
+
+def test_every_bad_value_is_named():
+    with pytest.raises(SettingsError) as error:
+        Settings.parse({"event_duration": "0", "warning_time": "soon", "display_mode": "neon",
+                        "cue_points": "60, ten"})
+    message = str(error.value)
+    for name in ("event_duration", "warning_time", "display_mode", "cue_points"):
+        assert name in message
+
+
+def test_bad_values_fall_back_when_asked():
+    settings = Settings.parse({"event_duration": "-5", "warning_time": "7"}, fallback=Settings(event_duration=90))
+    assert (settings.event_duration, settings.warning_time) == (90, 7)
+
+
+def test_cue_points_are_sorted_and_unique():
+    assert parse_cue_points("10, 300,60 ,10") == (300, 60, 10)
+    assert parse_cue_points("") == ()
+
+
+def test_update_saves_and_notifies(store):
+    seen = []
+    store.subscribe(seen.append)
+    store.update(warning_time="60")
+    store.close()
+
+    assert seen[-1].warning_time == 60
+    saved = configparser.ConfigParser()
+    saved.read(store.path)
+    assert saved[SECTION]["warning_time"] == "60"
+    assert saved[SECTION]["event_duration"] == "1200"
+    assert not [name for name in os.listdir(os.path.dirname(store.path)) if name.endswith(".tmp")]
+
+
+def test_update_with_a_bad_value_changes_nothing(store):
+    with pytest.raises(SettingsError):
+        store.update(warning_time="-1")
+    assert store.settings.warning_time == 300
+
+
+def test_external_edits_are_reloaded_unless_bad(store, tmp_path):
+    seen = []
+    store.subscribe(seen.append)
+    path = tmp_path / "config.ini"
+
+    write_config(path, event_duration=900, warning_time=120)
+    os.utime(path, ns=(store.mtime_ns + 1, store.mtime_ns + 1))
+    assert store.check_for_edits()
+    assert store.settings.event_duration == 900
+
+    write_config(path, event_duration="twenty minutes", warning_time=120)
+    os.utime(path, ns=(store.mtime_ns + 2, store.mtime_ns + 2))
+    assert not store.check_for_edits()
+    assert store.settings.event_duration == 900
+    assert len(seen) == 1
+    # The bad file is not read again until it changes.
+    assert not store.check_for_edits()
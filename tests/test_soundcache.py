@@ -0,0 +1,98 @@
+import os
+import shutil
+import threading
+import time
+import wave
+from queue import SimpleQueue
+
+import numpy as np
+import pytest
+
+from soundcache import SUFFIX, SoundCache
+
+RATE = 8000
+# Three entries of this many frames do not fit the cache; two do.
+FRAMES = 400
+MAX_BYTES = 2 * FRAMES * 2
+
+
+def write_wav(path, amplitude, silence=100, frames=FRAMES):
+    """A mono 16-bit square wave of amplitude, after silence frames of silence."""
+    samples = np.zeros(silence + frames, dtype=np.int16)
+    samples[silence:] = amplitude * np.where(np.arange(frames) % 20 < 10, 1, -1)
+    with wave.open(str(path), "wb") as file:
+        file.setnchannels(1)
+        file.setsampwidth(2)
+        file.setframerate(RATE)
+        file.writeframes(samples.tobytes())
+    return str(path)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SoundCache(str(tmp_path / "cache"), MAX_BYTES, sample_rate=RATE, nchannels=1)
+
+
+def cached_files(cache):
+    return sorted(name for name in os.listdir(cache.directory) if name.endswith(SUFFIX))
+
+
+def test_keys_follow_the_contents(cache, tmp_path):
+    horn = write_wav(tmp_path / "horn.wav", 1000)
+    copy = str(tmp_path / "copy.wav")
+    shutil.copy(horn, copy)
+    beep = write_wav(tmp_path / "beep.wav", 2000)
+
+    assert cache.key(horn) == cache.key(copy)
+    assert cache.key(horn) != cache.key(beep)
+    stereo = SoundCache(cache.directory, MAX_BYTES, sample_rate=RATE, nchannels=2)
+    assert stereo.key(horn) != cache.key(horn)
+
+
+def test_a_miss_is_transcoded_once(cache, tmp_path, monkeypatch):
+    horn = write_wav(tmp_path / "horn.wav", 1000)
+    samples = np.frombuffer(cache.load(horn), dtype=np.int16)
+
+    # Leading silence is trimmed and the level brought up to LOUDNESS_DBFS.
+    assert len(samples) == FRAMES
+    assert 4000 < samples.max() < 6000
+    assert cached_files(cache) == [cache.key(horn) + SUFFIX]
+
+    def transcode(path):
+        raise AssertionError("a cached sound was transcoded again")
+
+    monkeypatch.setattr(cache, "transcode", transcode)
+    assert cache.load(horn) == samples.tobytes()
+
+
+def test_least_recently_used_entries_are_evicted(cache, tmp_path):
+    horn, beep, bell = (write_wav(tmp_path / f"{name}.wav", amplitude)
+                        for name, amplitude in (("horn", 1000), ("beep", 2000), ("bell", 3000)))
+    cache.load(horn)
+    cache.load(beep)
+    now = time.time()
+    os.utime(cache.cached_path(cache.key(horn)), (now - 20, now - 20))
+    os.utime(cache.cached_path(cache.key(beep)), (now - 10, now - 10))
+
+    # The hit makes the horn the most recently used, so the beep goes to make room for the bell.
+    cache.load(horn)
+    cache.load(bell)
+    assert cached_files(cache) == sorted(cache.key(path) + SUFFIX for path in (horn, bell))
+
+
+def test_submitted_jobs_run_after_the_thread_dies(cache, tmp_path, monkeypatch):
+    horn = write_wav(tmp_path / "horn.wav", 1000)
+    results = SimpleQueue()
+
+    def fail(path, samples):
+        results.put(path)
+        raise RuntimeError("done failed")
+
+    monkeypatch.setattr(threading, "excepthook", lambda args: None)
+    cache.submit(horn, fail)
+    assert results.get(timeout=5) == horn
+    cache.thread.join(timeout=5)
+    assert not cache.thread.is_alive()
+
+    cache.submit(horn, lambda path, samples: results.put(len(samples)))
+    assert results.get(timeout=5) == FRAMES * 2
@@ -0,0 +1,64 @@
+import time
+
+import pytest
+
+from scheduler import NS_PER_MS, NS_PER_SEC
+from timesync import SYNC_SAMPLES, TimeSyncMaster, TimeSyncSlave
+
+SKEW_NS = 5 * NS_PER_SEC
+
+
+@pytest.fixture
+def slave(clock):
+    # The multicast group is joined but nothing is announced to it; the master is given.
+    slave = TimeSyncSlave(port=0, clock=clock)
+    yield slave
+    slave.announcements.close()
+    slave.sync.close()
+
+
+def test_offset_converges_over_loopback():
+    master = TimeSyncMaster(port=0, sync_port=0, interface="127.0.0.1",
+                            clock=lambda: time.monotonic_ns() + SKEW_NS)
+    slave = TimeSyncSlave(port=0, master=("127.0.0.1", master.sync_port))
+    master.start()
+    slave.start()
+    deadline = time.monotonic() + 5
+    while master.sync_requests < 2 and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    assert slave.synced
+    assert abs(slave.offset_ns - SKEW_NS) < 5 * NS_PER_MS
+    assert 0 <= slave.delay_ns < 5 * NS_PER_MS
+
+
+def test_the_shortest_round_trip_of_the_last_samples_wins(slave):
+    # Master 1 s ahead; a 2 ms round trip split evenly, then one queued 10 ms on the way back.
+    slave.add_sample(0, NS_PER_SEC + NS_PER_MS, NS_PER_SEC + NS_PER_MS, 2 * NS_PER_MS)
+    slave.add_sample(0, NS_PER_SEC + NS_PER_MS, NS_PER_SEC + NS_PER_MS, 12 * NS_PER_MS)
+    assert (slave.offset_ns, slave.delay_ns) == (NS_PER_SEC, 2 * NS_PER_MS)
+
+    # Once the good exchange is pushed out, the best of what is left is used.
+    for _ in range(SYNC_SAMPLES - 1):
+        slave.add_sample(0, NS_PER_SEC + NS_PER_MS, NS_PER_SEC + NS_PER_MS, 4 * NS_PER_MS)
+    assert (slave.offset_ns, slave.delay_ns) == (NS_PER_SEC - NS_PER_MS, 4 * NS_PER_MS)
+    assert len(slave.samples) == SYNC_SAMPLES
+
+
+def test_remaining_time_is_mapped_to_the_local_clock(slave, clock):
+    state = {"heat": "Heat 1", "phase": "running", "finish_ns": clock.now_ns + 60 * NS_PER_SEC,
+             "remaining_ms": 60_000}
+    slave.states[""] = state
+    assert slave.remaining_ns("") is None
+
+    # The master's clock is 1 s ahead, so its finish is 1 s sooner on ours.
+    slave.add_sample(clock.now_ns, clock.now_ns + NS_PER_SEC, clock.now_ns + NS_PER_SEC, clock.now_ns)
+    assert slave.remaining_ns("") == 59 * NS_PER_SEC
+    clock.now_ns += 70 * NS_PER_SEC
+    assert slave.remaining_ns("") == 0
+
+    slave.states[""] = dict(state, phase="stopped", remaining_ms=12_500)
+    assert slave.remaining_ns("") == 12_500 * NS_PER_MS
+    slave.states[""] = dict(state, phase="finished")
+    assert slave.remaining_ns("") == 0
+    assert slave.remaining_ns("North Peak") is None
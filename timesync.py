@@ -0,0 +1,192 @@
+import json
+import logging
+import select
+import socket
+import struct
+import time
+from collections import deque
+from threading import Thread
+
+from scheduler import NS_PER_SEC
+
+logger = logging.getLogger(__name__)
+
+MULTICAST_GROUP = "239.255.42.99"
+ANNOUNCE_PORT = 5007
+SYNC_PORT = 5008
+ANNOUNCE_INTERVAL = 1.0
+SYNC_INTERVAL = 1.0
+# Offset estimates kept by a slave; the one with the shortest round trip is trusted.
+SYNC_SAMPLES = 8
+
+
+def encode(message):
+    return json.dumps(message, separators=(",", ":")).encode()
+
+
+class TimeSyncMaster:
+    """Announces heat state to slave displays over UDP multicast and answers their clock syncs.
+
+    Heat messages give start and finish in the master's time.monotonic_ns() terms and are sent
+    on every change and again every ANNOUNCE_INTERVAL, so a slave that joins late or misses a
+    packet catches up within a second. Sync requests are NTP-style: the slave sends t0, the
+    master replies with its receive time t1 and transmit time t2, and the slave notes t3.
+    """
+
+    def __init__(self, group=MULTICAST_GROUP, port=ANNOUNCE_PORT, sync_port=SYNC_PORT,
+                 interface="0.0.0.0", clock=time.monotonic_ns):
+        self.group = group
+        self.port = port
+        self.clock = clock
+        self.states = {}
+        self.sequence = 0
+        self.sync_requests = 0
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((interface, sync_port))
+        self.sync_port = self.sock.getsockname()[1]
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+        if interface != "0.0.0.0":
+            self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(interface))
+        self.thread = Thread(target=self.run, name="timesync-master", daemon=True)
+
+    def start(self):
+        logger.info(f'Announcing heats to {self.group}:{self.port}, clock sync on port {self.sync_port}')
+        self.thread.start()
+
+    def publish(self, arena, state):
+        """Announce a new state for arena straight away; called from the Tk thread."""
+        self.states[arena] = dict(state)
+        self.announce(arena)
+
+    def announce(self, arena):
+        self.sequence += 1
+        message = {"type": "heat", "arena": arena, "seq": self.sequence, "sync_port": self.sync_port,
+                   "sent_ns": self.clock(), **self.states[arena]}
+        self.sock.sendto(encode(message), (self.group, self.port))
+
+    def run(self):
+        next_announce = time.monotonic() + ANNOUNCE_INTERVAL
+        while True:
+            readable, _, _ = select.select([self.sock], [], [], max(next_announce - time.monotonic(), 0))
+            if readable:
+                data, address = self.sock.recvfrom(2048)
+                received_ns = self.clock()
+                try:
+                    request = json.loads(data)
+                except ValueError:
+                    continue
+                if request.get("type") == "sync":
+                    self.sync_requests += 1
+                    self.sock.sendto(encode({"type": "sync", "t0": request["t0"], "t1": received_ns,
+                                             "t2": self.clock()}), address)
+            if time.monotonic() >= next_announce:
+                next_announce += ANNOUNCE_INTERVAL
+                for arena in list(self.states):
+                    self.announce(arena)
+
+
+class TimeSyncSlave:
+    """Follows a TimeSyncMaster: heat state from its announcements and a running clock offset.
+
+    offset_ns is master minus local monotonic time, taken from the sync exchange with the
+    shortest round trip among the last SYNC_SAMPLES, since the least delayed exchange is the
+    least skewed by asymmetric queuing. Everything the master sends in its own time can then
+    be mapped to this machine with to_local().
+    """
+
+    def __init__(self, group=MULTICAST_GROUP, port=ANNOUNCE_PORT, interface="0.0.0.0",
+                 master=None, clock=time.monotonic_ns):
+        self.clock = clock
+        self.master = master
+        self.states = {}
+        self.samples = deque(maxlen=SYNC_SAMPLES)
+        self.offset_ns = None
+        self.delay_ns = None
+
+        self.announcements = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.announcements.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.announcements.bind(("", port))
+        membership = struct.pack("4s4s", socket.inet_aton(group), socket.inet_aton(interface))
+        self.announcements.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+        self.sync = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.thread = Thread(target=self.run, name="timesync-slave", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def run(self):
+        next_sync = time.monotonic()
+        while True:
+            if self.master is not None and time.monotonic() >= next_sync:
+                next_sync = time.monotonic() + SYNC_INTERVAL
+                self.sync.sendto(encode({"type": "sync", "t0": self.clock()}), self.master)
+            timeout = max(next_sync - time.monotonic(), 0) if self.master is not None else SYNC_INTERVAL
+            readable, _, _ = select.select([self.announcements, self.sync], [], [], timeout)
+            for sock in readable:
+                data, address = sock.recvfrom(2048)
+                received_ns = self.clock()
+                try:
+                    message = json.loads(data)
+                except ValueError:
+                    continue
+                if message.get("type") == "heat":
+                    self.states[message["arena"]] = message
+                    if self.master is None:
+                        # Sync with whoever is announcing, on the port it advertises.
+                        self.master = (address[0], message["sync_port"])
+                        logger.info(f'Following time-sync master at {address[0]}')
+                        next_sync = time.monotonic()
+                elif message.get("type") == "sync":
+                    self.add_sample(message["t0"], message["t1"], message["t2"], received_ns)
+
+    def add_sample(self, t0, t1, t2, t3):
+        """Record one exchange: t0/t3 local send/receive, t1/t2 master receive/send."""
+        offset_ns = ((t1 - t0) + (t2 - t3)) // 2
+        delay_ns = (t3 - t0) - (t2 - t1)
+        self.samples.append((delay_ns, offset_ns))
+        self.delay_ns, self.offset_ns = min(self.samples)
+
+    @property
+    def synced(self):
+        return self.offset_ns is not None
+
+    def to_local(self, master_ns):
+        return master_ns - self.offset_ns
+
+    def remaining_ns(self, arena, now_ns=None):
+        """Time left in arena's heat by this machine's clock, or None before state and a sync arrive."""
+        state = self.states.get(arena)
+        if state is None or not self.synced:
+            return None
+        if state["phase"] in ("running", "warning"):
+            now_ns = self.clock() if now_ns is None else now_ns
+            return max(self.to_local(state["finish_ns"]) - now_ns, 0)
+        if state["phase"] == "finished":
+            return 0
+        return state["remaining_ms"] * NS_PER_SEC // 1000
+
+
+if __name__ == "__main__":
+    # Loopback check: a master and a slave on this machine, reporting how closely the slave's
+    # countdown follows the master's.
+    logging.basicConfig(level=logging.INFO)
+    master = TimeSyncMaster(port=ANNOUNCE_PORT, sync_port=0)
+    slave = TimeSyncSlave(port=ANNOUNCE_PORT)
+    slave.start()
+    master.start()
+    start_ns = time.monotonic_ns()
+    master.publish("", {"heat": "Loopback", "phase": "running", "start_ns": start_ns,
+                        "finish_ns": start_ns + 60 * NS_PER_SEC, "remaining_ms": 60000, "colour": "white"})
+    for _ in range(5):
+        time.sleep(SYNC_INTERVAL)
+        now_ns = time.monotonic_ns()
+        remaining_ns = slave.remaining_ns("", now_ns)
+        if remaining_ns is None:
+            print("not synced yet")
+            continue
+        error_us = (remaining_ns - (start_ns + 60 * NS_PER_SEC - now_ns)) / 1000
+        print(f"offset: {slave.offset_ns / 1000:.1f} us, round trip: {slave.delay_ns / 1000:.1f} us, "
+              f"countdown error: {error_us:.1f} us, samples: {len(slave.samples)}")
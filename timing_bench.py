@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""Timing-accuracy benchmark for the timer under load.
+
+Runs several heats back to back on the shared DeadlineScheduler, woken the way App wakes it
+(one Tk after() chain, or with --headless a sleeping loop standing in for Tk), once for each
+stress scenario:
+
+    idle      nothing else running
+    tk-queue  the event loop kept busy with 1 ms callbacks, as a heavy redraw would
+    gc        a thread churning cyclic garbage, so the collector keeps stopping the world
+    cpu       a process spinning on every core and a thread competing for the GIL
+    disk      a thread logging to a file as fast as it can, with an fsync every 100 records
+    all       everything at once
+
+Each reports tick lateness (tick deadline to the engine handling it) and cue latency (cue
+trigger deadline to the cue listener running) as p50/p95/p99/max, and with --audio the audio
+worker's trigger-to-onset latency too. --json writes the results; --baseline compares them
+with an earlier --json file and --limit sets absolute ceilings, and the run exits with
+status 1 if any is exceeded.
+
+    python timing_bench.py --seconds 20 --json bench.json
+    python timing_bench.py --baseline bench.json --tolerance 0.5 --limit tick_lateness.p99_ms=5
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+from threading import Event, Thread
+
+from engine import TimerEngine
+from scheduler import NS_PER_MS, NS_PER_SEC, DeadlineScheduler, delay_ms, summarise_ns
+
+SCENARIOS = {"idle": (),
+             "tk-queue": ("tk-queue",),
+             "gc": ("gc",),
+             "cpu": ("cpu",),
+             "disk": ("disk",),
+             "all": ("tk-queue", "gc", "cpu", "disk")}
+BUSY_CHUNK_NS = NS_PER_MS
+SOUNDS = {"start": "starting_sound.mp3", "warning": "warning_sound.mp3", "ending": "finish_sound.mp3"}
+
+
+def spin_for(duration_ns):
+    end_ns = time.perf_counter_ns() + duration_ns
+    while time.perf_counter_ns() < end_ns:
+        pass
+
+
+def spin_forever():
+    while True:
+        pass
+
+
+class TkDriver:
+    """Wakes the scheduler from a single after() chain, exactly as App does."""
+
+    def __init__(self, scheduler):
+        from tkinter import Tk
+        self.root = Tk()
+        self.root.withdraw()
+        self.scheduler = scheduler
+        self.wake_id = None
+        self.wake_ns = None
+        self.busy = False
+        scheduler.on_earlier = self.arm_wake
+
+    def arm_wake(self):
+        deadline_ns = self.scheduler.next_deadline_ns()
+        if deadline_ns is None or deadline_ns == self.wake_ns:
+            return
+        if self.wake_id is not None:
+            self.root.after_cancel(self.wake_id)
+        self.wake_ns = deadline_ns
+        self.wake_id = self.root.after(delay_ms(deadline_ns, time.monotonic_ns()), self.wake)
+
+    def wake(self):
+        self.wake_id = None
+        self.wake_ns = None
+        self.scheduler.run_due()
+        self.arm_wake()
+
+    def busy_chunk(self):
+        if self.busy:
+            spin_for(BUSY_CHUNK_NS)
+            self.root.after(0, self.busy_chunk)
+
+    def run(self, seconds, busy):
+        self.busy = busy
+        self.busy_chunk()
+        self.root.after(int(seconds * 1000), self.root.quit)
+        self.root.mainloop()
+        self.busy = False
+
+    def close(self):
+        self.root.destroy()
+
+
+class HeadlessDriver:
+    """Stands in for Tk where there is no display: sleeps to each deadline in whole milliseconds."""
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+
+    def run(self, seconds, busy):
+        end_ns = time.monotonic_ns() + int(seconds * NS_PER_SEC)
+        while (now_ns := time.monotonic_ns()) < end_ns:
+            deadline_ns = self.scheduler.next_deadline_ns()
+            if busy:
+                # Like Tk, a due deadline waits for the callback already running.
+                spin_for(BUSY_CHUNK_NS)
+            elif deadline_ns is not None:
+                time.sleep(delay_ms(min(deadline_ns, end_ns), now_ns) / 1000)
+            else:
+                time.sleep(delay_ms(end_ns, now_ns) / 1000)
+            self.scheduler.run_due()
+
+    def close(self):
+        pass
+
+
+class BenchTimer:
+    """A heat on the shared scheduler, started again as soon as it finishes."""
+
+    def __init__(self, scheduler, heat_seconds, warning_seconds, audio_worker=None):
+        self.scheduler = scheduler
+        self.audio_worker = audio_worker
+        self.engine = TimerEngine(heat_seconds, warning_seconds)
+        self.engine.subscribe("cue", self.on_cue)
+        self.engine.subscribe("finish", self.on_finish)
+        self.tick_lateness_ns = []
+        self.cue_latency_ns = []
+        self.entry = None
+
+    def start(self, start_ns):
+        self.engine.start(start_ns)
+        self.schedule()
+
+    def schedule(self):
+        deadline_ns = self.engine.next_deadline_ns()
+        if deadline_ns is not None:
+            self.entry = self.scheduler.schedule(deadline_ns, self.update)
+
+    def update(self):
+        self.engine.poll()
+        self.schedule()
+
+    def on_cue(self, cue):
+        self.cue_latency_ns.append(time.monotonic_ns() - self.engine.cue_deadline_ns(cue))
+        if self.audio_worker is not None:
+            self.audio_worker.play(cue)
+
+    def on_finish(self):
+        self.tick_lateness_ns.extend(self.engine.ticker.lateness_ns)
+        self.engine.start(self.engine.finish_ns, start_cue=False)
+
+    def stop(self):
+        self.tick_lateness_ns.extend(self.engine.ticker.lateness_ns)
+        self.engine.stop()
+        if self.entry is not None:
+            self.scheduler.cancel(self.entry)
+
+
+class Stress:
+    """The background load of one scenario, started and stopped around its run."""
+
+    def __init__(self, stressors, log_path):
+        self.stressors = stressors
+        self.log_path = log_path
+        self.stopping = Event()
+        self.threads = []
+        self.processes = []
+
+    def __enter__(self):
+        if "gc" in self.stressors:
+            self.threads.append(Thread(target=self.churn_garbage, daemon=True))
+        if "cpu" in self.stressors:
+            self.threads.append(Thread(target=self.compete_for_gil, daemon=True))
+            self.processes = [multiprocessing.Process(target=spin_forever, daemon=True)
+                              for _ in range(os.cpu_count() or 1)]
+        if "disk" in self.stressors:
+            self.threads.append(Thread(target=self.log_to_disk, daemon=True))
+        for worker in self.threads + self.processes:
+            worker.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopping.set()
+        for process in self.processes:
+            process.terminate()
+        for worker in self.threads + self.processes:
+            worker.join()
+
+    def churn_garbage(self):
+        while not self.stopping.is_set():
+            nodes = []
+            for _ in range(1000):
+                node = {}
+                node["self"] = [node]
+                nodes.append(node)
+
+    def compete_for_gil(self):
+        while not self.stopping.is_set():
+            pass
+
+    def log_to_disk(self):
+        handler = logging.FileHandler(self.log_path)
+        disk_logger = logging.getLogger("timing_bench.disk")
+        disk_logger.propagate = False
+        disk_logger.addHandler(handler)
+        disk_logger.setLevel(logging.INFO)
+        records = 0
+        while not self.stopping.is_set():
+            disk_logger.info(f'Record {records}: ' + "x" * 200)
+            records += 1
+            if records % 100 == 0:
+                handler.flush()
+                os.fsync(handler.stream.fileno())
+        disk_logger.removeHandler(handler)
+        handler.close()
+
+
+def open_audio_worker(sound_path):
+    """An AudioWorker with the default cue sounds loaded, or None if there is no audio output."""
+    from audio import AudioWorker
+    worker = AudioWorker()
+    worker.preload({cue: str(Path(sound_path) / name) for cue, name in SOUNDS.items()})
+    worker.start()
+    worker.opened.wait()
+    if not worker.banks:
+        print("No audio output, skipping onset latency", file=sys.stderr)
+        return None
+    return worker
+
+
+def run_scenario(name, arguments, audio_worker, log_path):
+    scheduler = DeadlineScheduler()
+    driver = HeadlessDriver(scheduler) if arguments.headless else TkDriver(scheduler)
+    timers = [BenchTimer(scheduler, arguments.heat_seconds, arguments.warning_seconds, audio_worker)
+              for _ in range(arguments.timers)]
+    if audio_worker is not None:
+        for bank in audio_worker.banks.values():
+            bank.onset_latency_ns.clear()
+
+    stressors = SCENARIOS[name]
+    with Stress(stressors, log_path):
+        # Let the stress get going, then stagger the heats so ticks land all through each second.
+        time.sleep(0.2)
+        origin_ns = time.monotonic_ns() + NS_PER_SEC // 2
+        for index, timer in enumerate(timers):
+            timer.start(origin_ns + index * NS_PER_SEC // len(timers))
+        driver.run(arguments.seconds, busy="tk-queue" in stressors)
+        for timer in timers:
+            timer.stop()
+    driver.close()
+
+    results = {"tick_lateness": summarise_ns([ns for timer in timers for ns in timer.tick_lateness_ns]),
+               "cue_latency": summarise_ns([ns for timer in timers for ns in timer.cue_latency_ns])}
+    if audio_worker is not None:
+        results["onset"] = audio_worker.stats()["onset"]
+    return results
+
+
+def check(results, baseline, tolerance, slack_ms, limits):
+    """Descriptions of every p95/p99 worse than the baseline allows and every limit exceeded."""
+    failures = []
+    for scenario, metrics in results["scenarios"].items():
+        for metric, summary in metrics.items():
+            if not summary["count"]:
+                continue
+            before = (baseline or {}).get("scenarios", {}).get(scenario, {}).get(metric)
+            if before and before["count"]:
+                for key in ("p95_ms", "p99_ms"):
+                    allowed = before[key] * (1 + tolerance) + slack_ms
+                    if summary[key] > allowed:
+                        failures.append(f"{scenario} {metric} {key} {summary[key]:.3f} > {allowed:.3f} "
+                                        f"(baseline {before[key]:.3f})")
+            for (limit_metric, key), allowed in limits.items():
+                if limit_metric == metric and summary[key] > allowed:
+                    failures.append(f"{scenario} {metric} {key} {summary[key]:.3f} > limit {allowed:.3f}")
+    return failures
+
+
+def parse_limit(text):
+    name, _, value = text.partition("=")
+    metric, _, key = name.partition(".")
+    if not value or key not in ("p50_ms", "p95_ms", "p99_ms", "max_ms", "mean_ms"):
+        raise argparse.ArgumentTypeError(f'expected e.g. tick_lateness.p99_ms=5, not "{text}"')
+    return (metric, key), float(value)
+
+
+def main(arguments):
+    if not arguments.headless and not os.environ.get("DISPLAY") and sys.platform.startswith("linux"):
+        print("No display, running headless", file=sys.stderr)
+        arguments.headless = True
+    audio_worker = open_audio_worker(arguments.sound_path) if arguments.audio else None
+
+    results = {"driver": "headless" if arguments.headless else "tk",
+               "python": platform.python_version(),
+               "platform": platform.platform(),
+               "timers": arguments.timers,
+               "seconds": arguments.seconds,
+               "scenarios": {}}
+    with tempfile.TemporaryDirectory() as directory:
+        log_path = os.path.join(directory, "stress.log")
+        for name in arguments.scenario or SCENARIOS:
+            results["scenarios"][name] = run_scenario(name, arguments, audio_worker, log_path)
+    if audio_worker is not None:
+        audio_worker.shutdown()
+
+    print(f"{'scenario':<10} {'metric':<14} {'count':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  (ms)")
+    for name, metrics in results["scenarios"].items():
+        for metric, summary in metrics.items():
+            print(f"{name:<10} {metric:<14} {summary['count']:>6} {summary['p50_ms']:>8.3f} "
+                  f"{summary['p95_ms']:>8.3f} {summary['p99_ms']:>8.3f} {summary['max_ms']:>8.3f}")
+    if arguments.json:
+        with open(arguments.json, "w") as file:
+            json.dump(results, file, indent=2)
+
+    baseline = None
+    if arguments.baseline:
+        with open(arguments.baseline) as file:
+            baseline = json.load(file)
+    failures = check(results, baseline, arguments.tolerance, arguments.slack_ms, dict(arguments.limit))
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS),
+                        help="run only this scenario (repeatable); all of them by default")
+    parser.add_argument("--seconds", type=float, default=10, help="length of each scenario")
+    parser.add_argument("--timers", type=int, default=20, help="heats running at once, staggered across the second")
+    parser.add_argument("--heat-seconds", type=int, default=5)
+    parser.add_argument("--warning-seconds", type=int, default=2)
+    parser.add_argument("--headless", action="store_true", help="wake from a sleeping loop instead of Tk")
+    parser.add_argument("--audio", action="store_true", help="play the cues and measure their onset too")
+    parser.add_argument("--sound-path", default="audio")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="allowed p95/p99 growth over the baseline, as a fraction (default 0.5)")
+    parser.add_argument("--slack-ms", type=float, default=1.0,
+                        help="allowed growth on top of the tolerance, for sub-millisecond baselines")
+    parser.add_argument("--limit", type=parse_limit, action="append", default=[],
+                        help="absolute ceiling in every scenario, e.g. tick_lateness.p99_ms=5 (repeatable)")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,118 @@
+"""Horn, siren and beep cues synthesised with numpy instead of decoded from files.
+
+A sound setting such as "synth:horn" or "synth:beep,pitch=880,count=5" names a synthesised cue;
+each pattern's parameters and their defaults are listed in PATTERNS. Rendered cues are cached,
+so a cue used by several heats, arenas or devices is only synthesised once.
+
+    python tones.py synth:siren,seconds=2      plays a cue on the default output device
+"""
+import sys
+from functools import lru_cache
+
+import numpy as np
+
+PREFIX = "synth:"
+FADE_SECONDS = 0.01
+PATTERNS = {
+    # A brass-like tone: the fundamental and its harmonics, each quieter than the last.
+    "horn": {"pitch": 233.0, "seconds": 2.0, "harmonics": 6, "volume": 0.8},
+    # A tone sweeping between low and high, rate sweeps per second.
+    "siren": {"low": 600.0, "high": 1200.0, "seconds": 3.0, "rate": 1.0, "volume": 0.8},
+    # count short sine beeps, each on seconds long with off seconds between them.
+    "beep": {"pitch": 1000.0, "count": 3, "on": 0.15, "off": 0.1, "volume": 0.8},
+}
+
+
+def is_synth(sound):
+    return sound.startswith(PREFIX)
+
+
+def parse(sound):
+    """("pattern", {parameter: value}) for a "synth:" sound, defaults filled in; raises ValueError."""
+    pattern, *settings = sound[len(PREFIX):].split(",")
+    pattern = pattern.strip()
+    if pattern not in PATTERNS:
+        raise ValueError(f'Unknown synthesised sound "{pattern}", use one of {", ".join(PATTERNS)}')
+    params = dict(PATTERNS[pattern])
+    for setting in settings:
+        name, _, value = setting.partition("=")
+        name = name.strip()
+        if name not in params:
+            raise ValueError(f'{pattern} has no parameter "{name}", use one of {", ".join(params)}')
+        kind = type(params[name])
+        try:
+            params[name] = kind(value)
+        except ValueError:
+            raise ValueError(f'{pattern} {name} must be a {"whole " if kind is int else ""}number, not "{value.strip()}"')
+        if params[name] < 0:
+            raise ValueError(f'{pattern} {name} must not be negative')
+    return pattern, params
+
+
+def render(sound, sample_rate, nchannels):
+    """The cue as interleaved 16-bit PCM bytes; raises ValueError for a bad sound."""
+    pattern, params = parse(sound)
+    # Normalised, so "synth:horn" and "synth:horn,pitch=233" share a cache entry.
+    return render_cached(pattern, tuple(sorted(params.items())), sample_rate, nchannels)
+
+
+@lru_cache(maxsize=32)
+def render_cached(pattern, params, sample_rate, nchannels):
+    params = dict(params)
+    wave = GENERATORS[pattern](sample_rate, **params)
+    samples = np.round(wave * params["volume"] * 32767).clip(-32768, 32767).astype(np.int16)
+    return np.repeat(samples, nchannels).tobytes()
+
+
+def fade(wave, sample_rate):
+    """Ramp the ends of wave in place, so it starts and stops without a click."""
+    frames = min(int(FADE_SECONDS * sample_rate), len(wave) // 2)
+    if frames:
+        ramp = np.linspace(0.0, 1.0, frames)
+        wave[:frames] *= ramp
+        wave[len(wave) - frames:] *= ramp[::-1]
+    return wave
+
+
+def times(seconds, sample_rate):
+    return np.arange(int(seconds * sample_rate)) / sample_rate
+
+
+def horn(sample_rate, pitch, seconds, harmonics, volume):
+    t = times(seconds, sample_rate)
+    wave = sum(np.sin(2 * np.pi * pitch * n * t) / n for n in range(1, max(harmonics, 1) + 1))
+    return fade(wave / np.abs(wave).max(initial=1.0), sample_rate)
+
+
+def siren(sample_rate, low, high, seconds, rate, volume):
+    t = times(seconds, sample_rate)
+    # Frequency rises and falls along a sine; integrating it keeps the phase continuous.
+    frequency = low + (high - low) * (1 - np.cos(2 * np.pi * rate * t)) / 2
+    phase = 2 * np.pi * np.cumsum(frequency) / sample_rate
+    return fade(np.sin(phase), sample_rate)
+
+
+def beep(sample_rate, pitch, count, on, off, volume):
+    one = fade(np.sin(2 * np.pi * pitch * times(on, sample_rate)), sample_rate)
+    gap = np.zeros(int(off * sample_rate))
+    parts = [part for _ in range(count) for part in (one, gap)]
+    return np.concatenate(parts[:-1]) if parts else np.zeros(0)
+
+
+GENERATORS = {"horn": horn, "siren": siren, "beep": beep}
+
+
+if __name__ == "__main__":
+    import time
+    from audio import AudioBank
+
+    bank = AudioBank()
+    for sound in sys.argv[1:] or [f"{PREFIX}{pattern}" for pattern in PATTERNS]:
+        started_ns = time.perf_counter_ns()
+        bank.load(sound, sound)
+        print(f"{sound}: rendered in {(time.perf_counter_ns() - started_ns) / 1e6:.1f} ms")
+        bank.play(sound)
+        time.sleep(0.2)
+        while bank.active:
+            time.sleep(0.05)
+    bank.close()